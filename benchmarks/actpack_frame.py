@@ -0,0 +1,50 @@
+"""
+Benchmark for reading the sensor values of a DephyActpack.
+
+Decodes a raw frame the way `update` does, then compares reading every field
+through the properties with taking the whole decoded frame at once with
+`snapshot`.
+
+Usage:
+    python benchmarks/actpack_frame.py
+"""
+
+import timeit
+
+import numpy as np
+
+from opensourceleg.hardware.actuators import FRAME_FIELDS, MockDephyActpack
+from opensourceleg.tools.logger import Logger
+
+NUMBER_OF_READS = 20000
+
+
+def read_properties(actpack):
+    return [getattr(actpack, field) for field in PROPERTIES]
+
+
+PROPERTIES = [field for field in FRAME_FIELDS if not field.startswith("genvar")] + [
+    "genvars"
+]
+
+
+def main():
+    actpack = MockDephyActpack(logger=Logger(file_path="/tmp/actpack_frame"))
+    raw = actpack.read()
+    out = np.empty(len(FRAME_FIELDS))
+
+    def decode():
+        actpack._data = raw
+
+    decoding = timeit.timeit(decode, number=NUMBER_OF_READS)
+    properties = timeit.timeit(lambda: read_properties(actpack), number=NUMBER_OF_READS)
+    snapshot = timeit.timeit(lambda: actpack.snapshot(out=out), number=NUMBER_OF_READS)
+
+    print(f"Fields per frame: {len(FRAME_FIELDS)}")
+    print(f"decode:          {decoding / NUMBER_OF_READS * 1e6:8.2f} us / frame")
+    print(f"all properties:  {properties / NUMBER_OF_READS * 1e6:8.2f} us / frame")
+    print(f"snapshot(out):   {snapshot / NUMBER_OF_READS * 1e6:8.2f} us / frame")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""
+Benchmark for the decoding of the IMU packets, replayed without the IMU.
+
+Feeds a synthetic 100 Hz recording to `IMULordMicrostrain` through a
+`ReplayTransport` at an infinite speed, so that only the decoding and buffering
+are timed. Bursts of packets, as received after a late control tick, are
+decoded with the former dict-based `get_data`, the latest-only `get_data` and
+`get_batch`, which decodes every packet of the burst instead of only the newest.
+
+Usage:
+    python benchmarks/imu_replay.py
+"""
+
+import math
+import timeit
+
+import numpy as np
+
+from opensourceleg.hardware.sensors import (
+    IMU_FIELDS,
+    IMUDataClass,
+    IMULordMicrostrain,
+    ReplayTransport,
+)
+
+NUMBER_OF_SAMPLES = 10000
+BURSTS = (1, 4, 16)
+REPEATS = 5
+
+
+def dict_get_data(imu: IMULordMicrostrain):
+    """get_data as it was, building a dict of the newest packet"""
+    imu_packets = imu.transport.read(timeout=imu.timeout)
+    if len(imu_packets):
+        raw_imu_data = {
+            data_point.channelName(): data_point.as_float()
+            for data_point in imu_packets[-1].data()
+        }
+        imu.imu_data.angle_x = raw_imu_data["estRoll"]
+        imu.imu_data.angle_y = raw_imu_data["estPitch"]
+        imu.imu_data.angle_z = raw_imu_data["estYaw"]
+        imu.imu_data.velocity_x = raw_imu_data["estAngularRateX"]
+        imu.imu_data.velocity_y = raw_imu_data["estAngularRateY"]
+        imu.imu_data.velocity_z = raw_imu_data["estAngularRateZ"]
+        imu.imu_data.accel_x = raw_imu_data["estLinearAccelX"]
+        imu.imu_data.accel_y = raw_imu_data["estLinearAccelY"]
+        imu.imu_data.accel_z = raw_imu_data["estLinearAccelZ"]
+        imu.imu_data.imu_time_sta = raw_imu_data["estFilterGpsTimeTow"]
+        imu.imu_data.imu_filter_gps_time_week_num = raw_imu_data[
+            "estFilterGpsTimeWeekNum"
+        ]
+
+    return imu.imu_data
+
+
+def main():
+    rng = np.random.default_rng(seed=0)
+    samples = rng.normal(size=(NUMBER_OF_SAMPLES, len(IMU_FIELDS)))
+    timestamps = 0.01 * np.arange(NUMBER_OF_SAMPLES)
+
+    for burst in BURSTS:
+        imu = IMULordMicrostrain(
+            transport=ReplayTransport(
+                samples=samples,
+                timestamps=timestamps,
+                speed=math.inf,
+                burst=burst,
+                loop=True,
+            )
+        )
+        imu.start_streaming()
+
+        # Both paths decode the same newest sample
+        assert dict_get_data(imu) == IMUDataClass(*samples[burst - 1])
+        assert imu.get_data() == IMUDataClass(*samples[2 * burst - 1])
+
+        # Number of packets decoded per read
+        reads = {
+            "dict get_data": (lambda: dict_get_data(imu), 1),
+            "get_data": (imu.get_data, 1),
+            "get_batch": (imu.get_batch, burst),
+        }
+
+        for name, (read, decoded) in reads.items():
+            number = NUMBER_OF_SAMPLES // burst
+            duration = min(timeit.repeat(read, number=number, repeat=REPEATS))
+            print(
+                f"burst {burst:2d}, {name:14s} {duration / number * 1e6:8.2f} us / read"
+                f"  {duration / number / decoded * 1e6:8.2f} us / decoded packet"
+            )
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""
+Benchmark for sampling the attributes registered on a Logger.
+
+Compares the per-call cost of building a row with a getattr/isinstance loop over
+the containers (the way rows used to be built) with the getters compiled by the
+AttributeSampler, and with sampling straight into a preallocated NumPy array.
+
+Usage:
+    python benchmarks/logger_sampling.py
+"""
+
+import timeit
+
+import numpy as np
+
+from opensourceleg.tools.logger import AttributeSampler
+
+NUMBER_OF_CONTAINERS = 4
+ATTRIBUTES_PER_CONTAINER = 12
+NUMBER_OF_SAMPLES = 20000
+
+
+class Signals:
+    def __init__(self, names: list[str]) -> None:
+        for i, name in enumerate(names):
+            setattr(self, name, float(i))
+
+
+def build_containers():
+    names = [f"signal_{i}" for i in range(ATTRIBUTES_PER_CONTAINER)]
+    containers = []
+
+    for i in range(NUMBER_OF_CONTAINERS):
+        if i % 2:
+            containers.append({name: float(j) for j, name in enumerate(names)})
+        else:
+            containers.append(Signals(names))
+
+    return containers, names
+
+
+def sample_with_loop(containers, attributes):
+    data = []
+
+    for container, container_attributes in zip(containers, attributes):
+        for attribute in container_attributes:
+            if isinstance(container, dict):
+                data.append(container.get(attribute))
+            else:
+                data.append(getattr(container, attribute))
+
+    return data
+
+
+def main():
+    containers, names = build_containers()
+    attributes = [names] * len(containers)
+
+    sampler = AttributeSampler()
+    for container in containers:
+        sampler.add(container, names)
+
+    out = np.zeros(len(sampler))
+
+    loop = timeit.timeit(
+        lambda: sample_with_loop(containers, attributes), number=NUMBER_OF_SAMPLES
+    )
+    compiled = timeit.timeit(sampler.sample, number=NUMBER_OF_SAMPLES)
+    into = timeit.timeit(lambda: sampler.sample_into(out), number=NUMBER_OF_SAMPLES)
+
+    print(f"Signals per row: {len(sampler)}")
+    print(f"getattr loop:     {loop / NUMBER_OF_SAMPLES * 1e6:8.2f} us / row")
+    print(f"compiled getters: {compiled / NUMBER_OF_SAMPLES * 1e6:8.2f} us / row")
+    print(f"sample_into:      {into / NUMBER_OF_SAMPLES * 1e6:8.2f} us / row")
+
+
+if __name__ == "__main__":
+    main()
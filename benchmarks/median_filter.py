@@ -0,0 +1,85 @@
+"""
+Benchmark for the median filtering of the strain amplifier samples.
+
+Compares the former `StrainAmp.update` path, which writes each sample into a
+(3, 6) array and calls np.median on it, with `MedianFilter.update` writing into
+a preallocated output array, and checks that both give the same output. The
+3-sample median filter must be at least 10x faster. Longer windows and the
+Hampel filter are timed as well.
+
+Usage:
+    python benchmarks/median_filter.py
+"""
+
+import time
+
+import numpy as np
+
+from opensourceleg.tools.filters import MedianFilter
+
+NUMBER_OF_SAMPLES = 20000
+REPEATS = 25
+TARGET_SPEEDUP = 10.0
+
+
+class NumpyMedian:
+    def __init__(self) -> None:
+        self.genvars = np.zeros((3, 6))
+        self.indx = 0
+
+    def update(self, sample):
+        self.genvars[self.indx, :] = sample
+        self.indx = (self.indx + 1) % 3
+        return np.median(a=self.genvars, axis=0)
+
+
+def main():
+    rng = np.random.default_rng(seed=0)
+    samples = rng.integers(0, 4096, size=(NUMBER_OF_SAMPLES, 6))
+    arrays = list(samples)
+    lists = samples.tolist()
+
+    reference = NumpyMedian()
+    median = MedianFilter(channels=6, window=3)
+    for array, sample in zip(arrays, lists):
+        assert np.array_equal(reference.update(array), median.update(sample))
+
+    out = np.zeros(6)
+    filters = {
+        "np.median, window 3": (NumpyMedian().update, arrays),
+        "MedianFilter, window 3": (MedianFilter(window=3).update, lists),
+        "MedianFilter, window 5": (MedianFilter(window=5).update, lists),
+        "MedianFilter, Hampel 5": (
+            MedianFilter(window=5, outlier_threshold=3.0).update,
+            lists,
+        ),
+    }
+
+    # Rounds interleave the filters, so that a slow spell of the machine does not
+    # only affect one of them, and the best round of each filter is kept
+    durations = dict.fromkeys(filters, float("inf"))
+    for _ in range(REPEATS):
+        for name, (update, inputs) in filters.items():
+            args = () if name.startswith("np.median") else (out,)
+            start = time.perf_counter()
+            for sample in inputs:
+                update(sample, *args)
+            durations[name] = min(durations[name], time.perf_counter() - start)
+
+    baseline = durations["np.median, window 3"]
+    speedups = {}
+    for name, duration in durations.items():
+        speedups[name] = baseline / duration
+        print(
+            f"{name:24s} {duration / NUMBER_OF_SAMPLES * 1e6:8.2f} us / sample"
+            f"  ({speedups[name]:5.1f}x)"
+        )
+
+    assert speedups["MedianFilter, window 3"] >= TARGET_SPEEDUP, (
+        f"MedianFilter is {speedups['MedianFilter, window 3']:.1f}x faster than"
+        f" np.median, expected at least {TARGET_SPEEDUP:.0f}x"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""
+Benchmark for the sequential and concurrent update modes of the OpenSourceLeg class.
+
+The knee, ankle and loadcell are replaced by their offline (mock) versions and a
+fixed latency is injected into each of their reads to mimic the serial and I2C
+round trips of the real hardware. In the sequential mode an update costs the sum
+of these latencies, whereas in the concurrent mode it costs the slowest one.
+
+Usage:
+    python benchmarks/osl_update.py
+"""
+
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from opensourceleg.osl import OpenSourceLeg
+
+KNEE_LATENCY = 0.0020
+ANKLE_LATENCY = 0.0020
+LOADCELL_LATENCY = 0.0010
+NUMBER_OF_UPDATES = 200
+
+LOADCELL_MATRIX = np.array(
+    [
+        (-38.72600, -1817.74700, 9.84900, 43.37400, -44.54000, 1824.67000),
+        (-8.61600, 1041.14900, 18.86100, -2098.82200, 31.79400, 1058.6230),
+        (-1047.16800, 8.63900, -1047.28200, -20.70000, -1073.08800, -8.92300),
+        (20.57600, -0.04000, -0.24600, 0.55400, -21.40800, -0.47600),
+        (-12.13400, -1.10800, 24.36100, 0.02300, -12.14100, 0.79200),
+        (-0.65100, -28.28700, 0.02200, -25.23000, 0.47300, -27.3070),
+    ]
+)
+
+
+def with_latency(function, latency: float):
+    def delayed(*args, **kwargs):
+        time.sleep(latency)
+        return function(*args, **kwargs)
+
+    return delayed
+
+
+def make_osl(concurrent_update: bool, log_directory: str) -> OpenSourceLeg:
+    osl = OpenSourceLeg(
+        frequency=200,
+        file_name=os.path.join(log_directory, f"osl_{concurrent_update}"),
+        concurrent_update=concurrent_update,
+    )
+    osl.log.set_stream_level("WARNING")
+    osl.add_joint(name="knee", gear_ratio=41.5, offline_mode=True)
+    osl.add_joint(name="ankle", gear_ratio=41.5, offline_mode=True)
+    osl.add_loadcell(loadcell_matrix=LOADCELL_MATRIX, offline_mode=True)
+
+    osl.knee.read = with_latency(osl.knee.read, KNEE_LATENCY)
+    osl.ankle.read = with_latency(osl.ankle.read, ANKLE_LATENCY)
+    osl.loadcell._lc._read_compressed_strain = with_latency(
+        osl.loadcell._lc._read_compressed_strain, LOADCELL_LATENCY
+    )
+
+    osl.knee.open(freq=200, log_level=0, log_enabled=False)
+    osl.ankle.open(freq=200, log_level=0, log_enabled=False)
+
+    return osl
+
+
+def benchmark(concurrent_update: bool, log_directory: str) -> np.ndarray:
+    osl = make_osl(concurrent_update=concurrent_update, log_directory=log_directory)
+    durations = np.zeros(NUMBER_OF_UPDATES)
+
+    osl.update()
+
+    for i in range(NUMBER_OF_UPDATES):
+        t0 = time.perf_counter()
+        osl.update()
+        durations[i] = time.perf_counter() - t0
+
+    osl.__exit__()
+    return durations
+
+
+if __name__ == "__main__":
+    with tempfile.TemporaryDirectory() as log_directory:
+        print(
+            f"Injected latency: knee {KNEE_LATENCY * 1e3:.1f} ms, "
+            f"ankle {ANKLE_LATENCY * 1e3:.1f} ms, "
+            f"loadcell {LOADCELL_LATENCY * 1e3:.1f} ms\n"
+        )
+
+        for concurrent_update in [False, True]:
+            durations = benchmark(
+                concurrent_update=concurrent_update, log_directory=log_directory
+            )
+            print(
+                f"{'concurrent' if concurrent_update else 'sequential':>10}: "
+                f"mean {np.mean(durations) * 1e3:.3f} ms, "
+                f"p99 {np.percentile(durations, 99) * 1e3:.3f} ms, "
+                f"max {np.max(durations) * 1e3:.3f} ms"
+            )
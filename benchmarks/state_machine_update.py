@@ -0,0 +1,69 @@
+"""
+Benchmark for the transition lookup of `StateMachine.update`.
+
+Builds a ring of states with a few transitions leaving each of them, none of
+which are taken, and times a tick in the last state. The former update scanned
+every transition and compared its source state to the current one with ==, the
+indexed one looks up the transitions leaving the current state and only
+evaluates the first of them, as the scan did.
+
+Usage:
+    python benchmarks/state_machine_update.py
+"""
+
+import timeit
+
+from opensourceleg.control.state_machine import Event, State, StateMachine
+
+NUMBER_OF_STATES = (4, 16, 64)
+OUT_DEGREE = 3
+NUMBER = 20000
+REPEATS = 5
+
+
+def scan_update(fsm: StateMachine) -> None:
+    """update as it was, scanning every transition"""
+    for transition in fsm._transitions:
+        if transition.source_state == fsm._current_state:
+            fsm._current_state = transition(fsm._osl, spoof=fsm.is_spoofing)
+            break
+
+
+def build(number_of_states: int) -> StateMachine:
+    fsm = StateMachine()
+    states = [State(name=f"state{i}") for i in range(number_of_states)]
+    for state in states:
+        fsm.add_state(state=state)
+
+    event = Event(name="event")
+    fsm.add_event(event=event)
+    for i, state in enumerate(states):
+        for j in range(1, OUT_DEGREE + 1):
+            fsm.add_transition(
+                source=state,
+                destination=states[(i + j) % number_of_states],
+                event=event,
+                callback=lambda osl: False,
+            )
+
+    fsm._initial_state = states[-1]
+    fsm.start()
+    return fsm
+
+
+def main():
+    for number_of_states in NUMBER_OF_STATES:
+        fsm = build(number_of_states=number_of_states)
+        scan = min(
+            timeit.repeat(lambda: scan_update(fsm), number=NUMBER, repeat=REPEATS)
+        )
+        indexed = min(timeit.repeat(fsm.update, number=NUMBER, repeat=REPEATS))
+        print(
+            f"{number_of_states:3d} states, {len(fsm._transitions):3d} transitions: "
+            f"scan {scan / NUMBER * 1e6:6.2f} us, "
+            f"indexed {indexed / NUMBER * 1e6:6.2f} us  ({scan / indexed:5.1f}x)"
+        )
+
+
+if __name__ == "__main__":
+    main()
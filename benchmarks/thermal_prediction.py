@@ -0,0 +1,39 @@
+"""
+Benchmark for the predictive queries of the thermal model.
+
+Times `ThermalModel.max_rms_current` over a horizon and `time_to_limit` for a
+constant current and for a planned current profile, from a warm state. The
+horizon query is meant to be cheap enough to run every control tick
+(well below 50 us).
+
+Usage:
+    python benchmarks/thermal_prediction.py
+"""
+
+import math
+import timeit
+
+from opensourceleg.hardware.thermal import ThermalModel
+
+NUMBER_OF_QUERIES = 20000
+PROFILE = [(0.4, 12000), (0.6, 3000), (math.inf, 8000)]
+
+
+def main():
+    model = ThermalModel()
+    model.T_w, model.T_c = 60.0, 45.0
+
+    queries = {
+        "max_rms_current(horizon=2)": lambda: model.max_rms_current(horizon=2.0),
+        "max_rms_current()": lambda: model.max_rms_current(),
+        "time_to_limit(20 A)": lambda: model.time_to_limit(motor_current=20000),
+        "time_to_limit(profile)": lambda: model.time_to_limit(motor_current=PROFILE),
+    }
+
+    for name, query in queries.items():
+        duration = timeit.timeit(query, number=NUMBER_OF_QUERIES)
+        print(f"{name:28s} {duration / NUMBER_OF_QUERIES * 1e6:8.2f} us / query")
+
+
+if __name__ == "__main__":
+    main()
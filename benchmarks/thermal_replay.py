@@ -0,0 +1,52 @@
+"""
+Benchmark for replaying a recorded current trace through the thermal model.
+
+Compares stepping one `ThermalModel` per actuator through the trace with
+`BatchThermalModel.simulate`, which runs all the actuators and all the steps
+in three blocked passes of about sqrt(T) vectorized iterations each.
+
+Usage:
+    python benchmarks/thermal_replay.py
+"""
+
+import time
+
+import numpy as np
+
+from opensourceleg.hardware.thermal import BatchThermalModel, ThermalModel
+
+FREQUENCY = 200
+DURATION = 600
+NUMBER_OF_ACTUATORS = 2
+
+
+def step_scalar(currents):
+    for j in range(currents.shape[1]):
+        model = ThermalModel()
+        for current in currents[:, j].tolist():
+            model.update(dt=1 / FREQUENCY, motor_current=current)
+
+
+def main():
+    rng = np.random.default_rng(seed=0)
+    currents = rng.uniform(
+        -10000, 10000, size=(DURATION * FREQUENCY, NUMBER_OF_ACTUATORS)
+    )
+
+    start = time.perf_counter()
+    step_scalar(currents)
+    scalar = time.perf_counter() - start
+
+    start = time.perf_counter()
+    BatchThermalModel(number_of_actuators=NUMBER_OF_ACTUATORS).simulate(
+        motor_current=currents, dt=1 / FREQUENCY
+    )
+    batch = time.perf_counter() - start
+
+    print(f"Trace: {DURATION} s at {FREQUENCY} Hz, {NUMBER_OF_ACTUATORS} actuators")
+    print(f"ThermalModel.update loop:    {scalar:8.3f} s")
+    print(f"BatchThermalModel.simulate:  {batch:8.3f} s  ({scalar / batch:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
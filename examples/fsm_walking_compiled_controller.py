@@ -139,6 +139,11 @@ controller.inputs.parameters.transition_parameters.kneeDthetaESwingToLSwing = 3
 controller.inputs.parameters.transition_parameters.loadEStance = -body_weight * 0.4  # type: ignore
 controller.inputs.parameters.transition_parameters.kneeThetaLSwingToEStance = 30  # type: ignore
 
+# Views sharing the memory of the controller structures, written and read once per tick
+sensors = controller.float_view(controller.inputs.sensors)  # type: ignore
+knee_impedance = controller.float_view(controller.outputs.knee_impedance)  # type: ignore
+ankle_impedance = controller.float_view(controller.outputs.ankle_impedance)  # type: ignore
+
 with osl:
     osl.home()
     osl.update()
@@ -149,27 +154,34 @@ with osl:
     for t in osl.clock:
         osl.update()
 
-        controller.inputs.sensors.knee_angle = (  # type: ignore
-            units.convert_from_default(osl.knee.output_position, units.position.deg)
+        # Same order as controller.DEFAULT_SENSOR_LIST
+        sensors[:] = (
+            units.convert_from_default(osl.knee.output_position, units.position.deg),
+            units.convert_from_default(osl.ankle.output_position, units.position.deg),
+            units.convert_from_default(
+                osl.knee.output_velocity, units.velocity.deg_per_s
+            ),
+            units.convert_from_default(
+                osl.ankle.output_velocity, units.velocity.deg_per_s
+            ),
+            osl.loadcell.fz,
         )
-        controller.inputs.sensors.ankle_angle = units.convert_from_default(osl.ankle.output_position, units.position.deg)  # type: ignore
-        controller.inputs.sensors.knee_velocity = units.convert_from_default(osl.knee.output_velocity, units.velocity.deg_per_s)  # type: ignore
-        controller.inputs.sensors.ankle_velocity = units.convert_from_default(osl.ankle.output_velocity, units.velocity.deg_per_s)  # type: ignore
-        controller.inputs.sensors.Fz = osl.loadcell.fz  # type: ignore
 
         # Update any control inputs that change every loop
         controller.inputs.time = t  # type: ignore
 
         # Call the controller
         outputs = controller.run()
+        knee_stiffness, knee_damping, knee_eq_angle = knee_impedance.tolist()
+        ankle_stiffness, ankle_damping, ankle_eq_angle = ankle_impedance.tolist()
 
         # Test print to ensure external library call works
         print(
             "Current time in state {}: {:.2f} seconds, Knee Eq {:.2f}, Ankle Eq {:.2f}, Fz {:.2f}".format(
                 outputs.current_state,
                 outputs.time_in_current_state,
-                outputs.knee_impedance.eq_angle,
-                outputs.ankle_impedance.eq_angle,
+                knee_eq_angle,
+                ankle_eq_angle,
                 osl.loadcell.fz,
             ),
             end="\r",
@@ -177,30 +189,18 @@ with osl:
 
         # Write to the hardware
         osl.knee.set_joint_impedance(
-            K=units.convert_to_default(
-                outputs.knee_impedance.stiffness, units.stiffness.N_m_per_rad
-            ),
-            B=units.convert_to_default(
-                outputs.knee_impedance.damping, units.damping.N_m_per_rad_per_s
-            ),
+            K=units.convert_to_default(knee_stiffness, units.stiffness.N_m_per_rad),
+            B=units.convert_to_default(knee_damping, units.damping.N_m_per_rad_per_s),
         )
         osl.knee.set_output_position(
-            position=units.convert_to_default(
-                outputs.knee_impedance.eq_angle, units.position.deg
-            )
+            position=units.convert_to_default(knee_eq_angle, units.position.deg)
         )
         osl.ankle.set_joint_impedance(
-            K=units.convert_to_default(
-                outputs.ankle_impedance.stiffness, units.stiffness.N_m_per_rad
-            ),
-            B=units.convert_to_default(
-                outputs.ankle_impedance.damping, units.damping.N_m_per_rad_per_s
-            ),
+            K=units.convert_to_default(ankle_stiffness, units.stiffness.N_m_per_rad),
+            B=units.convert_to_default(ankle_damping, units.damping.N_m_per_rad_per_s),
         )
         osl.ankle.set_output_position(
-            position=units.convert_to_default(
-                outputs.ankle_impedance.eq_angle, units.position.deg
-            )
+            position=units.convert_to_default(ankle_eq_angle, units.position.deg)
         )
 
     print("\n")
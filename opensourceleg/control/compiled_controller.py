@@ -2,6 +2,7 @@ from typing import Any
 
 import ctypes
 
+import numpy as np
 import numpy.ctypeslib as ctl
 
 
@@ -14,6 +15,12 @@ class CompiledController:
     You can define these input and output structures however you please.
     See examples folder of repo for examples.
 
+    Besides the ctypes structures, the inputs and outputs are exposed as NumPy
+    structured arrays (input_view and output_view) sharing their memory, and
+    any structure made of doubles only can be viewed as a flat float64 array
+    with float_view(). Writing a whole vector of sensors is then one slice
+    assignment instead of one ctypes attribute access per field.
+
     Parameters:
         library_name (string): The name of the compiled library file, without the *.so
         library_path (string): The path to the directory containing the library. See examples for how to get working directory of parent script.
@@ -60,8 +67,10 @@ class CompiledController:
 
         self._input_type = None
         self.inputs = None
+        self.input_view = None
         self._output_type = None
         self.outputs = None
+        self.output_view = None
 
     def __del__(self):
         if not self.cleanup_func == None:
@@ -97,6 +106,7 @@ class CompiledController:
         """
         self._input_type = self.define_type("inputs", input_list)
         self.inputs = self._input_type()  # type: ignore
+        self.input_view = self.structured_view(self.inputs)
 
     def define_outputs(self, output_list: list[Any]) -> None:
         """
@@ -113,6 +123,7 @@ class CompiledController:
         """
         self._output_type = self.define_type("outputs", output_list)
         self.outputs = self._output_type()  # type: ignore
+        self.output_view = self.structured_view(self.outputs)
 
     def define_type(self, type_name: str, parameter_list: list[Any]):
         """
@@ -147,6 +158,52 @@ class CompiledController:
         setattr(self.types, type_name, CustomStructure)
         return getattr(self.types, type_name)
 
+    def structured_view(self, structure) -> np.ndarray:
+        """
+        Returns a NumPy structured array aliasing the memory of a ctypes
+        structure, e.g. my_controller.inputs or my_controller.inputs.sensors.
+        Nested structures become nested fields, and writing to the array writes
+        to the structure passed to the compiled library.
+
+        Parameters
+        ------------
+        structure: A ctypes structure, or a structure field of one
+
+        Returns:
+            A 0-d structured array with the fields of the structure.
+            Use .copy() to keep a snapshot of the outputs.
+        """
+        dtype = np.dtype(type(structure))
+        return np.frombuffer(structure, dtype=dtype).reshape(())
+
+    def float_view(self, structure) -> np.ndarray:
+        """
+        Returns a flat float64 NumPy array aliasing the memory of a ctypes
+        structure whose fields are all doubles, or structures and arrays of
+        doubles, in the order they were defined.
+
+        Example Usage
+        ------------
+            sensors = my_controller.float_view(my_controller.inputs.sensors)
+            sensors[:] = [knee_angle, ankle_angle, knee_velocity, ankle_velocity, Fz]
+
+        Parameters
+        ------------
+        structure: A ctypes structure, or a structure field of one
+
+        Returns:
+            A float64 array with one element per double of the structure.
+
+        Raises:
+            ValueError: If the structure holds anything else than doubles.
+        """
+        if not _is_float64(np.dtype(type(structure))):
+            raise ValueError(
+                f"{type(structure).__name__} can only be viewed as float64 if all its fields are doubles."
+            )
+
+        return np.frombuffer(structure, dtype=np.float64)
+
     def run(self):
         """
         This method calls the main controller function of the library.
@@ -173,5 +230,18 @@ class CompiledController:
         return self.outputs
 
 
+def _is_float64(dtype: np.dtype) -> bool:
+    if dtype.fields is not None:
+        fields = dtype.fields.values()
+        return all(_is_float64(field[0]) for field in fields) and (
+            dtype.itemsize == sum(field[0].itemsize for field in fields)
+        )
+
+    if dtype.subdtype is not None:
+        return _is_float64(dtype.subdtype[0])
+
+    return dtype == np.float64
+
+
 if __name__ == "__main__":
     pass
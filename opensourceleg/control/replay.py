@@ -0,0 +1,402 @@
+#!/usr/bin/python3
+# Offline replay of finite state machines over recorded logs
+
+from typing import Any, Callable, Mapping, Optional, Sequence, Union
+
+import csv
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from types import SimpleNamespace
+
+import numpy as np
+import numpy.typing as npt
+
+from ..tools.clock import SimulatedClock
+from ..tools.logger import BINARY_LOG_MAGIC, read_binary_log
+from .state_machine import StateMachine
+from .table_state_machine import TableStateMachine
+
+"""
+The replay module runs a state machine over a recorded log, as fast as the CPU
+allows, to tune the transition criteria offline.
+
+The log is read from a CSV file or a binary log written by the `Logger`. Time
+is taken from a timestamp column of the log (or a fixed sampling frequency)
+instead of the system clock, so that the time spent in every state is the one
+of the recording.
+
+Usage:
+1. Create a `LogReplay` with the log and its timestamp column.
+2. Call `run` with a `TableStateMachine`, which is replayed in batch, or a
+   `StateMachine`, which is replayed tick by tick. Map the columns of the log to
+   the signals of the table, or to the attributes the criteria read from their
+   `osl` argument, e.g. "knee.output_position" to
+   "DephyActpack[knee]:output_position".
+3. Inspect the returned `ReplayResult`: the state after every sample, the
+   transitions and their timestamps, and dwell time statistics per state.
+4. Call `sweep` with a function building the state machine from a set of
+   parameters, e.g. thresholds, to replay many sets in parallel processes.
+"""
+
+FiniteStateMachine = Union[StateMachine, TableStateMachine]
+
+
+def read_log(file_path: str) -> np.ndarray:
+    """
+    Reads a log written by the `Logger`, in CSV or binary format, as a NumPy
+    structured array with one field per column. CSV values that are not numbers
+    (e.g. state names) are read as NaN.
+
+    Args:
+        file_path (str): Path of the log
+
+    Returns:
+        np.ndarray: Structured array with one field per logged attribute
+    """
+    with open(file_path, "rb") as f:
+        is_binary = f.read(len(BINARY_LOG_MAGIC)) == BINARY_LOG_MAGIC
+
+    if is_binary:
+        return read_binary_log(file_path)
+
+    with open(file_path, newline="") as f:
+        header = next(csv.reader(f), [])
+
+    # Field names must be unique, as in the binary logs
+    names: list[str] = []
+    for name in header:
+        unique_name, i = name, 1
+        while unique_name in names:
+            unique_name, i = f"{name}.{i}", i + 1
+        names.append(unique_name)
+
+    values = np.genfromtxt(
+        file_path, delimiter=",", skip_header=1, dtype=np.double, ndmin=2
+    )
+    log = np.zeros(len(values), dtype=[(name, "<f8") for name in names])
+
+    for i, name in enumerate(names):
+        log[name] = values[:, i]
+
+    return log
+
+
+@dataclass
+class ReplayResult:
+    """
+    States a state machine went through over a log.
+
+    Args:
+        states (np.ndarray): Index, in state_names, of the state after every sample
+        state_names (list[str]): Names of the states of the state machine
+        timestamps (np.ndarray): Time of every sample in seconds
+        initial_state (int): Index of the state before the first sample
+        parameters (Any): Parameters the state machine was built with, if any
+    """
+
+    states: npt.NDArray[np.intp]
+    state_names: list[str]
+    timestamps: npt.NDArray[np.double]
+    initial_state: int = 0
+    parameters: Any = None
+
+    def __len__(self) -> int:
+        return len(self.states)
+
+    @property
+    def transition_indices(self) -> npt.NDArray[np.intp]:
+        """Index of the samples after which the state changed."""
+        return np.flatnonzero(np.diff(self.states, prepend=self.initial_state))
+
+    @property
+    def transition_times(self) -> npt.NDArray[np.double]:
+        return self.timestamps[self.transition_indices]
+
+    @property
+    def transitions(self) -> list[tuple[float, str, str]]:
+        """Time, source and destination of every transition."""
+        indices = self.transition_indices
+        sources = np.append(self.initial_state, self.states[indices])[:-1]
+
+        return [
+            (time, self.state_names[source], self.state_names[destination])
+            for time, source, destination in zip(
+                self.timestamps[indices].tolist(),
+                sources.tolist(),
+                self.states[indices].tolist(),
+            )
+        ]
+
+    @property
+    def visits(self) -> tuple[npt.NDArray[np.intp], npt.NDArray[np.double]]:
+        """
+        State and time of entry of every visit of a state, the first one being
+        the initial state, entered at the first sample.
+        """
+        indices = self.transition_indices
+        states = np.append(self.initial_state, self.states[indices])
+        times = np.append(self.timestamps[:1], self.timestamps[indices])
+        return states, times
+
+    @property
+    def dwell_times(self) -> tuple[npt.NDArray[np.intp], npt.NDArray[np.double]]:
+        """
+        State and duration of every complete visit, i.e. all but the last one,
+        which the log ends in.
+        """
+        states, times = self.visits
+        return states[:-1], np.diff(times)
+
+    def dwell_statistics(self) -> dict[str, dict[str, float]]:
+        """
+        Returns the number of complete visits of every state and the mean,
+        standard deviation, minimum, maximum and total of their durations.
+        """
+        states, durations = self.dwell_times
+        statistics = {}
+
+        for index, name in enumerate(self.state_names):
+            dwell = durations[states == index]
+            statistics[name] = {
+                "count": len(dwell),
+                "mean": float(dwell.mean()) if len(dwell) else np.nan,
+                "std": float(dwell.std()) if len(dwell) else np.nan,
+                "min": float(dwell.min()) if len(dwell) else np.nan,
+                "max": float(dwell.max()) if len(dwell) else np.nan,
+                "total": float(dwell.sum()),
+            }
+
+        return statistics
+
+    @property
+    def state_sequence(self) -> list[str]:
+        """Name of every visited state, in order."""
+        return [self.state_names[state] for state in self.visits[0].tolist()]
+
+
+class LogSample(SimpleNamespace):
+    """
+    Stand-in for the OpenSourceLeg object passed to the transition criteria of
+    a replayed StateMachine. Every attribute path, e.g. "knee.output_position",
+    is set to the value of its column at every sample.
+    """
+
+    def __init__(self, paths: Sequence[str]) -> None:
+        super().__init__(log=logging.getLogger(__name__))
+        self._setters: list[tuple[Any, str]] = []
+
+        for path in paths:
+            *containers, attribute = path.split(".")
+            container: Any = self
+
+            for name in containers:
+                if not hasattr(container, name):
+                    setattr(container, name, SimpleNamespace())
+                container = getattr(container, name)
+
+            setattr(container, attribute, np.nan)
+            self._setters.append((container, attribute))
+
+    def __repr__(self) -> str:
+        return f"LogSample"
+
+    def set(self, row: Sequence[float]) -> None:
+        for (container, attribute), value in zip(self._setters, row):
+            setattr(container, attribute, value)
+
+
+class LogReplay:
+    """
+    Replays recorded logs through state machines.
+
+    Args:
+        log (str | np.ndarray): Path of a CSV or binary log, or a structured array as returned by read_log
+        time_column (str): Column holding the time of every sample in seconds, e.g. "OSL:timestamp"
+        frequency (float): Sampling frequency of the log, used when there is no time column. Defaults to None.
+    """
+
+    def __init__(
+        self,
+        log: Union[str, np.ndarray],
+        time_column: Optional[str] = None,
+        frequency: Optional[float] = None,
+    ) -> None:
+        self._log: np.ndarray = read_log(log) if isinstance(log, str) else log
+
+        if time_column is not None:
+            self._timestamps = np.asarray(self._log[time_column], dtype=np.double)
+        elif frequency is not None:
+            self._timestamps = np.arange(len(self._log)) / frequency
+        else:
+            raise ValueError("Either a time column or a frequency is required.")
+
+    def __repr__(self) -> str:
+        return f"LogReplay"
+
+    def __len__(self) -> int:
+        return len(self._log)
+
+    def trace(self, columns: Sequence[str]) -> npt.NDArray[np.double]:
+        """
+        Returns the given columns of the log as a (T, columns) array.
+
+        Args:
+            columns (Sequence[str]): Names of the columns
+        """
+        trace = np.empty((len(self._log), len(columns)), dtype=np.double)
+
+        for i, column in enumerate(columns):
+            trace[:, i] = self._log[column]
+
+        return trace
+
+    def run(
+        self,
+        fsm: FiniteStateMachine,
+        columns: Optional[Mapping[str, str]] = None,
+        parameters: Any = None,
+    ) -> ReplayResult:
+        """
+        Runs a state machine from its initial state over the log.
+
+        A TableStateMachine is run in batch over the whole log, without calling
+        the state callbacks. A StateMachine is started and updated once per
+        sample, its criteria getting a LogSample instead of the osl. Its states
+        are given a SimulatedClock set to the timestamps of the log meanwhile,
+        so that the time spent in a state (and spoofing) follows the recording,
+        and get their own clocks back afterwards. The shared CLOCK is left
+        untouched.
+
+        Args:
+            fsm (StateMachine | TableStateMachine): State machine to replay
+            columns (Mapping[str, str]): Column of every signal of a TableStateMachine, or of every attribute path read by the criteria of a StateMachine. Defaults to the signals of the table, with the same names as the columns.
+            parameters (Any): Stored in the result. Defaults to None.
+
+        Returns:
+            ReplayResult: States after every sample
+        """
+        if isinstance(fsm, TableStateMachine):
+            if columns is None:
+                columns = {signal: signal for signal in fsm.signals}
+
+            trace = self.trace(columns=[columns[signal] for signal in fsm.signals])
+            initial_state = fsm.states.index(fsm.initial_state.name)
+
+            return ReplayResult(
+                states=fsm.run(trace=trace),
+                state_names=fsm.states,
+                timestamps=self._timestamps,
+                initial_state=initial_state,
+                parameters=parameters,
+            )
+
+        return self._run_state_machine(
+            fsm=fsm, columns=columns or {}, parameters=parameters
+        )
+
+    def _run_state_machine(
+        self, fsm: StateMachine, columns: Mapping[str, str], parameters: Any
+    ) -> ReplayResult:
+        sample = LogSample(paths=list(columns))
+        rows = self.trace(columns=list(columns.values())).tolist()
+        times = np.round(self._timestamps * 1e9).astype(np.int64).tolist()
+        index = {name: i for i, name in enumerate(fsm.states)}
+        states = np.empty(len(rows), dtype=np.intp)
+
+        clock = SimulatedClock()
+
+        with fsm.attached(osl=sample, clock=clock):
+            clock.set_ns(time_ns=times[0] if times else 0)
+            fsm.start()
+            initial_state = index[fsm.current_state.name]
+
+            for i, (now, row) in enumerate(zip(times, rows)):
+                clock.set_ns(time_ns=now)
+                sample.set(row=row)
+                fsm.update()
+                states[i] = index[fsm.current_state.name]
+
+        return ReplayResult(
+            states=states,
+            state_names=fsm.states,
+            timestamps=self._timestamps,
+            initial_state=initial_state,
+            parameters=parameters,
+        )
+
+    def sweep(
+        self,
+        build: Callable[[Any], FiniteStateMachine],
+        parameters: Sequence[Any],
+        columns: Optional[Mapping[str, str]] = None,
+        processes: Optional[int] = None,
+    ) -> list[ReplayResult]:
+        """
+        Replays the state machines built from many sets of parameters, e.g.
+        transition thresholds, in a pool of processes.
+
+        The log is sent once to every process. The build function and the
+        parameters must be picklable, i.e. build must be defined at the top
+        level of a module.
+
+        Args:
+            build (Callable[[Any], FiniteStateMachine]): Builds a state machine from a set of parameters
+            parameters (Sequence[Any]): Sets of parameters
+            columns (Mapping[str, str]): See run. Defaults to None.
+            processes (int): Number of processes. Defaults to None (one per CPU). With 1, the sets are replayed in this process.
+
+        Returns:
+            list[ReplayResult]: Result of every set, in order, with its parameters
+        """
+        if processes == 1:
+            return [
+                self.run(fsm=build(p), columns=columns, parameters=p)
+                for p in parameters
+            ]
+
+        processes = processes or os.cpu_count() or 1
+
+        with ProcessPoolExecutor(
+            max_workers=processes, initializer=_initialize_worker, initargs=(self,)
+        ) as executor:
+            return list(
+                executor.map(
+                    _replay_in_worker,
+                    [(build, p, columns) for p in parameters],
+                    chunksize=max(1, len(parameters) // (4 * processes)),
+                )
+            )
+
+    @property
+    def log(self) -> np.ndarray:
+        return self._log
+
+    @property
+    def columns(self) -> list[str]:
+        return list(self._log.dtype.names)
+
+    @property
+    def timestamps(self) -> npt.NDArray[np.double]:
+        return self._timestamps
+
+
+_worker_replay: Optional[LogReplay] = None
+
+
+def _initialize_worker(replay: LogReplay) -> None:
+    global _worker_replay
+    _worker_replay = replay
+
+
+def _replay_in_worker(task: tuple[Callable[[Any], Any], Any, Any]) -> ReplayResult:
+    build, parameters, columns = task
+    assert _worker_replay is not None
+    return _worker_replay.run(
+        fsm=build(parameters), columns=columns, parameters=parameters
+    )
+
+
+if __name__ == "__main__":
+    pass
@@ -1,11 +1,13 @@
 #!/usr/bin/python3
 # A simple and scalable Finite State Machine module
 
-from typing import Any, Callable, List, Optional
+from typing import Any, Callable, Iterator, List, Optional
 
-import time
+from contextlib import contextmanager
 from dataclasses import dataclass, field
 
+from ..tools.clock import CLOCK, Clock
+
 """
 The state_machine module provides classes for implementing a finite state machine (FSM).
 It includes the State, Idle, Event, Transition, FromToTransition, and StateMachine classes.
@@ -36,13 +38,19 @@ class State:
         ankle_damping (float): Ankle damping in Nm/rad/sec
         ankle_equilibrium_angle (float): Ankle equilibrium angle
         minimum_time_in_state (float): Minimum time spent in the state in seconds. Default: 2.0
+        clock (Clock): Clock the time spent in the state is measured with. Default: the shared CLOCK
 
     Note:
         The knee and ankle impedance parameters are only used if the
         corresponding joint is active. You can also set custom data
         using the `set_custom_data` method.
+
+        A state added to a StateMachine created with a clock uses the clock
+        of the state machine instead.
     """
 
+    _clock: Clock = CLOCK
+
     def __init__(
         self,
         name: str = "state",
@@ -55,6 +63,7 @@ class State:
         ankle_damping: float = 0.0,
         ankle_equilibrium_angle: float = 0.0,
         minimum_time_in_state: float = 2.0,
+        clock: Optional[Clock] = None,
     ) -> None:
 
         self._name: str = name
@@ -74,6 +83,7 @@ class State:
         self._time_entered: float = 0.0
         self._time_exited: float = 0.0
         self._min_time_in_state: float = minimum_time_in_state
+        self._clock = clock if clock is not None else CLOCK
 
         # Callbacks
         self._entry_callbacks: list[Callable[[Any], None]] = []
@@ -172,12 +182,12 @@ class State:
         self._exit_callbacks.append(callback)
 
     def start(self, data: Any) -> None:
-        self._time_entered = time.time()
+        self._time_entered = self._clock.now()
         for c in self._entry_callbacks:
             c(data)
 
     def stop(self, data: Any) -> None:
-        self._time_exited = time.time()
+        self._time_exited = self._clock.now()
         for c in self._exit_callbacks:
             c(data)
 
@@ -243,12 +253,20 @@ class State:
 
     @property
     def current_time_in_state(self) -> float:
-        return time.time() - self._time_entered
+        return self._clock.now() - self._time_entered
 
     @property
     def time_spent_in_state(self) -> float:
         return self._time_exited - self._time_entered
 
+    @property
+    def clock(self) -> Clock:
+        return self._clock
+
+    @clock.setter
+    def clock(self, clock: Clock) -> None:
+        self._clock = clock
+
 
 class Idle(State):
     def __init__(self) -> None:
@@ -395,6 +413,12 @@ class StateMachine:
         check the criteria for transitioning but will instead transition after the
         minimum time spent in state has elapsed. This is useful for testing.
         Defaults to False.
+    clock : Clock, optional
+        Clock the time spent in every state is measured with, e.g. a
+        SimulatedClock to replay or simulate long sequences faster than real
+        time. It replaces the clock of every state added to the state machine.
+        Defaults to None (each state keeps its own clock, the shared CLOCK
+        unless given another one).
 
     Attributes
     ----------
@@ -406,11 +430,20 @@ class StateMachine:
         Whether or not the state machine is spoofing the state transitions.
     """
 
-    def __init__(self, osl=None, spoof: bool = False) -> None:
+    def __init__(
+        self, osl=None, spoof: bool = False, clock: Optional[Clock] = None
+    ) -> None:
         # State Machine Variables
+        self._clock: Optional[Clock] = clock
         self._states: list[State] = []
         self._events: list[Event] = []
         self._transitions: list[FromToTransition] = []
+
+        # Transitions leaving every state, in the order they were added. Keyed
+        # by state name, and by the id of every known state object for an
+        # identity lookup on each tick. Both keys share the same lists.
+        self._transitions_by_name: dict[str, list[FromToTransition]] = {}
+        self._transitions_by_id: dict[int, list[FromToTransition]] = {}
         self._exit_callback: Optional[Callable[[Idle, Any], None]] = None
         self._exit_state: State = Idle()
         self.add_state(state=self._exit_state)
@@ -439,7 +472,11 @@ class StateMachine:
         if state in self._states:
             raise ValueError("State already exists.")
 
+        if self._clock is not None:
+            state.clock = self._clock
+
         self._states.append(state)
+        self._index_state(state=state)
 
         if initial_state:
             self._initial_state = state
@@ -479,31 +516,57 @@ class StateMachine:
                 event=event, source=source, destination=destination, callback=callback
             )
             self._transitions.append(transition)
+            self._index_state(state=source).append(transition)
+            self._index_state(state=destination)
 
         return transition
 
-    def update(self, data: Any = None) -> None:
-        validity = False
+    def _index_state(self, state: State) -> list[FromToTransition]:
+        """Returns the transitions leaving a state, indexing the state object."""
+        transitions = self._transitions_by_name.setdefault(state.name, [])
+        self._transitions_by_id[id(state)] = transitions
+        return transitions
 
-        if not (self._initial_state or self._current_state):
-            raise ValueError("OSL isn't active.")
+    def transitions_from(self, state: State) -> list[FromToTransition]:
+        """
+        Returns the transitions leaving a state, in the order they were added.
+        States are matched by identity first, then by name.
+
+        Parameters
+        ----------
+        state : State
+            The source state.
+        """
+        transitions = self._transitions_by_id.get(id(state))
 
-        for transition in self._transitions:
-            if transition.source_state == self._current_state:
-                self._current_state = transition(self._osl, spoof=self.is_spoofing)
+        if transitions is None:
+            transitions = self._transitions_by_name.get(state.name, [])
 
-                if isinstance(self._current_state, Idle) and not self._exited:
-                    self._exited = True
+        return transitions
 
-                    if self._exit_callback:
-                        self._exit_callback(self._current_state, data)
+    def update(self, data: Any = None) -> None:
+        """
+        Evaluates the first transition leaving the current state, in the order
+        the transitions were added, which is looked up in the index instead of
+        scanning every transition.
+        """
+        if not (self._initial_state or self._current_state):
+            raise ValueError("OSL isn't active.")
 
-                validity = True
-                break
+        transitions = self.transitions_from(state=self._current_state)
 
-        if not validity:
+        if not transitions:
             assert self._osl is not None
             self._osl.log.debug(f"Event isn't valid at {self._current_state.name}")
+            return
+
+        self._current_state = transitions[0](self._osl, spoof=self.is_spoofing)
+
+        if isinstance(self._current_state, Idle) and not self._exited:
+            self._exited = True
+
+            if self._exit_callback:
+                self._exit_callback(self._current_state, data)
 
     def start(self, data: Any = None) -> None:
         if not self._initial_state:
@@ -530,6 +593,38 @@ class StateMachine:
     def spoof(self, spoof: bool) -> None:
         self._spoof = spoof
 
+    @contextmanager
+    def attached(
+        self, osl: Any, clock: Optional[Clock] = None
+    ) -> Iterator["StateMachine"]:
+        """
+        Temporarily runs the state machine on another osl object and, optionally,
+        another clock, e.g. to replay a log. The osl object, the clock of the
+        state machine and the clock of every state are restored on exit.
+
+        Parameters
+        ----------
+        osl : Any
+            The object passed to the transitions while attached.
+        clock : Clock, optional
+            The clock of the state machine and of every state while attached.
+            Defaults to None (the clocks are left unchanged).
+        """
+        previous_osl, previous_clock = self._osl, self._clock
+        state_clocks = [state.clock for state in self._states]
+        self._osl = osl
+
+        if clock is not None:
+            self.clock = clock
+
+        try:
+            yield self
+        finally:
+            self._osl, self._clock = previous_osl, previous_clock
+
+            for state, state_clock in zip(self._states, state_clocks):
+                state.clock = state_clock
+
     @property
     def current_state(self):
         if self._current_state is None:
@@ -545,6 +640,26 @@ class StateMachine:
     def is_spoofing(self):
         return self._spoof
 
+    @property
+    def osl(self) -> Any:
+        """The object passed to the transitions, usually the OpenSourceLeg."""
+        return self._osl
+
+    @osl.setter
+    def osl(self, osl: Any) -> None:
+        self._osl = osl
+
+    @property
+    def clock(self) -> Clock:
+        """Clock of the state machine, the shared CLOCK if none was given."""
+        return self._clock if self._clock is not None else CLOCK
+
+    @clock.setter
+    def clock(self, clock: Clock) -> None:
+        self._clock = clock
+        for state in self._states:
+            state.clock = clock
+
 
 if __name__ == "__main__":
     pass
@@ -0,0 +1,445 @@
+#!/usr/bin/python3
+# A table-driven Finite State Machine, compiled to NumPy arrays
+
+from typing import Any, Mapping, Optional, Sequence, Union
+
+from dataclasses import dataclass
+
+import numpy as np
+import numpy.typing as npt
+
+from .state_machine import State
+
+"""
+The table_state_machine module provides a finite state machine whose transition
+guards are threshold comparisons over a named vector of signals, e.g. the knee
+angle or the vertical force, instead of Python callbacks.
+
+The machine is lowered to arrays: for every state, the destinations of the
+transitions leaving it, and the signal index, threshold and comparison of every
+condition of their guards. A whole recorded trace of signals can then be
+segmented into states in one batch, with the guards of every state evaluated
+over many samples in a few vectorized operations. A live tick walks the same
+table for the current state only, which for a few conditions is cheaper
+without NumPy.
+
+Usage:
+1. Create a `TableStateMachine` with the names of the signals the guards use.
+2. Add the `State` objects with `add_state`, as for the `StateMachine`.
+3. Add transitions with `add_transition`, with a guard made of `Threshold`
+   conditions that must all hold. For an "or", add one transition per term.
+4. Call `start`, then `update` with the signals of every tick.
+5. Use `run` to get the state at every sample of a recorded (T, signals) trace.
+"""
+
+COMPARISONS = ("<", "<=", ">", ">=")
+
+
+@dataclass(frozen=True)
+class Threshold:
+    """
+    Condition comparing a signal to a threshold, e.g. Threshold("fz", "<", -200).
+
+    Args:
+        signal (str): Name of the signal
+        comparison (str): One of "<", "<=", ">", ">="
+        value (float): Threshold
+    """
+
+    signal: str
+    comparison: str
+    value: float
+
+    def __post_init__(self) -> None:
+        if self.comparison not in COMPARISONS:
+            raise ValueError(
+                f"Invalid comparison: {self.comparison}, expected one of {COMPARISONS}"
+            )
+
+
+class TableStateMachine:
+    """
+    Finite state machine with threshold guards, evaluated with NumPy.
+
+    Every transition has a guard made of conditions that must all hold. On each
+    tick, the transitions leaving the current state are tried in the order they
+    were added, and the first one whose guard holds is taken. Unlike the
+    StateMachine, which only evaluates the first transition leaving a state,
+    several transitions can leave the same state.
+
+    Parameters
+    ----------
+    signals : Sequence[str]
+        Names of the signals, in the order of the vectors passed to update and run.
+
+    Attributes
+    ----------
+    current_state : State
+        The current state of the state machine.
+    states : list[str]
+        The names of the states in the state machine.
+    """
+
+    def __init__(self, signals: Sequence[str]) -> None:
+        if len(set(signals)) != len(signals):
+            raise ValueError("Signal names must be unique.")
+
+        self._signals: list[str] = list(signals)
+        self._signal_index: dict[str, int] = {
+            name: i for i, name in enumerate(self._signals)
+        }
+
+        self._states: list[State] = []
+        self._state_index: dict[str, int] = {}
+        self._transitions: list[tuple[int, int, tuple[Threshold, ...]]] = []
+        self._initial_state: int = 0
+        self._current_state: int = 0
+        self._compiled: bool = False
+
+    def __repr__(self) -> str:
+        return f"TableStateMachine"
+
+    def add_state(self, state: State, initial_state: bool = False) -> None:
+        """
+        Add a state to the state machine.
+
+        Parameters
+        ----------
+        state : State
+            The state to be added.
+        initial_state : bool, optional
+            Whether the state is the initial state, by default False
+        """
+        if state.name in self._state_index:
+            raise ValueError("State already exists.")
+
+        self._state_index[state.name] = len(self._states)
+        self._states.append(state)
+
+        if initial_state:
+            self._initial_state = self._current_state = len(self._states) - 1
+
+        self._compiled = False
+
+    def add_transition(
+        self, source: State, destination: State, guard: Sequence[Threshold] = ()
+    ) -> int:
+        """
+        Add a transition to the state machine.
+
+        Parameters
+        ----------
+        source : State
+            The source state.
+        destination : State
+            The destination state.
+        guard : Sequence[Threshold], optional
+            Conditions that must all hold to take the transition, by default
+            none (always taken).
+
+        Returns
+        -------
+        int
+            The index of the transition.
+        """
+        for condition in guard:
+            if condition.signal not in self._signal_index:
+                raise ValueError(f"Unknown signal: {condition.signal}")
+
+        self._transitions.append(
+            (self._index_of(source), self._index_of(destination), tuple(guard))
+        )
+        self._compiled = False
+
+        return len(self._transitions) - 1
+
+    def _index_of(self, state: State) -> int:
+        try:
+            return self._state_index[state.name]
+        except KeyError:
+            raise ValueError(f"Unknown state: {state.name}") from None
+
+    def compile(self) -> None:
+        """
+        Lowers the state machine to arrays, padded to the largest number of
+        transitions leaving a state (K) and of conditions in a guard (L):
+
+        - destinations (S, K): destination of every transition, -1 for padding
+        - conditions (S, K, L): index of the signal of every condition
+        - signs, bounds (S, K, L): every condition is rewritten as
+          sign * signal < bound. "x > t" becomes "-x < -t", and the inclusive
+          comparisons use the next float after the threshold as the bound.
+        - always (S, K): whether a transition has an empty guard
+
+        Guards shorter than L repeat their last condition, and the padding
+        transitions get conditions that never hold (0 * signal < -inf).
+
+        The same rows are also kept as lists of (destination, conditions) per
+        state for update: with the handful of conditions leaving a state, a
+        NumPy call costs more than comparing them one by one.
+        Called by update and run when the state machine changed.
+        """
+        number_of_states = len(self._states)
+        leaving: list[list[int]] = [[] for _ in range(number_of_states)]
+        for index, (source, _, _) in enumerate(self._transitions):
+            leaving[source].append(index)
+
+        shape = (
+            number_of_states,
+            max([len(indices) for indices in leaving] + [1]),
+            max([len(guard) for _, _, guard in self._transitions] + [1]),
+        )
+
+        self._destinations = np.full(shape[:2], -1, dtype=np.intp)
+        self._always = np.zeros(shape[:2], dtype=bool)
+        self._conditions = np.zeros(shape, dtype=np.intp)
+        self._signs = np.zeros(shape, dtype=np.double)
+        self._bounds = np.full(shape, -np.inf, dtype=np.double)
+        self._rows: list[list[tuple[int, list[tuple[int, float, float]]]]] = [
+            [] for _ in range(number_of_states)
+        ]
+
+        for source, indices in enumerate(leaving):
+            for j, index in enumerate(indices):
+                _, destination, guard = self._transitions[index]
+                self._destinations[source, j] = destination
+                self._always[source, j] = not guard
+                conditions = []
+
+                for i, condition in enumerate(guard):
+                    sign = -1.0 if condition.comparison in (">", ">=") else 1.0
+                    bound = sign * condition.value
+
+                    if condition.comparison in ("<=", ">="):
+                        bound = np.nextafter(bound, np.inf)
+
+                    self._conditions[source, j, i:] = self._signal_index[
+                        condition.signal
+                    ]
+                    self._signs[source, j, i:] = sign
+                    self._bounds[source, j, i:] = bound
+                    conditions.append(
+                        (self._signal_index[condition.signal], sign, float(bound))
+                    )
+
+                self._rows[source].append((destination, conditions))
+
+        # Every distinct condition, evaluated once per sample by next_states
+        operands = np.stack(
+            [self._conditions.ravel(), self._signs.ravel(), self._bounds.ravel()]
+        )
+        unique, inverse = np.unique(operands, axis=1, return_inverse=True)
+        self._unique_conditions = unique[0].astype(np.intp)
+        self._unique_signs = unique[1]
+        self._unique_bounds = unique[2]
+        self._condition_ids = inverse.reshape(shape)
+
+        self._compiled = True
+
+    def start(self, data: Any = None) -> None:
+        if not self._states:
+            raise ValueError("Initial state not set.")
+
+        if not self._compiled:
+            self.compile()
+
+        self._current_state = self._initial_state
+        self._states[self._current_state].start(data=data)
+
+    def update(
+        self, signals: Union[Sequence[float], np.ndarray], data: Any = None
+    ) -> State:
+        """
+        Takes the first transition leaving the current state whose guard holds,
+        calling the exit and entry callbacks of the states.
+
+        Parameters
+        ----------
+        signals : Sequence[float]
+            The value of every signal, in the order given to the constructor.
+            Lists are the fastest.
+        data : Any, optional
+            Passed on to the state callbacks, by default None
+
+        Returns
+        -------
+        State
+            The current state after the tick.
+        """
+        if not self._compiled:
+            self.compile()
+
+        source = self._current_state
+
+        for destination, conditions in self._rows[source]:
+            for index, sign, bound in conditions:
+                if not sign * signals[index] < bound:
+                    break
+            else:
+                self._current_state = destination
+                self._states[source].stop(data=data)
+                self._states[destination].start(data=data)
+                break
+
+        return self._states[self._current_state]
+
+    def vector(self, signals: Mapping[str, float]) -> npt.NDArray[np.double]:
+        """
+        Returns the signal vector of a mapping of signal names to values.
+
+        Parameters
+        ----------
+        signals : Mapping[str, float]
+            The value of every signal.
+        """
+        return np.array([signals[name] for name in self._signals], dtype=np.double)
+
+    def next_states(self, trace: np.ndarray) -> npt.NDArray[np.intp]:
+        """
+        Returns, for every sample of a trace and every state, the state the
+        machine would be in after that sample if it were in that state before it.
+
+        Parameters
+        ----------
+        trace : np.ndarray
+            Signals of shape (T, signals).
+
+        Returns
+        -------
+        np.ndarray
+            State indices of shape (T, S).
+        """
+        if not self._compiled:
+            self.compile()
+
+        trace = np.asarray(trace, dtype=np.double)
+        holds = (
+            trace[:, self._unique_conditions] * self._unique_signs
+            < self._unique_bounds
+        )
+
+        # Guards of shape (T, S, K), as the "and" of their conditions
+        guards = holds[:, self._condition_ids[..., 0]]
+        for i in range(1, self._condition_ids.shape[2]):
+            guards &= holds[:, self._condition_ids[..., i]]
+
+        guards |= self._always
+
+        # The first transition whose guard holds, or none
+        next_states = np.empty((len(trace), len(self._states)), dtype=np.intp)
+        next_states[:] = np.arange(len(self._states))
+        for j in reversed(range(self._destinations.shape[1])):
+            next_states = np.where(
+                guards[:, :, j], self._destinations[:, j], next_states
+            )
+
+        return next_states
+
+    def run(
+        self,
+        trace: np.ndarray,
+        initial_state: Optional[State] = None,
+        chunk_size: int = 4096,
+    ) -> npt.NDArray[np.intp]:
+        """
+        Runs the state machine over a recorded trace, without calling the
+        state callbacks or changing the current state.
+
+        All the guards of all the states are evaluated over a chunk of samples
+        at once, along with the next sample at which every state would be left
+        from every sample on. The states are then followed from one transition
+        to the next, at a cost per transition rather than per sample.
+
+        Parameters
+        ----------
+        trace : np.ndarray
+            Signals of shape (T, signals).
+        initial_state : State, optional
+            The state before the first sample, by default the initial state.
+        chunk_size : int, optional
+            Number of samples evaluated at once, by default 4096.
+
+        Returns
+        -------
+        np.ndarray
+            Index, in `states`, of the state after every sample, of shape (T,).
+        """
+        trace = np.asarray(trace, dtype=np.double)
+
+        if trace.ndim != 2 or trace.shape[1] != len(self._signals):
+            raise ValueError(f"Expected a trace of shape (T, {len(self._signals)})")
+
+        state = (
+            self._initial_state
+            if initial_state is None
+            else self._index_of(initial_state)
+        )
+        values: list[int] = []
+        ends: list[int] = []
+
+        for start in range(0, len(trace), chunk_size):
+            next_states = self.next_states(trace=trace[start : start + chunk_size])
+            length = len(next_states)
+
+            # First sample, from every sample on, at which every state is left
+            samples = np.arange(length)[:, None]
+            states = np.arange(next_states.shape[1])
+            leaving = np.where(next_states != states, samples, length)
+            leaving = np.minimum.accumulate(leaving[::-1], axis=0)[::-1]
+
+            t = 0
+            while t < length:
+                left = leaving.item(t, state)
+
+                if left == length:
+                    break
+
+                values.append(state)
+                ends.append(start + left)
+                state = next_states.item(left, state)
+                t = left + 1
+
+        values.append(state)
+        ends.append(len(trace))
+
+        return np.repeat(
+            np.array(values, dtype=np.intp), np.diff(np.array(ends), prepend=0)
+        )
+
+    @property
+    def current_state(self) -> State:
+        return self._states[self._current_state]
+
+    @property
+    def initial_state(self) -> State:
+        return self._states[self._initial_state]
+
+    @property
+    def states(self) -> list[str]:
+        return [state.name for state in self._states]
+
+    @property
+    def signals(self) -> list[str]:
+        return list(self._signals)
+
+    @property
+    def destinations(self) -> npt.NDArray[np.intp]:
+        """Destinations of the transitions leaving each state, (S, K), -1 if none."""
+        if not self._compiled:
+            self.compile()
+
+        return self._destinations
+
+    @property
+    def transition_matrix(self) -> npt.NDArray[np.bool_]:
+        """Whether a transition leads from a state (row) to another (column), (S, S)."""
+        matrix = np.zeros((len(self._states), len(self._states)), dtype=bool)
+
+        for source, destination, _ in self._transitions:
+            matrix[source, destination] = True
+
+        return matrix
+
+
+if __name__ == "__main__":
+    pass
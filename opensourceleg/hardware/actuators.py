@@ -1,6 +1,8 @@
-from typing import Any, Callable, Union, overload
+from typing import Any, Callable, Optional, Union, overload
 
 import ctypes
+import math
+import operator
 import os
 import time
 from ctypes import c_int
@@ -10,6 +12,8 @@ import flexsea.fx_enums as fxe
 import numpy as np
 from flexsea.device import Device
 
+from ..tools.acquisition import BackgroundReader
+from ..tools.clock import CLOCK
 from ..tools.logger import Logger
 from .thermal import ThermalModel
 
@@ -31,9 +35,19 @@ Usage Guide:
 
 1. Create an instance of `DephyActpack` with appropriate parameters (e.g., port, baud_rate, frequency).
 2. Start the actpack using the `start` method.
-3. Set the desired control mode using the `set_mode` method.
+3. Set the desired control mode using the `set_mode` method. By default it waits
+   for the actpack to settle; with `blocking=False` it returns right away and the
+   new mode is entered by a later `update` call (see `is_mode_ready`).
 4. Set gains for the selected control mode using methods like `set_position_gains`, `set_current_gains`, etc.
 5. Optionally, update the actpack using the `update` method to query the latest values.
+   Call `start_background_read` to read the actpack on a dedicated thread instead,
+   so that `update` only picks up the newest frame and never waits on the serial port.
+   Every frame is decoded once, in `update`, into engineering units. The sensor
+   properties (e.g. `motor_position`) then only look up the decoded values, and
+   `snapshot` returns all of them at once as a float64 array laid out as `FRAME_FIELDS`.
+   Motor commands and gains that match the last ones sent are skipped (see `command_cache`).
+   Call `set_command_coalescing(True)` to send at most one setpoint and one gains
+   packet per tick, when `flush_commands` is called.
 6. Stop the actpack using the `stop` method.
 
 """
@@ -106,6 +120,161 @@ DEFAULT_CURRENT_GAINS = Gains(kp=40, ki=400, kd=0, K=0, B=0, ff=128)
 
 DEFAULT_IMPEDANCE_GAINS = Gains(kp=40, ki=400, kd=0, K=200, B=400, ff=128)
 
+# Layout of the decoded actpack frame: (field, attribute of the raw frame, scale, truncated)
+# Truncated fields are converted to integer counts (rounded towards zero) before scaling.
+FRAME_SPEC: list[tuple[str, str, float, bool]] = [
+    ("battery_voltage", "batt_volt", 1.0, False),
+    ("battery_current", "batt_curr", 1.0, False),
+    ("motor_voltage", "mot_volt", 1.0, False),
+    ("motor_current", "mot_cur", 1.0, False),
+    ("motor_torque", "mot_cur", NM_PER_MILLIAMP, False),
+    ("motor_position", "mot_ang", RAD_PER_COUNT, True),
+    ("motor_encoder_counts", "mot_ang", 1.0, True),
+    ("motor_velocity", "mot_vel", RAD_PER_DEG, True),
+    ("motor_acceleration", "mot_acc", 1.0, False),
+    ("joint_position", "ank_ang", RAD_PER_COUNT, True),
+    ("joint_encoder_counts", "ank_ang", 1.0, True),
+    ("joint_velocity", "ank_vel", RAD_PER_COUNT, False),
+    ("case_temperature", "temperature", 1.0, False),
+    ("genvar_0", "genvar_0", 1.0, False),
+    ("genvar_1", "genvar_1", 1.0, False),
+    ("genvar_2", "genvar_2", 1.0, False),
+    ("genvar_3", "genvar_3", 1.0, False),
+    ("genvar_4", "genvar_4", 1.0, False),
+    ("genvar_5", "genvar_5", 1.0, False),
+    ("accelx", "accelx", M_PER_SEC_SQUARED_ACCLSB, False),
+    ("accely", "accely", M_PER_SEC_SQUARED_ACCLSB, False),
+    ("accelz", "accelz", M_PER_SEC_SQUARED_ACCLSB, False),
+    ("gyrox", "gyrox", RAD_PER_SEC_GYROLSB, False),
+    ("gyroy", "gyroy", RAD_PER_SEC_GYROLSB, False),
+    ("gyroz", "gyroz", RAD_PER_SEC_GYROLSB, False),
+]
+
+FRAME_FIELDS: tuple[str, ...] = tuple(spec[0] for spec in FRAME_SPEC)
+FRAME_INDEX: dict[str, int] = {field: i for i, field in enumerate(FRAME_FIELDS)}
+
+_FRAME_SOURCES = operator.attrgetter(*[spec[1] for spec in FRAME_SPEC])
+_FRAME_SCALE = np.array([spec[2] for spec in FRAME_SPEC], dtype=np.float64)
+_FRAME_TRUNCATED = tuple(i for i, spec in enumerate(FRAME_SPEC) if spec[3])
+
+_BATTERY_VOLTAGE = FRAME_INDEX["battery_voltage"]
+_BATTERY_CURRENT = FRAME_INDEX["battery_current"]
+_MOTOR_VOLTAGE = FRAME_INDEX["motor_voltage"]
+_MOTOR_CURRENT = FRAME_INDEX["motor_current"]
+_MOTOR_TORQUE = FRAME_INDEX["motor_torque"]
+_MOTOR_POSITION = FRAME_INDEX["motor_position"]
+_MOTOR_ENCODER_COUNTS = FRAME_INDEX["motor_encoder_counts"]
+_MOTOR_VELOCITY = FRAME_INDEX["motor_velocity"]
+_MOTOR_ACCELERATION = FRAME_INDEX["motor_acceleration"]
+_JOINT_POSITION = FRAME_INDEX["joint_position"]
+_JOINT_ENCODER_COUNTS = FRAME_INDEX["joint_encoder_counts"]
+_JOINT_VELOCITY = FRAME_INDEX["joint_velocity"]
+_CASE_TEMPERATURE = FRAME_INDEX["case_temperature"]
+_GENVARS = slice(FRAME_INDEX["genvar_0"], FRAME_INDEX["genvar_5"] + 1)
+_ACCELX = FRAME_INDEX["accelx"]
+_ACCELY = FRAME_INDEX["accely"]
+_ACCELZ = FRAME_INDEX["accelz"]
+_GYROX = FRAME_INDEX["gyrox"]
+_GYROY = FRAME_INDEX["gyroy"]
+_GYROZ = FRAME_INDEX["gyroz"]
+
+
+# Approximate size on the wire of the packets sent by flexsea, used to report the savings of the CommandCache
+MOTOR_COMMAND_PACKET_BYTES: int = 20
+GAINS_PACKET_BYTES: int = 32
+
+
+class CommandCache:
+    """
+    Remembers the last motor command and gains sent to an actpack, so that
+    sending the same values again can be skipped, and counts the packets and
+    bytes sent and skipped.
+
+    The cache must be invalidated whenever the state of the actpack may no
+    longer match it, e.g. when the control mode changes or the device is reopened.
+    """
+
+    def __init__(self) -> None:
+        self._command: Optional[tuple[int, int]] = None
+        self._gains: Optional[tuple[int, ...]] = None
+
+        self.sent_packets: int = 0
+        self.sent_bytes: int = 0
+        self.skipped_packets: int = 0
+        self.skipped_bytes: int = 0
+        self._start_time: float = CLOCK.read()
+
+    def __repr__(self) -> str:
+        return f"CommandCache"
+
+    def is_new_command(self, ctrl_mode: c_int, value: int) -> bool:
+        """
+        Returns True, and remembers the command, if it differs from the last
+        motor command sent. Counts it as skipped otherwise.
+        """
+        command = (getattr(ctrl_mode, "value", ctrl_mode), value)
+
+        if command == self._command:
+            self.skipped_packets += 1
+            self.skipped_bytes += MOTOR_COMMAND_PACKET_BYTES
+            return False
+
+        self._command = command
+        self.sent_packets += 1
+        self.sent_bytes += MOTOR_COMMAND_PACKET_BYTES
+        return True
+
+    def is_new_gains(self, gains: tuple[int, ...]) -> bool:
+        """
+        Returns True, and remembers the gains, if they differ from the last
+        gains sent. Counts them as skipped otherwise.
+        """
+        if gains == self._gains:
+            self.skipped_packets += 1
+            self.skipped_bytes += GAINS_PACKET_BYTES
+            return False
+
+        self._gains = gains
+        self.sent_packets += 1
+        self.sent_bytes += GAINS_PACKET_BYTES
+        return True
+
+    def record_command(self, ctrl_mode: c_int, value: int) -> None:
+        """
+        Remembers a motor command that was sent without asking the cache.
+        """
+        self._command = (getattr(ctrl_mode, "value", ctrl_mode), value)
+
+    def record_gains(self, gains: tuple[int, ...]) -> None:
+        """
+        Remembers gains that were sent without asking the cache.
+        """
+        self._gains = gains
+
+    def invalidate(self) -> None:
+        """
+        Forgets the last command and gains, so that the next ones are always sent.
+        """
+        self._command = None
+        self._gains = None
+
+    def reset_statistics(self) -> None:
+        self.sent_packets = 0
+        self.sent_bytes = 0
+        self.skipped_packets = 0
+        self.skipped_bytes = 0
+        self._start_time = CLOCK.read()
+
+    @property
+    def packets_saved_per_second(self) -> float:
+        """Average number of packets skipped per second since the statistics were reset."""
+        return self.skipped_packets / max(CLOCK.read() - self._start_time, 1e-9)
+
+    @property
+    def bytes_saved_per_second(self) -> float:
+        """Average number of bytes skipped per second since the statistics were reset."""
+        return self.skipped_bytes / max(CLOCK.read() - self._start_time, 1e-9)
+
 
 class ActpackMode:
     """
@@ -124,6 +293,7 @@ class ActpackMode:
         self._exit_callback: Callable[[], None] = lambda: None
 
         self._has_gains = False
+        self._settle_time: float = 0.1
 
     def __eq__(self, __o: object) -> bool:
         if isinstance(__o, ActpackMode):
@@ -156,6 +326,17 @@ class ActpackMode:
         """
         return self._has_gains
 
+    @property
+    def settle_time(self) -> float:
+        """
+        Time in seconds the actpack needs after leaving this mode before another
+        mode can be entered.
+
+        Returns:
+            float: Settle time in seconds
+        """
+        return self._settle_time
+
     def enter(self) -> None:
         """
         Calls the entry callback
@@ -170,13 +351,15 @@ class ActpackMode:
 
     def transition(self, to_state: "ActpackMode") -> None:
         """
-        Transition to another mode. Calls the exit callback of the current mode
-        and the entry callback of the new mode.
+        Transition to another mode. Calls the exit callback of the current mode,
+        waits for the actpack to settle, and calls the entry callback of the new mode.
+        See `DephyActpack.set_mode` for a transition that does not block.
 
         Args:
             to_state (ActpackMode): Mode to transition to
         """
         self.exit()
+        time.sleep(self.settle_time)
         to_state.enter()
 
     def _set_voltage(self, voltage: int) -> None:
@@ -210,10 +393,9 @@ class VoltageMode(ActpackMode):
     def _exit(self) -> None:
         self._device._log.debug(msg=f"[Actpack] Exiting Voltage mode.")
         self._set_voltage(voltage=0)
-        time.sleep(0.1)
 
     def _set_voltage(self, voltage: int) -> None:
-        self._device.send_motor_command(
+        self._device._send_motor_command(
             ctrl_mode=self.mode,
             value=voltage,
         )
@@ -224,6 +406,7 @@ class CurrentMode(ActpackMode):
         super().__init__(control_mode=CONTROL_MODE.current, device=device)
         self._entry_callback = self._entry
         self._exit_callback = self._exit
+        self._settle_time = 1 / device.frequency
 
     def _entry(self) -> None:
         self._device._log.debug(msg=f"[Actpack] Entering Current mode.")
@@ -235,8 +418,7 @@ class CurrentMode(ActpackMode):
 
     def _exit(self) -> None:
         self._device._log.debug(msg=f"[Actpack] Exiting Current mode.")
-        self._device.send_motor_command(ctrl_mode=CONTROL_MODE.voltage, value=0)
-        time.sleep(1 / self._device.frequency)
+        self._device._send_motor_command(ctrl_mode=CONTROL_MODE.voltage, value=0)
 
     def _set_gains(
         self,
@@ -249,7 +431,7 @@ class CurrentMode(ActpackMode):
         assert 0 <= ki <= 800, "ki must be between 0 and 800"
         assert 0 <= ff <= 128, "ff must be between 0 and 128"
 
-        self._device.set_gains(kp=kp, ki=ki, kd=0, k=0, b=0, ff=ff)
+        self._device._send_gains(kp=kp, ki=ki, kd=0, k=0, b=0, ff=ff)
         self._has_gains = True
 
     def _set_current(self, current: int) -> None:
@@ -258,7 +440,7 @@ class CurrentMode(ActpackMode):
         Args:
             current (int): _description_
         """
-        self._device.send_motor_command(
+        self._device._send_motor_command(
             ctrl_mode=self.mode,
             value=current,
         )
@@ -282,8 +464,7 @@ class PositionMode(ActpackMode):
 
     def _exit(self) -> None:
         self._device._log.debug(msg=f"[Actpack] Exiting Position mode.")
-        self._device.send_motor_command(ctrl_mode=CONTROL_MODE.voltage, value=0)
-        time.sleep(0.1)
+        self._device._send_motor_command(ctrl_mode=CONTROL_MODE.voltage, value=0)
 
     def _set_gains(
         self,
@@ -297,7 +478,7 @@ class PositionMode(ActpackMode):
         assert 0 <= ki <= 1000, "ki must be between 0 and 1000"
         assert 0 <= kd <= 1000, "kd must be between 0 and 1000"
 
-        self._device.set_gains(kp=kp, ki=ki, kd=kd, k=0, b=0, ff=ff)
+        self._device._send_gains(kp=kp, ki=ki, kd=kd, k=0, b=0, ff=ff)
         self._has_gains = True
 
     def _set_motor_position(self, counts: int) -> None:
@@ -306,7 +487,7 @@ class PositionMode(ActpackMode):
         Args:
             counts (int): position in counts
         """
-        self._device.send_motor_command(
+        self._device._send_motor_command(
             ctrl_mode=self.mode,
             value=counts,
         )
@@ -317,6 +498,7 @@ class ImpedanceMode(ActpackMode):
         super().__init__(control_mode=CONTROL_MODE.impedance, device=device)
         self._entry_callback = self._entry
         self._exit_callback = self._exit
+        self._settle_time = 1 / device.frequency
 
     def _entry(self) -> None:
         self._device._log.debug(msg=f"[Actpack] Entering Impedance mode.")
@@ -329,8 +511,7 @@ class ImpedanceMode(ActpackMode):
 
     def _exit(self) -> None:
         self._device._log.debug(msg=f"[Actpack] Exiting Impedance mode.")
-        self._device.send_motor_command(ctrl_mode=CONTROL_MODE.voltage, value=0)
-        time.sleep(1 / self._device.frequency)
+        self._device._send_motor_command(ctrl_mode=CONTROL_MODE.voltage, value=0)
 
     def _set_motor_position(self, counts: int) -> None:
         """Sets the motor position
@@ -338,7 +519,7 @@ class ImpedanceMode(ActpackMode):
         Args:
             counts (int): position in counts
         """
-        self._device.send_motor_command(
+        self._device._send_motor_command(
             ctrl_mode=self.mode,
             value=counts,
         )
@@ -358,7 +539,7 @@ class ImpedanceMode(ActpackMode):
         assert 0 <= K, "K must be greater than 0"
         assert 0 <= B, "B must be greater than 0"
 
-        self._device.set_gains(
+        self._device._send_gains(
             kp=int(kp), ki=int(ki), kd=int(0), k=int(K), b=int(B), ff=int(ff)
         )
         self._has_gains = True
@@ -406,6 +587,31 @@ class DephyActpack(Device):
         _type_: _description_
     """
 
+    _reader: Optional[BackgroundReader] = None
+    _reader_sequence: int = 0
+    _frame_timestamp: float = 0.0
+    _frame_state_time: Optional[int] = None
+    _frame_sequence: int = 0
+
+    _blocking_transitions: bool = True
+    _mode_transition: Optional[tuple[ActpackMode, float]] = None
+
+    _command_cache: Optional[CommandCache] = None
+    _coalesce_commands: bool = False
+    _pending_command: Optional[tuple[c_int, int]] = None
+    _pending_gains: Optional[dict[str, int]] = None
+
+    _thermal_decimation: int = 1
+    _thermal_ticks: int = 0
+    _thermal_current_squared: float = 0.0
+
+    _raw_frame: Any = None
+    _frame: Optional[np.ndarray] = None
+    _genvars: Optional[np.ndarray] = None
+    _frame_values: list[float] = [0.0] * len(FRAME_FIELDS)
+    _motor_zero_position: float = 0.0
+    _joint_zero_position: float = 0.0
+
     def __init__(
         self,
         name: str = "DephyActpack",
@@ -415,6 +621,8 @@ class DephyActpack(Device):
         logger: Logger = Logger(),
         debug_level: int = 0,
         dephy_log: bool = False,
+        blocking_transitions: bool = True,
+        thermal_decimation: int = 1,
     ) -> None:
         """
         Initializes the Actpack class
@@ -427,11 +635,14 @@ class DephyActpack(Device):
             logger (Logger): _description_
             debug_level (int): _description_. Defaults to 0.
             dephy_log (bool): _description_. Defaults to False.
+            blocking_transitions (bool): Whether set_mode waits for the actpack to settle by default. Defaults to True.
+            thermal_decimation (int): Number of updates per step of the thermal model. Above 1, the model is stepped with the RMS current of the last updates and its exact discretization. Defaults to 1.
         """
         super().__init__(port=port, baud_rate=baud_rate)
         self._debug_level: int = debug_level
         self._dephy_log: bool = dephy_log
         self._frequency: int = frequency
+        self._blocking_transitions = blocking_transitions
         self._data: Any = None
         self._name: str = name
 
@@ -441,11 +652,13 @@ class DephyActpack(Device):
         self._motor_zero_position = 0.0
         self._joint_zero_position = 0.0
 
+        self._thermal_decimation = max(1, int(thermal_decimation))
         self._thermal_model: ThermalModel = ThermalModel(
             temp_limit_windings=80,
             soft_border_C_windings=10,
             temp_limit_case=70,
             soft_border_C_case=10,
+            integrator="euler" if self._thermal_decimation == 1 else "exact",
         )
         self._thermal_scale: float = 1.0
 
@@ -456,6 +669,67 @@ class DephyActpack(Device):
     def __repr__(self) -> str:
         return f"DephyActpack[{self._name}]"
 
+    @property
+    def _data(self) -> Any:
+        """Raw frame last read from the actpack, None if nothing was read yet."""
+        return self._raw_frame
+
+    @_data.setter
+    def _data(self, data: Any) -> None:
+        self._raw_frame = data
+        self._decode_frame()
+
+    def _decode_frame(self) -> None:
+        """
+        Decodes the raw frame into engineering units, once, in the preallocated
+        float64 frame array. The sensor properties index a list copy of this
+        array, which is cheaper to index from Python than the array itself.
+        """
+        if self._frame is None:
+            self._frame = np.zeros(shape=len(FRAME_FIELDS), dtype=np.float64)
+            self._genvars = self._frame[_GENVARS]
+            self._genvars.flags.writeable = False
+
+        frame = self._frame
+
+        if self._raw_frame is None:
+            frame.fill(0.0)
+        else:
+            values = list(_FRAME_SOURCES(self._raw_frame))
+            values[_MOTOR_POSITION] -= self._motor_zero_position
+            values[_JOINT_POSITION] -= self._joint_zero_position
+
+            for i in _FRAME_TRUNCATED:
+                values[i] = math.trunc(values[i])
+
+            frame[:] = values
+            frame *= _FRAME_SCALE
+
+        self._frame_values = frame.tolist()
+
+    def snapshot(self, out: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Returns the whole decoded frame as a float64 array, in the order given by
+        FRAME_FIELDS (use FRAME_INDEX to look up a field). All values are in the same
+        units as the corresponding properties.
+
+        Args:
+            out (np.ndarray): Preallocated array of shape (len(FRAME_FIELDS),) to copy the frame into. Defaults to None.
+
+        Returns:
+            np.ndarray: The decoded frame
+        """
+        if self._frame is None:
+            self._decode_frame()
+
+        assert self._frame is not None
+
+        if out is None:
+            return self._frame.copy()
+
+        np.copyto(out, self._frame)
+        return out
+
     def start(self) -> None:
         try:
             self.open(
@@ -472,48 +746,288 @@ class DephyActpack(Device):
 
         time.sleep(0.1)
         self._data = self.read()
+        self.command_cache.invalidate()
         self._mode.enter()
 
     def stop(self) -> None:
-        self.set_mode(mode=self.control_modes.voltage)
+        self.stop_background_read()
+        self.set_mode(mode=self.control_modes.voltage, blocking=True)
         self.set_voltage(value=0)
 
         time.sleep(0.1)
         self.close()
 
+    def start_background_read(self) -> None:
+        """
+        Starts a dedicated thread that reads the actpack at its streaming frequency
+        and keeps the newest frame in a "latest sample" slot. Once started, `update`
+        no longer reads from the serial port and only swaps in the newest frame,
+        so a serial stall cannot delay the control loop.
+        Use `frame_age` and `dropped_frames` to check how fresh the data is.
+        """
+        if not self.is_streaming:
+            self._log.warning(
+                msg=f"[{self.__repr__()}] Please open() the device before starting the background read."
+            )
+            return
+
+        if self._reader is None:
+            self._reader = BackgroundReader(
+                read=self.read,
+                frequency=self._frequency,
+                name=f"{self._name}-reader",
+            )
+            self._reader_sequence = 0
+
+        self._reader.start()
+
+    def stop_background_read(self) -> None:
+        """
+        Stops the background reader thread. Subsequent calls to `update` read
+        from the actpack synchronously again.
+        """
+        if self._reader is not None:
+            self._reader.stop()
+            self._reader = None
+
     def update(self) -> None:
         """
         Queries the latest values from the actpack.
-        Also updates thermal model.
+        If the background read is running, this swaps in the newest frame read by
+        the reader thread instead of reading from the actpack.
+        A frame that was already in use (the reader has not read a new one, or the
+        actpack streams slower than it is read and sent the same state again) is
+        skipped; `frame_sequence` only advances when a new frame is swapped in.
+        Also sends any command still staged by the command coalescing and updates
+        the thermal model, every `thermal_decimation` calls.
         """
         if self.is_streaming:
-            self._data = self.read()
-            self._thermal_model.T_c = self.case_temperature
-            self._thermal_scale = self._thermal_model.update_and_get_scale(
-                dt=(1 / self._frequency),
-                motor_current=self.motor_current,
-            )
+            self.flush_commands()
+
+            if self._reader is not None:
+                frame = self._reader.take()
+
+                if (
+                    frame is not None
+                    and self._reader.buffer.sequence != self._reader_sequence
+                ):
+                    self._data = frame
+                    self._frame_timestamp = self._reader.buffer.timestamp
+                    self._reader_sequence = self._reader.buffer.sequence
+                    self._frame_sequence += 1
+            else:
+                frame = self.read()
+                # Frames without an actpack timestamp are assumed to be new
+                state_time = getattr(frame, "state_time", None)
+
+                if state_time is None or state_time != self._frame_state_time:
+                    self._data = frame
+                    self._frame_timestamp = CLOCK.now()
+                    self._frame_state_time = state_time
+                    self._frame_sequence += 1
+
+            if (
+                self._mode_transition is not None
+                and CLOCK.read() >= self._mode_transition[1]
+            ):
+                self._complete_mode_transition()
+
+            if self._thermal_decimation == 1:
+                self._thermal_model.T_c = self.case_temperature
+                self._thermal_scale = self._thermal_model.update_and_get_scale(
+                    dt=(1 / self._frequency),
+                    motor_current=self.motor_current,
+                )
+            else:
+                self._update_thermal_model()
         else:
             self._log.warning(
                 msg=f"[{self.__repr__()}] Please open() the device before streaming data."
             )
 
-    def set_mode(self, mode: ActpackMode) -> None:
-        if type(mode) in [VoltageMode, CurrentMode, PositionMode, ImpedanceMode]:
-            self._mode.transition(to_state=mode)
-            self._mode = mode
+    def _update_thermal_model(self) -> None:
+        self._thermal_current_squared += self.motor_current**2
+        self._thermal_ticks += 1
 
-        else:
+        if self._thermal_ticks < self._thermal_decimation:
+            return
+
+        self._thermal_model.T_c = self.case_temperature
+        self._thermal_scale = self._thermal_model.update_and_get_scale(
+            dt=self._thermal_ticks / self._frequency,
+            motor_current=math.sqrt(
+                self._thermal_current_squared / self._thermal_ticks
+            ),
+        )
+        self._thermal_ticks = 0
+        self._thermal_current_squared = 0.0
+
+    def set_mode(self, mode: ActpackMode, blocking: Optional[bool] = None) -> None:
+        """
+        Switches the actpack to another control mode. The current mode is exited
+        right away, then the actpack needs the settle time of that mode before the
+        new mode can be entered.
+
+        A blocking transition sleeps through the settle time. A non-blocking one
+        returns immediately and leaves the transition pending: the new mode is
+        entered by the first call to `update` after the settle time, and
+        `is_mode_ready` is False until then. Setpoints and gains set for the new
+        mode while the transition is pending are held back and sent right after it
+        is entered.
+
+        Args:
+            mode (ActpackMode): Mode to switch to
+            blocking (bool): Whether to wait for the actpack to settle. Defaults to None, which uses the blocking_transitions setting of the actpack.
+        """
+        if type(mode) not in [VoltageMode, CurrentMode, PositionMode, ImpedanceMode]:
             self._log.warning(msg=f"[{self.__repr__()}] Mode {mode} not found")
             return
 
+        if blocking is None:
+            blocking = self._blocking_transitions
+
+        if self._mode_transition is None:
+            self.flush_commands()
+            self.command_cache.invalidate()
+            self._mode.exit()
+            settled_time = CLOCK.read() + self._mode.settle_time
+        else:
+            # The previous mode was already exited, only the target changes
+            settled_time = self._mode_transition[1]
+            self._pending_command = None
+            self._pending_gains = None
+
+        self._mode = mode
+        self._mode_transition = (mode, settled_time)
+
+        if blocking:
+            time.sleep(max(0.0, settled_time - CLOCK.read()))
+            self._complete_mode_transition()
+
+    def wait_for_mode(self, timeout: float = 1.0) -> bool:
+        """
+        Blocks until a pending mode transition is complete, without the need to
+        call `update`.
+
+        Args:
+            timeout (float): Maximum time to wait in seconds. Defaults to 1.0.
+
+        Returns:
+            bool: True if the mode is ready, False if the timeout expired first
+        """
+        if self._mode_transition is None:
+            return True
+
+        remaining = self._mode_transition[1] - CLOCK.read()
+
+        if remaining > timeout:
+            time.sleep(max(0.0, timeout))
+            self._log.warning(
+                msg=f"[{self.__repr__()}] Timed out waiting for {self._mode_transition[0]} to be ready."
+            )
+            return False
+
+        time.sleep(max(0.0, remaining))
+        self._complete_mode_transition()
+        return True
+
+    def _complete_mode_transition(self) -> None:
+        if self._mode_transition is None:
+            return
+
+        mode = self._mode_transition[0]
+        self._mode_transition = None
+
+        # Commands set during the transition are sent after the entry commands
+        command, self._pending_command = self._pending_command, None
+        gains, self._pending_gains = self._pending_gains, None
+
+        mode.enter()
+
+        self._pending_command = command
+        self._pending_gains = gains
+
+        if not self._coalesce_commands:
+            self.flush_commands()
+
+    def set_command_coalescing(self, enabled: bool) -> None:
+        """
+        When enabled, the motor commands and gains are not sent right away but
+        staged, and only the last of each is sent when `flush_commands` is called,
+        i.e. at most one gains packet and one setpoint packet per tick.
+        Call `flush_commands` at the end of every tick; `update` also flushes
+        whatever is still staged before reading the actpack.
+
+        Args:
+            enabled (bool): Whether to coalesce the commands
+        """
+        if not enabled:
+            self.flush_commands()
+
+        self._coalesce_commands = enabled
+
+    def flush_commands(self) -> None:
+        """
+        Sends the gains and then the motor command staged since the last flush,
+        skipping those that match what was last sent. Does nothing while a mode
+        transition is pending.
+        """
+        if self._mode_transition is not None:
+            return
+
+        if self._pending_gains is not None:
+            gains, self._pending_gains = self._pending_gains, None
+            self._write_gains(**gains)
+
+        if self._pending_command is not None:
+            (ctrl_mode, value), self._pending_command = self._pending_command, None
+            self._write_motor_command(ctrl_mode=ctrl_mode, value=value)
+
+    def _send_motor_command(self, ctrl_mode: c_int, value: int) -> None:
+        if self._coalesce_commands or self._mode_transition is not None:
+            self._pending_command = (ctrl_mode, value)
+        else:
+            self._write_motor_command(ctrl_mode=ctrl_mode, value=value)
+
+    def _send_gains(self, kp: int, ki: int, kd: int, k: int, b: int, ff: int) -> None:
+        if self._coalesce_commands or self._mode_transition is not None:
+            self._pending_gains = {"kp": kp, "ki": ki, "kd": kd, "k": k, "b": b, "ff": ff}
+        else:
+            self._write_gains(kp=kp, ki=ki, kd=kd, k=k, b=b, ff=ff)
+
+    def _write_motor_command(self, ctrl_mode: c_int, value: int) -> None:
+        if self.command_cache.is_new_command(ctrl_mode=ctrl_mode, value=value):
+            self.send_motor_command(ctrl_mode=ctrl_mode, value=value)
+
+    def _write_gains(self, kp: int, ki: int, kd: int, k: int, b: int, ff: int) -> None:
+        if self.command_cache.is_new_gains(gains=(kp, ki, kd, k, b, ff)):
+            self.set_gains(kp=kp, ki=ki, kd=kd, k=k, b=b, ff=ff)
+
+    def send_motor_command(self, ctrl_mode: c_int, value: int) -> None:
+        """
+        Sends a motor command straight to the actpack, and records it in the
+        command cache so that the cache does not go stale.
+        """
+        self.command_cache.record_command(ctrl_mode=ctrl_mode, value=value)
+        super().send_motor_command(ctrl_mode=ctrl_mode, value=value)
+
+    def set_gains(self, kp: int, ki: int, kd: int, k: int, b: int, ff: int) -> None:
+        """
+        Sends gains straight to the actpack, and records them in the command
+        cache so that the cache does not go stale.
+        """
+        self.command_cache.record_gains(gains=(kp, ki, kd, k, b, ff))
+        super().set_gains(kp=kp, ki=ki, kd=kd, k=k, b=b, ff=ff)
+
     def set_motor_zero_position(self, position: float) -> None:
         """Sets motor zero position in counts"""
         self._motor_zero_position = position
+        self._decode_frame()
 
     def set_joint_zero_position(self, position: float) -> None:
         """Sets joint zero position in counts"""
         self._joint_zero_position = position
+        self._decode_frame()
 
     def set_position_gains(
         self,
@@ -664,10 +1178,66 @@ class DephyActpack(Device):
     def frequency(self) -> int:
         return self._frequency
 
+    @property
+    def command_cache(self) -> CommandCache:
+        """
+        Last motor command and gains sent to the actpack, along with the number
+        of packets and bytes sent and saved by skipping redundant ones.
+        """
+        if self._command_cache is None:
+            self._command_cache = CommandCache()
+
+        return self._command_cache
+
+    @property
+    def is_coalescing_commands(self) -> bool:
+        return self._coalesce_commands
+
+    @property
+    def is_background_reading(self) -> bool:
+        """Indicates if the actpack is being read by a background thread."""
+        return self._reader is not None and self._reader.is_running
+
+    @property
+    def frame_age(self) -> float:
+        """
+        Time in seconds since the frame currently in use was read from the actpack,
+        or, for a frame read by update itself, since the start of its tick.
+        Infinite if no frame was read yet.
+        """
+        if self._frame_timestamp == 0.0:
+            return float("inf")
+
+        return CLOCK.read() - self._frame_timestamp
+
+    @property
+    def frame_sequence(self) -> int:
+        """
+        Number of distinct frames swapped in by `update`. It does not change when
+        update finds no new frame, compare it across calls to skip stale data.
+        """
+        return self._frame_sequence
+
+    @property
+    def dropped_frames(self) -> int:
+        """
+        Number of frames read by the background thread that were replaced by a
+        newer one before `update` could use them.
+        """
+        if self._reader is not None:
+            return self._reader.dropped
+
+        return 0
+
     @property
     def mode(self) -> ActpackMode:
         return self._mode
 
+    @property
+    def is_mode_ready(self) -> bool:
+        """Indicates if the current mode was entered, i.e. no mode transition is pending."""
+        return self._mode_transition is None
+
     @property
     def motor_zero_position(self) -> float:
         """Motor encoder offset in radians."""
@@ -681,34 +1251,22 @@ class DephyActpack(Device):
     @property
     def battery_voltage(self) -> float:
         """Battery voltage in mV."""
-        if self._data is not None:
-            return float(self._data.batt_volt)
-        else:
-            return 0.0
+        return self._frame_values[_BATTERY_VOLTAGE]
 
     @property
     def battery_current(self) -> float:
         """Battery current in mA."""
-        if self._data is not None:
-            return float(self._data.batt_curr)
-        else:
-            return 0.0
+        return self._frame_values[_BATTERY_CURRENT]
 
     @property
     def motor_voltage(self) -> float:
         """Q-axis motor voltage in mV."""
-        if self._data is not None:
-            return float(self._data.mot_volt)
-        else:
-            return 0.0
+        return self._frame_values[_MOTOR_VOLTAGE]
 
     @property
     def motor_current(self) -> float:
         """Q-axis motor current in mA."""
-        if self._data is not None:
-            return float(self._data.mot_cur)
-        else:
-            return 0.0
+        return self._frame_values[_MOTOR_CURRENT]
 
     @property
     def motor_torque(self) -> float:
@@ -716,72 +1274,47 @@ class DephyActpack(Device):
         Torque at motor output in Nm.
         This is calculated using the motor current and torque constant.
         """
-        if self._data is not None:
-            return float(self._data.mot_cur * NM_PER_MILLIAMP)
-        else:
-            return 0.0
+        return self._frame_values[_MOTOR_TORQUE]
 
     @property
     def motor_position(self) -> float:
         """Angle of the motor in radians."""
-        if self._data is not None:
-            return float(
-                int(self._data.mot_ang - self.motor_zero_position) * RAD_PER_COUNT
-            )
-        else:
-            return 0.0
+        return self._frame_values[_MOTOR_POSITION]
 
     @property
     def motor_encoder_counts(self) -> int:
         """Raw reading from motor encoder in counts."""
-        return int(self._data.mot_ang)
+        return int(self._frame_values[_MOTOR_ENCODER_COUNTS])
 
     @property
     def joint_encoder_counts(self) -> int:
         """Raw reading from joint encoder in counts."""
-        return int(self._data.ank_ang)
+        return int(self._frame_values[_JOINT_ENCODER_COUNTS])
 
     @property
     def motor_velocity(self) -> float:
         """Motor velocity in rad/s."""
-        if self._data is not None:
-            return int(self._data.mot_vel) * RAD_PER_DEG
-        else:
-            return 0.0
+        return self._frame_values[_MOTOR_VELOCITY]
 
     @property
     def motor_acceleration(self) -> float:
         """Motor acceleration in rad/s^2."""
-        if self._data is not None:
-            return float(self._data.mot_acc)
-        else:
-            return 0.0
+        return self._frame_values[_MOTOR_ACCELERATION]
 
     @property
     def joint_position(self) -> float:
         """Measured angle from the joint encoder in radians."""
-        if self._data is not None:
-            return float(
-                int(self._data.ank_ang - self._joint_zero_position) * RAD_PER_COUNT
-            )
-        else:
-            return 0.0
+        return self._frame_values[_JOINT_POSITION]
 
     @property
     def joint_velocity(self) -> float:
         """Measured velocity from the joint encoder in rad/s."""
-        if self._data is not None:
-            return float(self._data.ank_vel * RAD_PER_COUNT)
-        else:
-            return 0.0
+        return self._frame_values[_JOINT_VELOCITY]
 
     @property
     def case_temperature(self) -> float:
         """Case temperature in celsius."""
-        if self._data is not None:
-            return float(self._data.temperature)
-        else:
-            return 0.0
+        return self._frame_values[_CASE_TEMPERATURE]
 
     @property
     def winding_temperature(self) -> float:
@@ -789,7 +1322,7 @@ class DephyActpack(Device):
         ESTIMATED temperature of the windings in celsius.
         This is calculated based on the thermal model using motor current.
         """
-        if self._data is not None:
+        if self._raw_frame is not None:
             return float(self._thermal_model.T_w)
         else:
             return 0.0
@@ -804,21 +1337,16 @@ class DephyActpack(Device):
         return float(self._thermal_scale)
 
     @property
-    def genvars(self):
-        """Dephy's 'genvars' object."""
-        if self._data is not None:
-            return np.array(
-                object=[
-                    self._data.genvar_0,
-                    self._data.genvar_1,
-                    self._data.genvar_2,
-                    self._data.genvar_3,
-                    self._data.genvar_4,
-                    self._data.genvar_5,
-                ]
-            )
-        else:
-            return np.zeros(shape=6)
+    def genvars(self) -> np.ndarray:
+        """
+        Dephy's 'genvars' object, as a read-only view of the decoded frame. It
+        is overwritten by the next update, copy it to keep it.
+        """
+        if self._genvars is None:
+            self._decode_frame()
+
+        assert self._genvars is not None
+        return self._genvars
 
     @property
     def accelx(self) -> float:
@@ -826,10 +1354,7 @@ class DephyActpack(Device):
         Acceleration in x direction in m/s^2.
         Measured using actpack's onboard IMU.
         """
-        if self._data is not None:
-            return float(self._data.accelx * M_PER_SEC_SQUARED_ACCLSB)
-        else:
-            return 0.0
+        return self._frame_values[_ACCELX]
 
     @property
     def accely(self) -> float:
@@ -837,10 +1362,7 @@ class DephyActpack(Device):
         Acceleration in y direction in m/s^2.
         Measured using actpack's onboard IMU.
         """
-        if self._data is not None:
-            return float(self._data.accely * M_PER_SEC_SQUARED_ACCLSB)
-        else:
-            return 0.0
+        return self._frame_values[_ACCELY]
 
     @property
     def accelz(self) -> float:
@@ -848,10 +1370,7 @@ class DephyActpack(Device):
         Acceleration in z direction in m/s^2.
         Measured using actpack's onboard IMU.
         """
-        if self._data is not None:
-            return float(self._data.accelz * M_PER_SEC_SQUARED_ACCLSB)
-        else:
-            return 0.0
+        return self._frame_values[_ACCELZ]
 
     @property
     def gyrox(self) -> float:
@@ -859,10 +1378,7 @@ class DephyActpack(Device):
         Angular velocity in x direction in rad/s.
         Measured using actpack's onboard IMU.
         """
-        if self._data is not None:
-            return float(self._data.gyrox * RAD_PER_SEC_GYROLSB)
-        else:
-            return 0.0
+        return self._frame_values[_GYROX]
 
     @property
     def gyroy(self) -> float:
@@ -870,10 +1386,7 @@ class DephyActpack(Device):
         Angular velocity in y direction in rad/s.
         Measured using actpack's onboard IMU.
         """
-        if self._data is not None:
-            return float(self._data.gyroy * RAD_PER_SEC_GYROLSB)
-        else:
-            return 0.0
+        return self._frame_values[_GYROY]
 
     @property
     def gyroz(self) -> float:
@@ -881,10 +1394,7 @@ class DephyActpack(Device):
         Angular velocity in z direction in rad/s.
         Measured using actpack's onboard IMU.
         """
-        if self._data is not None:
-            return float(self._data.gyroz * RAD_PER_SEC_GYROLSB)
-        else:
-            return 0.0
+        return self._frame_values[_GYROZ]
 
 
 # MockDephyActpack class definition for testing
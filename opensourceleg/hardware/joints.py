@@ -3,6 +3,7 @@ import time
 
 import numpy as np
 
+from ..tools.clock import CLOCK
 from ..tools.logger import Logger
 from .actuators import (
     MAX_CASE_TEMPERATURE,
@@ -44,6 +45,8 @@ class Joint(DephyActpack):
         logger: Logger = Logger(),
         debug_level: int = 0,
         dephy_log: bool = False,
+        blocking_transitions: bool = True,
+        thermal_decimation: int = 1,
     ) -> None:
 
         super().__init__(
@@ -54,6 +57,8 @@ class Joint(DephyActpack):
             logger=logger,
             debug_level=debug_level,
             dephy_log=dephy_log,
+            blocking_transitions=blocking_transitions,
+            thermal_decimation=thermal_decimation,
         )
 
         self._gear_ratio: float = gear_ratio
@@ -101,7 +106,7 @@ class Joint(DephyActpack):
         CURRENT_THRESHOLD = 5000
         VELOCITY_THRESHOLD = 0.001
 
-        self.set_mode(mode=self.control_modes.voltage)
+        self.set_mode(mode=self.control_modes.voltage, blocking=True)
         homing_direction = -1.0
 
         self.set_voltage(
@@ -173,7 +178,7 @@ class Joint(DephyActpack):
             )
             return
 
-        self.set_mode(mode=self.control_modes.current)
+        self.set_mode(mode=self.control_modes.current, blocking=True)
         self.set_current_gains()
         time.sleep(0.1)
         self.set_current_gains()
@@ -189,10 +194,10 @@ class Joint(DephyActpack):
             msg=f"[{self.__repr__()}] Please manually move the joint numerous times through its full range of motion for 10 seconds. \nPress any key to continue."
         )
 
-        _start_time: float = time.time()
+        _start_time: float = CLOCK.read()
 
         try:
-            while time.time() - _start_time < 10:
+            while CLOCK.read() - _start_time < 10:
                 self.update()
                 _joint_position_array.append(self.joint_position)
                 _output_position_array.append(self.output_position)
@@ -1,13 +1,21 @@
-from typing import Union
+from typing import Optional, Union
 
+import math
 import os
+import threading
 import time
+from bisect import bisect_right
+from collections import deque
 from dataclasses import dataclass
+from functools import lru_cache
 
 import numpy as np
 import numpy.typing as npt
 from smbus2 import SMBus
 
+from ..tools.acquisition import BackgroundReader
+from ..tools.clock import CLOCK
+from ..tools.filters import MedianFilter
 from ..tools.logger import Logger
 from .joints import Joint
 
@@ -20,12 +28,19 @@ Usage Guide:
 
 1. For load cell management, create an instance of `Loadcell` with appropriate parameters (e.g., dephy_mode, joint, amp_gain, exc, loadcell_matrix, logger).
 2. Optionally, initialize the load cell zero using the `initialize` method.
+   Pass method="median" (or "mean") and a confidence_interval to take a
+   statistical zero that stops as soon as it is precise enough.
 3. Update the load cell data using the `update` method.
 4. Access force and moment values using the properties like `fx`, `fy`, `fz`, `mx`, `my`, `mz`.
 5. For testing, use the mocked classes `MockStrainAmp` and `MockLoadcell` as needed.
 6. For IMU data, create an instance of `IMULordMicrostrain` with appropriate parameters (e.g., port, baud_rate, timeout, sample_rate).
 7. Start and stop streaming using the `start_streaming` and `stop_streaming` methods.
-8. Obtain IMU data using the `get_data` method.
+8. Obtain IMU data using the `get_data` method, which only decodes the newest packet.
+   Use `get_batch` instead to decode every packet received since the last call
+   into an (N, 11) array laid out as `IMU_FIELDS`, and `start_reader` to keep
+   draining the IMU buffer on a dedicated thread between control ticks.
+9. To run the IMU code without the IMU, pass a `ReplayTransport` built from a
+   recording (see `ReplayTransport.save`) as the transport of `IMULordMicrostrain`.
 
 """
 
@@ -52,14 +67,25 @@ class StrainAmp:
     MEM_R_CH6_H = 18
     MEM_R_CH6_L = 19
 
-    def __init__(self, bus, I2C_addr=0x66) -> None:
-        """Create a strainamp object, to talk over I2C"""
+    _filter: Optional[MedianFilter] = None
+
+    def __init__(
+        self,
+        bus,
+        I2C_addr=0x66,
+        filter_window: int = 3,
+        outlier_threshold: Optional[float] = None,
+    ) -> None:
+        """Create a strainamp object, to talk over I2C.
+        The samples are median filtered over filter_window samples, see MedianFilter.
+        """
         self._SMBus: Union[SMBus, MockSMBus] = SMBus(bus)
         time.sleep(1)
         self.bus = bus
         self.addr = I2C_addr
-        self.genvars = np.zeros((3, 6))
-        self.indx = 0
+        self._filter = MedianFilter(
+            channels=6, window=filter_window, outlier_threshold=outlier_threshold
+        )
         self.is_streaming = True
         self.data: list[int] = []
         self.failed_reads = 0
@@ -88,13 +114,39 @@ class StrainAmp:
         # unpack them and return as nparray
         return self._unpack_compressed_strain(self.data)
 
-    def update(self):
+    def update(self, out: Optional[np.ndarray] = None):
         """Called to update data of strain amp. Also returns data.
         Data is median filtered (max one sample delay) to avoid i2c issues.
+        The filtered sample is written into `out` if given, see MedianFilter.update.
         """
-        self.genvars[self.indx, :] = self._read_compressed_strain()
-        self.indx: int = (self.indx + 1) % 3
-        return np.median(a=self.genvars, axis=0)
+        return self.median_filter.update(
+            self._read_compressed_strain().tolist(), out=out
+        )
+
+    @property
+    def median_filter(self) -> MedianFilter:
+        if self._filter is None:
+            self._filter = MedianFilter(channels=6, window=3)
+
+        return self._filter
+
+    @property
+    def genvars(self) -> np.ndarray:
+        """Copy of the window of the median filter, one row per sample."""
+        return self.median_filter.window
+
+    @genvars.setter
+    def genvars(self, value) -> None:
+        self.median_filter.load(samples=value, index=self.median_filter.index)
+
+    @property
+    def indx(self) -> int:
+        """Row of genvars the next sample is written to."""
+        return self.median_filter.index
+
+    @indx.setter
+    def indx(self, value: int) -> None:
+        self.median_filter.load(samples=self.median_filter.window, index=value)
 
     @staticmethod
     def _unpack_uncompressed_strain(data):
@@ -125,9 +177,17 @@ class StrainAmp:
     def strain_data_to_wrench(
         unpacked_strain, loadcell_matrix, loadcell_zero, exc=5, gain=125
     ):
-        """Converts strain values between 0 and 4095 to a wrench in N and Nm"""
-        loadcell_signed = (unpacked_strain - 2048) / 4095 * exc
+        """Converts strain values between 0 and 4095 to a wrench in N and Nm.
+        Takes one sample of shape (6,) or a recording of shape (T, 6), which is
+        converted in one vectorized pass and returned with the same shape.
+        """
+        loadcell_signed = (np.asarray(unpacked_strain) - 2048) / 4095 * exc
         loadcell_coupled = loadcell_signed * 1000 / (exc * gain)
+
+        if loadcell_coupled.ndim == 2:
+            wrench = loadcell_coupled.dot(np.transpose(a=loadcell_matrix))
+            return wrench - np.reshape(loadcell_zero, (1, 6))
+
         return np.reshape(
             np.transpose(a=loadcell_matrix.dot(np.transpose(a=loadcell_coupled)))
             - loadcell_zero,
@@ -136,13 +196,73 @@ class StrainAmp:
 
     @staticmethod
     def wrench_to_strain_data(measurement, loadcell_matrix, exc=5, gain=125):
-        """Wrench in N and Nm to the strain values that would give that wrench"""
-        loadcell_coupled = (np.linalg.inv(loadcell_matrix)).dot(measurement)
+        """Wrench in N and Nm to the strain values that would give that wrench.
+        A measurement of shape (T, 6) is treated as T wrenches and converted in
+        one vectorized pass. The inverse of the loadcell matrix is cached.
+        """
+        inverse = _inverse(loadcell_matrix)
+        measurement = np.asarray(measurement)
+
+        if measurement.ndim == 2:
+            loadcell_coupled = measurement.dot(inverse.T)
+        else:
+            loadcell_coupled = inverse.dot(measurement)
+
         loadcell_signed = loadcell_coupled * (exc * gain) / 1000
         return ((loadcell_signed / exc) * 4095 + 2048).round(0).astype(int)
 
+    @staticmethod
+    def recalibrate_wrench(
+        wrench, old_matrix, new_matrix, old_zero=None, new_zero=None
+    ):
+        """Re-applies a new loadcell matrix to wrenches computed with an old one.
+        The raw strain is recovered through the (cached) inverse of the old
+        matrix, so a whole recording of shape (T, 6) is converted with a single
+        6x6 matrix product:
+        new_matrix @ inv(old_matrix) @ (wrench + old_zero) - new_zero.
+        """
+        wrench = np.asarray(wrench, dtype=np.double)
+        transform = np.asarray(new_matrix).dot(_inverse(old_matrix))
+
+        if old_zero is not None:
+            wrench = wrench + np.reshape(old_zero, (6,))
+
+        recalibrated = wrench.dot(transform.T)
+
+        if new_zero is not None:
+            recalibrated -= np.reshape(new_zero, (6,))
+
+        return recalibrated
+
+
+@lru_cache(maxsize=8)
+def _cached_inverse(matrix: bytes, shape: tuple[int, ...]) -> np.ndarray:
+    inverse = np.linalg.inv(np.frombuffer(matrix, dtype=np.double).reshape(shape))
+    inverse.flags.writeable = False
+    return inverse
+
+
+def _inverse(matrix) -> np.ndarray:
+    """Inverse of a loadcell matrix, cached by value."""
+    matrix = np.ascontiguousarray(matrix, dtype=np.double)
+    return _cached_inverse(matrix.tobytes(), matrix.shape)
+
+
+ZEROING_METHODS = ("filter", "mean", "median")
+ZEROING_MIN_SAMPLES = 50
+
 
 class Loadcell:
+    _zero_noise: Optional[npt.NDArray[np.double]] = None
+    _zero_samples: int = 0
+
+    _calibration_matrix: Optional[npt.NDArray[np.double]] = None
+    _calibration_offset: Optional[npt.NDArray[np.double]] = None
+    _calibration_bias: Optional[npt.NDArray[np.double]] = None
+    _wrench: Optional[npt.NDArray[np.double]] = None
+    _wrench_row: Optional[npt.NDArray[np.double]] = None
+    _strain: Optional[npt.NDArray[np.double]] = None
+
     def __init__(
         self,
         dephy_mode: bool = False,
@@ -182,47 +302,102 @@ class Loadcell:
 
     def reset(self):
         self._zeroed = False
-        self._loadcell_zero = np.zeros(shape=(1, 6), dtype=np.double)
+        self.loadcell_zero = np.zeros(shape=(1, 6), dtype=np.double)
 
     def update(self, loadcell_zero=None) -> None:
         """
         Queries the loadcell for the latest data.
         Latest data can then be accessed via properties, e.g. loadcell.Fx.
+
+        The raw counts are turned into a wrench with a single affine transform,
+        wrench = K @ counts + bias, written into a buffer that is reused on every
+        call. K and bias fold the ADC offset and range, the excitation, the
+        amplifier gain, the loadcell matrix and the zero. They are computed on the
+        first update and recomputed whenever the gain, the matrix or the zero is
+        assigned through its property, and by reset and initialize. Arrays
+        modified in place must be assigned again to take effect.
+
+        The counts are read without allocating memory in Dephy mode, through
+        the genvars view of the joint. Otherwise, the strainamp median filter
+        writes them into a reused buffer (the I2C read of the strainamp still
+        allocates a few small objects).
         """
         if self._is_dephy:
-            loadcell_signed = (
-                (self._joint.genvars - self._offset) / self._adc_range * self._exc
-            )
+            strain = self._joint.genvars
         else:
             assert self._lc is not None
-            loadcell_signed = (
-                (self._lc.update() - self._offset) / self._adc_range * self._exc
-            )
 
-        loadcell_coupled = loadcell_signed * 1000 / (self._exc * self._amp_gain)
+            if self._strain is None:
+                self._strain = np.zeros(shape=6, dtype=np.double)
 
-        if loadcell_zero is None:
+            strain = self._lc.update(out=self._strain)
 
-            self._loadcell_data = (
-                np.transpose(
-                    a=self._loadcell_matrix.dot(b=np.transpose(a=loadcell_coupled))
-                )
-                - self._loadcell_zero
-            )
+        if self._calibration_matrix is None:
+            self._calibrate()
+
+        wrench = self._wrench_row
+        np.dot(self._calibration_matrix, strain, out=wrench)
 
+        if loadcell_zero is None:
+            np.add(wrench, self._calibration_bias, out=wrench)
         else:
-            self._loadcell_data = (
-                np.transpose(
-                    a=self._loadcell_matrix.dot(b=np.transpose(a=loadcell_coupled))
-                )
-                - loadcell_zero
-            )
+            np.add(wrench, self._calibration_offset, out=wrench)
+            np.subtract(wrench, np.ravel(loadcell_zero), out=wrench)
+
+        self._loadcell_data = self._wrench
+
+    def _calibrate(self) -> None:
+        """
+        Folds the conversion from raw counts to wrench into K and bias.
+        The excitation cancels out of the conversion, and the ADC offset and
+        range are constants of the strain amplifier.
+        """
+        scale = 1000 / (self._adc_range * self._amp_gain)
+        matrix = np.asarray(self._loadcell_matrix, dtype=np.double)
+
+        self._calibration_matrix = np.ascontiguousarray(matrix * scale)
+        self._calibration_offset = -self._calibration_matrix.dot(
+            np.full(shape=6, fill_value=self._offset)
+        )
+        self._calibration_bias = self._calibration_offset - np.ravel(
+            self._loadcell_zero
+        )
+
+        if self._wrench is None:
+            self._wrench = np.zeros(shape=(1, 6), dtype=np.double)
+            self._wrench_row = self._wrench[0]
 
-    def initialize(self, number_of_iterations: int = 2000) -> None:
+    def initialize(
+        self,
+        number_of_iterations: int = 2000,
+        method: str = "filter",
+        confidence_interval: Optional[float] = None,
+        frequency: float = 500,
+        background: bool = False,
+    ) -> None:
         """
         Obtains the initial loadcell reading (aka) loadcell_zero.
         This is automatically subtraced off for subsequent calls of the update method.
+
+        The "filter" method folds the readings together with an exponential filter.
+        The "mean" and "median" methods collect up to number_of_iterations raw
+        samples into a buffer, convert them all at once and take their mean or
+        median. They also report the noise of every channel (see `zero_noise`)
+        and can stop early once the 95% confidence interval of the zero is
+        narrower than confidence_interval on every channel.
+
+        Args:
+            number_of_iterations (int): Number of readings. Defaults to 2000.
+            method (str): One of "filter", "mean" or "median". Defaults to "filter".
+            confidence_interval (float): Half-width in N and Nm of the 95% confidence interval at which the statistical methods stop early. Defaults to None (never).
+            frequency (float): Rate in Hz at which the statistical methods collect samples. Defaults to 500.
+            background (bool): Collect the samples of the statistical methods with a background reader thread. Defaults to False.
         """
+        if method not in ZEROING_METHODS:
+            raise ValueError(
+                f"Invalid zeroing method: {method}, expected one of {ZEROING_METHODS}"
+            )
+
         ideal_loadcell_zero = np.zeros(shape=(1, 6), dtype=np.double)
 
         if not self._zeroed:
@@ -243,13 +418,24 @@ class Loadcell:
             else:
                 self.update()
 
-            self._loadcell_zero = self._loadcell_data
+            if method != "filter":
+                self._statistical_zero(
+                    number_of_samples=number_of_iterations,
+                    method=method,
+                    confidence_interval=confidence_interval,
+                    frequency=frequency,
+                    background=background,
+                )
+                return
+
+            self._loadcell_zero = self._loadcell_data.copy()
 
             for _ in range(number_of_iterations):
                 self.update(ideal_loadcell_zero)
                 loadcell_offset = self._loadcell_data
                 self._loadcell_zero = (loadcell_offset + self._loadcell_zero) / 2.0
 
+            self._calibrate()
             self._zeroed = True
             self._log.info(f"[{self.__repr__()}] Zeroing routine complete.")
 
@@ -260,7 +446,166 @@ class Loadcell:
             == "y"
         ):
             self.reset()
-            self.initialize()
+            self.initialize(
+                number_of_iterations=number_of_iterations,
+                method=method,
+                confidence_interval=confidence_interval,
+                frequency=frequency,
+                background=background,
+            )
+
+    def _read_strain(self):
+        """
+        Reads one new sample of raw strain counts, or None in Dephy mode if the
+        actpack has not sent a new frame since the last one.
+
+        The samples of the strainamp bypass its median filter: filtered
+        samples are correlated and the first ones are biased by the zeros of
+        its window, while the confidence interval of the zero assumes
+        independent samples.
+        """
+        if self._is_dephy:
+            frame_sequence = self._joint.frame_sequence
+            self._joint.update()
+
+            if self._joint.frame_sequence == frame_sequence:
+                return None
+
+            # A copy, as the samples can be handed over by a background reader
+            return self._joint.genvars.copy()
+
+        assert self._lc is not None
+        return self._lc._read_compressed_strain()
+
+    def _statistical_zero(
+        self,
+        number_of_samples: int,
+        method: str,
+        confidence_interval: Optional[float],
+        frequency: float,
+        background: bool,
+    ) -> None:
+        samples = np.empty(shape=(number_of_samples, 6), dtype=np.double)
+        count = 0
+        reader: Optional[BackgroundReader] = None
+
+        if background:
+            reader = BackgroundReader(
+                read=self._read_strain, frequency=frequency, name="loadcell_zero"
+            )
+            reader.start()
+
+        try:
+            while count < number_of_samples:
+                if reader is None:
+                    sample = self._read_strain()
+                    time.sleep(1 / frequency)
+
+                    if sample is None:
+                        continue
+
+                    samples[count] = sample
+                elif reader.buffer.is_fresh:
+                    samples[count] = reader.take()
+                else:
+                    if reader.last_error is not None:
+                        raise reader.last_error
+
+                    time.sleep(0.5 / frequency)
+                    continue
+
+                count += 1
+
+                if (
+                    confidence_interval is not None
+                    and count >= ZEROING_MIN_SAMPLES
+                    and count % ZEROING_MIN_SAMPLES == 0
+                    and self._zero_statistics(samples[:count], method)[2].max()
+                    <= confidence_interval
+                ):
+                    break
+        finally:
+            if reader is not None:
+                reader.stop()
+
+        zero, noise, half_width = self._zero_statistics(samples[:count], method)
+
+        self.loadcell_zero = np.reshape(zero, (1, 6))
+        self._zero_noise = noise
+        self._zero_samples = count
+        self._zeroed = True
+        self._log.info(
+            f"[{self.__repr__()}] Zeroing routine complete after {count} samples, "
+            f"noise: {np.array2string(noise, precision=3)}, "
+            f"95% confidence interval: +/- {half_width.max():.3f}"
+        )
+
+    def _zero_statistics(self, samples, method: str) -> tuple:
+        """
+        Converts raw strain samples to wrenches (without zero) in one pass and
+        returns the zero, the noise standard deviation and the half-width of
+        the 95% confidence interval of the zero, per channel.
+        """
+        self._calibrate()
+        wrenches = samples.dot(self._calibration_matrix.T) + self._calibration_offset
+
+        noise = wrenches.std(axis=0, ddof=1) if len(wrenches) > 1 else np.zeros(6)
+        half_width = 1.96 * noise / np.sqrt(len(wrenches))
+
+        if method == "median":
+            # The median of normal noise is sqrt(pi / 2) times less efficient
+            return np.median(wrenches, axis=0), noise, half_width * 1.2533
+
+        return wrenches.mean(axis=0), noise, half_width
+
+    @property
+    def amp_gain(self) -> float:
+        """Gain of the strain amplifier."""
+        return self._amp_gain
+
+    @amp_gain.setter
+    def amp_gain(self, value: float) -> None:
+        self._amp_gain = value
+        self._calibrate()
+
+    @property
+    def loadcell_matrix(self) -> npt.NDArray[np.double]:
+        """
+        6x6 matrix converting the amplified strain to a wrench. Modifying it in
+        place does not recalibrate the loadcell, assign it again instead.
+        """
+        return self._loadcell_matrix
+
+    @loadcell_matrix.setter
+    def loadcell_matrix(self, value: npt.NDArray[np.double]) -> None:
+        self._loadcell_matrix = value
+        self._calibrate()
+
+    @property
+    def loadcell_zero(self) -> npt.NDArray[np.double]:
+        """
+        Wrench subtracted off every reading, as a 1x6 array. Modifying it in
+        place does not recalibrate the loadcell, assign it again instead.
+        """
+        return self._loadcell_zero
+
+    @loadcell_zero.setter
+    def loadcell_zero(self, value: npt.NDArray[np.double]) -> None:
+        self._loadcell_zero = value
+        self._calibrate()
+
+    @property
+    def zero_noise(self) -> Optional[npt.NDArray[np.double]]:
+        """
+        Standard deviation of every channel (in N and Nm) measured by the last
+        statistical zeroing, None if there was none.
+        """
+        return self._zero_noise
+
+    @property
+    def zero_samples(self) -> int:
+        """Number of samples used by the last statistical zeroing."""
+        return self._zero_samples
 
     @property
     def is_zeroed(self) -> bool:
@@ -322,6 +667,8 @@ class Loadcell:
         Returns a vector of the latest loadcell data.
         [Fx, Fy, Fz, Mx, My, Mz]
         Forces in N, moments in Nm.
+        The vector is a view of a buffer that every update overwrites in place,
+        copy it to keep a reading across updates.
         """
         if self._loadcell_data is not None:
             return self._loadcell_data[0]
@@ -479,6 +826,332 @@ class IMUDataClass:
     imu_filter_gps_time_week_num: float = 0
 
 
+# Columns of the IMU batches, named after the IMUDataClass fields
+IMU_FIELDS = (
+    "angle_x",
+    "angle_y",
+    "angle_z",
+    "velocity_x",
+    "velocity_y",
+    "velocity_z",
+    "accel_x",
+    "accel_y",
+    "accel_z",
+    "imu_time_sta",
+    "imu_filter_gps_time_week_num",
+)
+
+# MSCL channel name of every column
+IMU_CHANNELS = {
+    "estRoll": 0,
+    "estPitch": 1,
+    "estYaw": 2,
+    "estAngularRateX": 3,
+    "estAngularRateY": 4,
+    "estAngularRateZ": 5,
+    "estLinearAccelX": 6,
+    "estLinearAccelY": 7,
+    "estLinearAccelZ": 8,
+    "estFilterGpsTimeTow": 9,
+    "estFilterGpsTimeWeekNum": 10,
+}
+
+
+class IMUTransport:
+    """
+    Source of the IMU packets read by IMULordMicrostrain.
+
+    The packets follow the MSCL MipDataPacket interface: `data()` returns data
+    points with `channelName()` and `as_float()`, and `collectedTimestamp()`
+    returns a timestamp with `nanoseconds()`.
+    """
+
+    def __repr__(self) -> str:
+        return f"IMUTransport"
+
+    def start(self) -> None:
+        """Starts streaming packets."""
+        raise NotImplementedError
+
+    def stop(self) -> None:
+        """Stops streaming packets."""
+        raise NotImplementedError
+
+    def read(self, timeout: int) -> list:
+        """
+        Returns the packets received since the last read, in order.
+
+        Args:
+            timeout (int): Maximum time in milliseconds to wait for a packet if none is pending.
+        """
+        raise NotImplementedError
+
+
+class MSCLTransport(IMUTransport):
+    """
+    Transport reading a Lord Microstrain IMU over a serial port with MSCL.
+    Configures the estimation filter channels and leaves the IMU idle.
+
+    Args:
+        port (str): Serial port of the IMU. Defaults to "/dev/ttyUSB0".
+        baud_rate (int): Baud rate of the serial port. Defaults to 921600.
+        sample_rate (int): Sample rate of every channel in Hz. Defaults to 100.
+    """
+
+    def __init__(
+        self, port=r"/dev/ttyUSB0", baud_rate=921600, sample_rate=100
+    ) -> None:
+        import sys
+
+        sys.path.append(r"/usr/share/python3-mscl/")
+        import mscl as ms
+
+        self.connection = ms.Connection.Serial(os.path.realpath(port), baud_rate)
+        self.node = ms.InertialNode(self.connection)
+        time.sleep(0.5)
+
+        # Configure data channels
+        channels = ms.MipChannels()
+        for field in (
+            ms.MipTypes.CH_FIELD_ESTFILTER_ESTIMATED_ORIENT_EULER,
+            ms.MipTypes.CH_FIELD_ESTFILTER_ESTIMATED_ANGULAR_RATE,
+            ms.MipTypes.CH_FIELD_ESTFILTER_ESTIMATED_LINEAR_ACCEL,
+            ms.MipTypes.CH_FIELD_ESTFILTER_GPS_TIMESTAMP,
+        ):
+            channels.append(ms.MipChannel(field, ms.SampleRate.Hertz(sample_rate)))
+
+        self.node.setActiveChannelFields(ms.MipTypes.CLASS_ESTFILTER, channels)
+        self.node.enableDataStream(ms.MipTypes.CLASS_ESTFILTER)
+        self.node.setToIdle()
+
+    def __repr__(self) -> str:
+        return f"MSCLTransport"
+
+    def start(self) -> None:
+        self.node.resume()
+
+    def stop(self) -> None:
+        self.node.setToIdle()
+
+    def read(self, timeout: int) -> list:
+        return self.node.getDataPackets(timeout)
+
+
+class ReplayDataPoint:
+    __slots__ = ("_channel", "_value")
+
+    def __init__(self, channel: str, value: float) -> None:
+        self._channel = channel
+        self._value = value
+
+    def channelName(self) -> str:
+        return self._channel
+
+    def as_float(self) -> float:
+        return self._value
+
+
+class ReplayTimestamp:
+    __slots__ = ("_nanoseconds",)
+
+    def __init__(self, nanoseconds: int) -> None:
+        self._nanoseconds = nanoseconds
+
+    def nanoseconds(self) -> int:
+        return self._nanoseconds
+
+
+class ReplayPacket:
+    """Recorded IMU sample, with the same interface as the MSCL packets."""
+
+    __slots__ = ("_points", "_timestamp")
+
+    def __init__(self, sample, timestamp: float) -> None:
+        self._points = [
+            ReplayDataPoint(channel, float(value))
+            for channel, value in zip(IMU_CHANNELS, sample)
+        ]
+        self._timestamp = ReplayTimestamp(round(timestamp * 1e9))
+
+    def data(self) -> list:
+        return self._points
+
+    def collectedTimestamp(self) -> ReplayTimestamp:
+        return self._timestamp
+
+
+class ReplayTransport(IMUTransport):
+    """
+    Transport replaying a recorded IMU packet stream, to test and benchmark
+    IMULordMicrostrain without the IMU.
+
+    Once started, a read returns every packet due since the previous one, the
+    recorded timestamps being played back `speed` times faster than real time.
+    With an infinite speed, every read returns the next `burst` packets right
+    away. The packets are built once, so that reading them only costs the
+    decoding done by IMULordMicrostrain.
+
+    Args:
+        samples (array-like): Recorded samples of shape (N, 11), laid out as IMU_FIELDS.
+        timestamps (array-like): Time in seconds at which every sample was collected, of shape (N,).
+        speed (float): Playback speed relative to real time. Defaults to 1.0.
+        burst (int): Number of packets per read at an infinite speed. Defaults to 1.
+        loop (bool): Restart from the first packet after the last one. Defaults to False.
+    """
+
+    def __init__(
+        self,
+        samples,
+        timestamps,
+        speed: float = 1.0,
+        burst: int = 1,
+        loop: bool = False,
+    ) -> None:
+        samples = np.asarray(samples, dtype=np.double)
+        timestamps = np.asarray(timestamps, dtype=np.double)
+
+        if samples.ndim != 2 or samples.shape[1] != len(IMU_FIELDS):
+            raise ValueError(f"Expected samples of shape (N, {len(IMU_FIELDS)})")
+
+        if timestamps.shape != (len(samples),):
+            raise ValueError(f"Expected timestamps of shape ({len(samples)},)")
+
+        if speed <= 0:
+            raise ValueError(f"Invalid playback speed: {speed}")
+
+        self._packets: list[ReplayPacket] = [
+            ReplayPacket(sample=sample, timestamp=timestamp)
+            for sample, timestamp in zip(samples.tolist(), timestamps.tolist())
+        ]
+        self._offsets: list[float] = (timestamps - timestamps[:1]).tolist()
+        self._duration: float = (
+            self._offsets[-1] + float(np.median(np.diff(timestamps)))
+            if len(timestamps) > 1
+            else 0.0
+        )
+        self._speed: float = speed
+        self._burst: int = burst
+        self._loop: bool = loop
+
+        self._index: int = 0
+        self._start_time: Optional[float] = None
+
+    def __repr__(self) -> str:
+        return f"ReplayTransport[{len(self._packets)}]"
+
+    @classmethod
+    def load(cls, file_path: str, **kwargs) -> "ReplayTransport":
+        """
+        Loads a recording saved with `save`.
+
+        Args:
+            file_path (str): Path of the .npz recording.
+            **kwargs: Passed on to ReplayTransport.
+        """
+        with np.load(file_path) as recording:
+            return cls(
+                samples=recording["samples"],
+                timestamps=recording["timestamps"],
+                **kwargs,
+            )
+
+    @staticmethod
+    def save(file_path: str, samples, timestamps) -> None:
+        """
+        Saves a recording, e.g. the batches returned by IMULordMicrostrain.get_batch.
+
+        Args:
+            file_path (str): Path of the .npz recording.
+            samples (array-like): Samples of shape (N, 11), laid out as IMU_FIELDS.
+            timestamps (array-like): Time in seconds of every sample, of shape (N,).
+        """
+        np.savez(
+            file_path,
+            samples=np.asarray(samples, dtype=np.double),
+            timestamps=np.asarray(timestamps, dtype=np.double),
+        )
+
+    def start(self) -> None:
+        if self._start_time is None:
+            self._start_time = CLOCK.read()
+
+    def stop(self) -> None:
+        self._start_time = None
+
+    def rewind(self) -> None:
+        """Restarts the replay from the first packet."""
+        self._index = 0
+        self._start_time = None
+
+    def read(self, timeout: int) -> list:
+        if self._start_time is None or self.is_finished:
+            return []
+
+        if math.isinf(self._speed):
+            return self._take(self._index + self._burst)
+
+        elapsed = (CLOCK.read() - self._start_time) * self._speed
+        due = self._due(elapsed)
+
+        if due == self._index:
+            # Wait for the next packet, as MSCL does when none is pending
+            wait = (self._next_offset() - elapsed) / self._speed
+
+            if wait > timeout / 1000:
+                time.sleep(timeout / 1000)
+                return []
+
+            time.sleep(max(wait, 0.0))
+            due = self._index + 1
+
+        return self._take(due)
+
+    def _due(self, elapsed: float) -> int:
+        """Number of packets, over all laps, collected before elapsed seconds."""
+        count = len(self._packets)
+
+        if self._loop and self._duration > 0:
+            laps, elapsed = divmod(elapsed, self._duration)
+            return int(laps) * count + bisect_right(self._offsets, elapsed)
+
+        return bisect_right(self._offsets, elapsed)
+
+    def _next_offset(self) -> float:
+        count = len(self._packets)
+        lap, index = divmod(self._index, count)
+        return lap * self._duration + self._offsets[index]
+
+    def _take(self, stop: int) -> list:
+        count = len(self._packets)
+
+        if not self._loop:
+            stop = min(stop, count)
+
+        packets = []
+        while self._index < stop:
+            lap, index = divmod(self._index, count)
+            end = min(stop - lap * count, count)
+            packets.extend(self._packets[index:end])
+            self._index += end - index
+
+        return packets
+
+    @property
+    def is_finished(self) -> bool:
+        """Whether every packet was read, never the case when looping."""
+        return not self._packets or (
+            not self._loop and self._index >= len(self._packets)
+        )
+
+    @property
+    def packets_read(self) -> int:
+        return self._index
+
+    @property
+    def speed(self) -> float:
+        return self._speed
+
+
 class IMULordMicrostrain:
     """
     Sensor class for the Lord Microstrain IMU.
@@ -486,6 +1159,9 @@ class IMULordMicrostrain:
 
     As configured, this class returns euler angles (rad), angular rates (rad/s), and accelerations (g).
 
+    The packets are read through a transport, `MSCLTransport` by default. Pass a
+    `ReplayTransport` to run the decoding and buffering on recorded packets.
+
     Example:
         imu = IMULordMicrostrain()
         imu.start_streaming()
@@ -493,100 +1169,262 @@ class IMULordMicrostrain:
             imu.get_data()
         imu.stop_streaming()
 
+    Batch example, keeping every sample:
+        imu.start_streaming()
+        imu.start_reader()
+        while in loop:
+            samples, timestamps = imu.get_batch()
+        imu.stop_reader()
+        imu.stop_streaming()
+
+    Replay example, without the IMU:
+        imu = IMULordMicrostrain(transport=ReplayTransport.load("walking.npz"))
+
     Resources:
         * To install, download the pre-built package for raspian at https://github.com/LORD-MicroStrain/MSCL/tree/master
         * Full documentation for their library can be found at https://lord-microstrain.github.io/MSCL/Documentation/MSCL%20API%20Documentation/index.html.
     """
 
     def __init__(
-        self, port=r"/dev/ttyUSB0", baud_rate=921600, timeout=500, sample_rate=100
+        self,
+        port=r"/dev/ttyUSB0",
+        baud_rate=921600,
+        timeout=500,
+        sample_rate=100,
+        buffer_size: int = 256,
+        transport: Optional["IMUTransport"] = None,
     ):
-        import sys
-
-        sys.path.append(r"/usr/share/python3-mscl/")
-        import mscl as ms
-
         self.port = port
         self.baud_rate = baud_rate
-        self.connection = ms.Connection.Serial(
-            os.path.realpath(self.port), self.baud_rate
-        )
-        self.imu = ms.InertialNode(self.connection)
         self.timeout = timeout  # Timeout in (ms) to read the IMU
-        time.sleep(0.5)
-
-        # Configure data channels
-        channels = ms.MipChannels()
-        channels.append(
-            ms.MipChannel(
-                ms.MipTypes.CH_FIELD_ESTFILTER_ESTIMATED_ORIENT_EULER,
-                ms.SampleRate.Hertz(sample_rate),
-            )
+        self.transport: IMUTransport = (
+            transport
+            if transport is not None
+            else MSCLTransport(port=port, baud_rate=baud_rate, sample_rate=sample_rate)
         )
-        channels.append(
-            ms.MipChannel(
-                ms.MipTypes.CH_FIELD_ESTFILTER_ESTIMATED_ANGULAR_RATE,
-                ms.SampleRate.Hertz(sample_rate),
-            )
-        )
-        channels.append(
-            ms.MipChannel(
-                ms.MipTypes.CH_FIELD_ESTFILTER_ESTIMATED_LINEAR_ACCEL,
-                ms.SampleRate.Hertz(sample_rate),
-            )
-        )
-        channels.append(
-            ms.MipChannel(
-                ms.MipTypes.CH_FIELD_ESTFILTER_GPS_TIMESTAMP,
-                ms.SampleRate.Hertz(sample_rate),
-            )
-        )
-
-        self.imu.setActiveChannelFields(ms.MipTypes.CLASS_ESTFILTER, channels)
-        self.imu.enableDataStream(ms.MipTypes.CLASS_ESTFILTER)
-        self.imu.setToIdle()
 
-        packets = self.imu.getDataPackets(
-            self.timeout
-        )  # Clean the internal circular buffer.
+        self.transport.read(timeout=self.timeout)  # Clean the internal buffer.
         self.imu_data = IMUDataClass()
+        self._allocate_buffers(buffer_size=buffer_size)
 
     def __repr__(self) -> str:
         return f"IMULordMicrostrain"
 
+    def _allocate_buffers(self, buffer_size: int) -> None:
+        self._batch: npt.NDArray[np.double] = np.zeros(
+            shape=(buffer_size, len(IMU_FIELDS)), dtype=np.double
+        )
+        self._batch_timestamps: npt.NDArray[np.double] = np.zeros(
+            shape=buffer_size, dtype=np.double
+        )
+        self._latest: list[float] = [0.0] * len(IMU_FIELDS)
+
+        # Filled by the reader thread, drained by get_data and get_batch
+        self._pending: deque[tuple[float, list[float]]] = deque(maxlen=buffer_size)
+        self._reader_thread: Optional[threading.Thread] = None
+        self._stop_event: threading.Event = threading.Event()
+        self._dropped: int = 0
+        self._read_errors: int = 0
+        self._last_error: Optional[Exception] = None
+
     def start_streaming(self):
-        self.imu.resume()
+        self.transport.start()
 
     def stop_streaming(self):
-        self.imu.setToIdle()
+        self.transport.stop()
+
+    def start_reader(self) -> None:
+        """
+        Starts a thread that keeps draining the IMU buffer and decoding the
+        packets, so that get_data and get_batch never wait on the IMU. Up to
+        buffer_size samples are kept until they are taken, the oldest are
+        dropped beyond that (see `dropped`).
+        """
+        if self.is_reader_running:
+            return
+
+        self._stop_event.clear()
+        self._reader_thread = threading.Thread(
+            target=self._run_reader, name="imu_reader", daemon=True
+        )
+        self._reader_thread.start()
+
+    def stop_reader(self, timeout: Optional[float] = None) -> None:
+        """
+        Stops the reader thread. The samples it already decoded can still be taken.
+
+        Args:
+            timeout (float): Maximum time in seconds to wait for the thread. Defaults to None, which waits for one IMU read timeout.
+        """
+        self._stop_event.set()
+
+        if self._reader_thread is not None:
+            self._reader_thread.join(
+                timeout=timeout if timeout is not None else self.timeout / 1000 + 0.1
+            )
+            self._reader_thread = None
+
+    def _run_reader(self) -> None:
+        latest = list(self._latest)
+
+        while not self._stop_event.is_set():
+            try:
+                packets = self.transport.read(timeout=self.timeout)
+            except Exception as e:
+                self._read_errors += 1
+                self._last_error = e
+                self._stop_event.wait(timeout=self.timeout / 1000)
+                continue
+
+            for packet in packets:
+                self._decode(packet=packet, row=latest)
+
+                if len(self._pending) == self._pending.maxlen:
+                    self._dropped += 1
+
+                self._pending.append((_collected_time(packet), list(latest)))
+
+    @staticmethod
+    def _decode(packet, row) -> None:
+        """Writes the channels of a packet into a row laid out as IMU_FIELDS."""
+        channels = IMU_CHANNELS
+
+        for data_point in packet.data():
+            index = channels.get(data_point.channelName())
+
+            if index is not None:
+                row[index] = data_point.as_float()
+
+    def _update_imu_data(self, row) -> None:
+        imu_data = self.imu_data
+        (
+            imu_data.angle_x,
+            imu_data.angle_y,
+            imu_data.angle_z,
+            imu_data.velocity_x,
+            imu_data.velocity_y,
+            imu_data.velocity_z,
+            imu_data.accel_x,
+            imu_data.accel_y,
+            imu_data.accel_z,
+            imu_data.imu_time_sta,
+            imu_data.imu_filter_gps_time_week_num,
+        ) = row
+
+    def get_batch(self) -> tuple[npt.NDArray[np.double], npt.NDArray[np.double]]:
+        """
+        Decodes every sample received since the last call, instead of only the
+        newest one. imu_data is updated with the newest sample.
+
+        Returns:
+            tuple: Samples of shape (N, 11) laid out as IMU_FIELDS, and the time
+            in seconds at which each of them was collected, of shape (N,). Both
+            are views of buffers that are reused by the next call.
+        """
+        if self._reader_thread is not None or self._pending:
+            items = []
+            while self._pending:
+                items.append(self._pending.popleft())
+
+            count = len(items)
+            if count:
+                timestamps, rows = zip(*items)
+                self._latest = rows[-1]
+        else:
+            packets = self.transport.read(timeout=self.timeout)
+            count = len(packets)
+
+            rows, timestamps = [], []
+            latest = self._latest
+            for packet in packets:
+                latest = list(latest)
+                self._decode(packet=packet, row=latest)
+                rows.append(latest)
+                timestamps.append(_collected_time(packet))
+
+            self._latest = latest
+
+        self._reserve(count)
+        if count:
+            self._batch[:count] = rows
+            self._batch_timestamps[:count] = timestamps
+            self._update_imu_data(self._latest)
+
+        return self._batch[:count], self._batch_timestamps[:count]
+
+    def _reserve(self, count: int) -> None:
+        capacity = len(self._batch)
+
+        if count > capacity:
+            capacity = max(count, 2 * capacity)
+            self._batch = np.zeros(shape=(capacity, len(IMU_FIELDS)), dtype=np.double)
+            self._batch_timestamps = np.zeros(shape=capacity, dtype=np.double)
+
+    @property
+    def is_reader_running(self) -> bool:
+        return self._reader_thread is not None and self._reader_thread.is_alive()
+
+    @property
+    def dropped(self) -> int:
+        """Number of samples the reader thread dropped before they were taken."""
+        return self._dropped
+
+    @property
+    def read_errors(self) -> int:
+        """Number of IMU reads of the reader thread that raised an exception."""
+        return self._read_errors
+
+    @property
+    def imu(self):
+        """
+        MSCL InertialNode of the IMU, None if the packets are not read through
+        an MSCLTransport.
+        """
+        if isinstance(self.transport, MSCLTransport):
+            return self.transport.node
+
+        return None
+
+    @property
+    def connection(self):
+        """
+        MSCL serial connection to the IMU, None if the packets are not read
+        through an MSCLTransport.
+        """
+        if isinstance(self.transport, MSCLTransport):
+            return self.transport.connection
+
+        return None
 
     def get_data(self):
         """
-        Get IMU data from the Lord Microstrain IMU
+        Get IMU data from the Lord Microstrain IMU.
+        Only the newest packet is decoded, straight into imu_data. The older
+        ones are discarded, use get_batch to keep them.
         """
-        imu_packets = self.imu.getDataPackets(self.timeout)
+        if self._reader_thread is not None or self._pending:
+            newest = None
+            while self._pending:
+                newest = self._pending.popleft()
+
+            if newest is not None:
+                self._latest = newest[1]
+                self._update_imu_data(self._latest)
+
+            return self.imu_data
+
+        imu_packets = self.transport.read(timeout=self.timeout)
         if len(imu_packets):
-            # Read all the information from the first packet as float.
-            raw_imu_data = {
-                data_point.channelName(): data_point.as_float()
-                for data_point in imu_packets[-1].data()
-            }
-            self.imu_data.angle_x = raw_imu_data["estRoll"]
-            self.imu_data.angle_y = raw_imu_data["estPitch"]
-            self.imu_data.angle_z = raw_imu_data["estYaw"]
-            self.imu_data.velocity_x = raw_imu_data["estAngularRateX"]
-            self.imu_data.velocity_y = raw_imu_data["estAngularRateY"]
-            self.imu_data.velocity_z = raw_imu_data["estAngularRateZ"]
-            self.imu_data.accel_x = raw_imu_data["estLinearAccelX"]
-            self.imu_data.accel_y = raw_imu_data["estLinearAccelY"]
-            self.imu_data.accel_z = raw_imu_data["estLinearAccelZ"]
-            self.imu_data.imu_time_sta = raw_imu_data["estFilterGpsTimeTow"]
-            self.imu_data.imu_filter_gps_time_week_num = raw_imu_data[
-                "estFilterGpsTimeWeekNum"
-            ]
+            self._decode(packet=imu_packets[-1], row=self._latest)
+            self._update_imu_data(self._latest)
 
         return self.imu_data
 
 
+def _collected_time(packet) -> float:
+    """Host time in seconds at which MSCL collected a packet."""
+    return packet.collectedTimestamp().nanoseconds() * 1e-9
+
+
 if __name__ == "__main__":
     pass
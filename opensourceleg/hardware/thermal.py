@@ -2,10 +2,45 @@
 # @U-M Locomotion Lab, directed by Dr. Robert Gregg
 # Authors: Jianping Lin and Gray C. Thomas
 
-from typing import Any, Callable, List, Optional
+from typing import Any, Callable, List, Optional, Sequence, Union
+
+import math
 
 import numpy as np
 
+INTEGRATORS = ("euler", "exact")
+
+
+def _discretize(a11: Any, a12: Any, a21: Any, a22: Any, dt: float) -> tuple:
+    """
+    Exact zero-order-hold discretization of x' = A x + b for a 2x2 matrix A with
+    real distinct eigenvalues, which is always the case for the two-node thermal
+    network (a12 * a21 > 0). Works elementwise on floats or NumPy arrays.
+
+    Returns:
+        tuple: Entries of Phi = exp(A dt) and of Psi = integral of exp(A t) over
+        [0, dt], both row major, so that x[k+1] = Phi x[k] + Psi b.
+    """
+    half_trace = (a11 + a22) / 2
+    root = np.sqrt(((a11 - a22) / 2) ** 2 + a12 * a21)
+    l1 = half_trace + root
+    l2 = half_trace - root
+
+    e1 = np.exp(l1 * dt)
+    e2 = np.exp(l2 * dt)
+    # (exp(l dt) - 1) / l, which tends to dt when l tends to 0
+    with np.errstate(divide="ignore", invalid="ignore"):
+        f1 = np.where(np.abs(l1 * dt) < 1e-12, dt, np.expm1(l1 * dt) / l1)
+        f2 = np.where(np.abs(l2 * dt) < 1e-12, dt, np.expm1(l2 * dt) / l2)
+
+    # Sylvester's formula: g(A) = (g(l1) (A - l2 I) - g(l2) (A - l1 I)) / (l1 - l2)
+    def apply(g1, g2):
+        c = (g1 - g2) / (2 * root)
+        d = (g2 * l1 - g1 * l2) / (2 * root)
+        return c * a11 + d, c * a12, c * a21, c * a22 + d
+
+    return apply(e1, e2), apply(f1, f2)
+
 
 class ThermalModel:
     """
@@ -44,6 +79,8 @@ class ThermalModel:
         soft_border_C_windings (float): Soft border of the windings in Celsius. Defaults to 15.
         temp_limit_case (float): Maximum temperature of the case in Celsius. Defaults to 80.
         soft_border_C_case (float): Soft border of the case in Celsius. Defaults to 5.
+        integrator (str): "euler" for a forward Euler step, or "exact" for the exact zero-order-hold discretization, which stays accurate with large time steps. Defaults to "euler".
+        rediscretization_tolerance (float): With the exact integrator, the discretization is only recomputed when the temperature dependent part of the winding losses changes by more than this fraction of the winding to case conductance. Defaults to 1e-3.
 
 
     """
@@ -56,8 +93,15 @@ class ThermalModel:
         soft_border_C_windings: float = 15,
         temp_limit_case: float = 80,
         soft_border_C_case: float = 5,
+        integrator: str = "euler",
+        rediscretization_tolerance: float = 1e-3,
     ) -> None:
 
+        if integrator not in INTEGRATORS:
+            raise ValueError(
+                f"Invalid integrator: {integrator}, expected one of {INTEGRATORS}"
+            )
+
         # The following parameters result from Jack Schuchmann's test with no fans
         self.C_w: float = 0.20 * 81.46202695970649
         self.R_WC = 1.0702867186480716
@@ -81,6 +125,15 @@ class ThermalModel:
         self.abs_max_temp_case: float = temp_limit_case
         self.soft_border_case: float = soft_border_C_case
 
+        self._integrator: str = integrator
+        self._rediscretization_tolerance: float = rediscretization_tolerance
+        self._discretization: Optional[tuple] = None
+        self._discretized_for: tuple[float, float] = (float("nan"), float("nan"))
+        self._discretizations: int = 0
+
+        self._modes_for: tuple[float, ...] = ()
+        self._mode_values: tuple[float, float, float, float] = (0.0, 0.0, 0.0, 0.0)
+
     def __repr__(self) -> str:
         return f"ThermalModel"
 
@@ -99,6 +152,10 @@ class ThermalModel:
 
         I_q_des: float = motor_current * 1e-3
 
+        if self._integrator == "exact":
+            self._step_exact(dt=dt, losses=I_q_des**2 * self.R_ϕ_0)
+            return
+
         I2R = (
             I_q_des**2 * self.R_ϕ_0 * (1 + self.α * (self.T_w - self.R_T_0))
         )  # accounts for resistance change due to temp.
@@ -147,14 +204,17 @@ class ThermalModel:
                 self.abs_max_temp_case - self.soft_max_temp_case
             )
 
-        I2R = I2R_des * scale
+        if self._integrator == "exact":
+            self._step_exact(dt=dt, losses=FOS * I_q_des**2 * self.R_ϕ_0 * scale)
+        else:
+            I2R = I2R_des * scale
 
-        dTw_dt = (I2R + (self.T_c - self.T_w) / self.R_WC) / self.C_w
-        dTc_dt: float = (
-            (self.T_w - self.T_c) / self.R_WC + (self.T_a - self.T_c) / self.R_CA
-        ) / self.C_c
-        self.T_w += dt * dTw_dt
-        self.T_c += dt * dTc_dt
+            dTw_dt = (I2R + (self.T_c - self.T_w) / self.R_WC) / self.C_w
+            dTc_dt: float = (
+                (self.T_w - self.T_c) / self.R_WC + (self.T_a - self.T_c) / self.R_CA
+            ) / self.C_c
+            self.T_w += dt * dTw_dt
+            self.T_c += dt * dTc_dt
 
         if scale <= 0.0:
             return 0.0
@@ -162,3 +222,617 @@ class ThermalModel:
             return 1.0
 
         return np.sqrt(scale)  # this is how much the torque should be scaled
+
+    def time_to_limit(
+        self,
+        motor_current: Union[float, Sequence[tuple[float, float]]],
+        soft: bool = True,
+    ) -> float:
+        """
+        Predicts the time until the winding or the case reaches its temperature
+        limit, starting from the current state.
+
+        The current is either held constant, or given as a planned profile of
+        (duration in s, RMS current in mA) segments. Within a segment, the
+        temperatures are a closed-form sum of two exponentials, and the first
+        crossing of the limit is located on it directly, without stepping the
+        model. The winding resistance is taken at the winding limit, its highest
+        value before the limit is reached, so the prediction is conservative.
+
+        Args:
+            motor_current (float or list): Constant motor current in mA, or list of (duration, motor current) segments. Use math.inf as the last duration to hold the last current.
+            soft (bool): Use the soft limits, where the torque starts being scaled down, instead of the absolute limits. Defaults to True.
+
+        Returns:
+            float: Time in seconds, 0.0 if a limit is already reached and math.inf if it is not reached within the profile.
+        """
+        if isinstance(motor_current, (int, float)):
+            segments: Sequence[tuple[float, float]] = [(math.inf, motor_current)]
+        else:
+            segments = motor_current
+
+        limit_w, limit_c, resistance = self._prediction_limits(soft=soft)
+        T_w, T_c = self.T_w, self.T_c
+        elapsed = 0.0
+
+        for duration, current in segments:
+            losses = (current * 1e-3) ** 2 * resistance
+            winding, case = self._response(T_w=T_w, T_c=T_c, losses=losses)
+            crossing = min(
+                self._first_crossing(*winding, limit=limit_w, horizon=duration),
+                self._first_crossing(*case, limit=limit_c, horizon=duration),
+            )
+
+            if crossing <= duration:
+                return elapsed + crossing
+
+            elapsed += duration
+            T_w = self._evaluate(*winding, t=duration)
+            T_c = self._evaluate(*case, t=duration)
+
+        return math.inf
+
+    def max_rms_current(self, horizon: float = math.inf, soft: bool = True) -> float:
+        """
+        Predicts the largest RMS current that can be sustained for the given
+        horizon, starting from the current state, without the winding or the
+        case reaching its temperature limit.
+
+        The temperatures are the sum of the free response from the current state
+        and of a step response that grows monotonically with time and linearly
+        with the losses, both in closed form. The peak temperature of a node
+        over the horizon is then a convex, increasing function of the losses,
+        whose slope is the step response at the time of the peak. The largest
+        losses keeping it below the limit are found with Newton iterations,
+        starting from the losses that bring the node to its limit at the
+        horizon, which converge from above. As in `time_to_limit`, the winding
+        resistance is taken at the winding limit.
+
+        Args:
+            horizon (float): Duration in seconds. Defaults to math.inf (continuous current).
+            soft (bool): Use the soft limits, where the torque starts being scaled down, instead of the absolute limits. Defaults to True.
+
+        Returns:
+            float: RMS motor current in mA, 0.0 if a limit is already reached.
+        """
+        limit_w, limit_c, resistance = self._prediction_limits(soft=soft)
+        free_w, free_c = self._response(T_w=self.T_w, T_c=self.T_c, losses=0.0)
+        step_w, step_c = self._response(T_w=self.T_a, T_c=self.T_a, losses=1.0)
+
+        losses = math.inf
+        for free, step, limit in ((free_w, step_w, limit_w), (free_c, step_c, limit_c)):
+            if self._peak(*free, horizon=horizon) >= limit:
+                return 0.0
+
+            losses = min(
+                losses,
+                self._max_losses(free=free, step=step, limit=limit, horizon=horizon),
+            )
+
+        return math.sqrt(losses / resistance) * 1e3
+
+    def _max_losses(
+        self,
+        free: tuple[float, float, float],
+        step: tuple[float, float, float],
+        limit: float,
+        horizon: float,
+    ) -> float:
+        """
+        Returns the largest losses L such that the peak over the horizon of
+        free(t) + L (step(t) - T_a) stays below the limit.
+        """
+        rise = (step[0] - self.T_a, step[1], step[2])
+        losses = (limit - self._evaluate(*free, t=horizon)) / self._evaluate(
+            *rise, t=horizon
+        )
+
+        for _ in range(100):
+            response = (
+                free[0] + losses * rise[0],
+                free[1] + losses * rise[1],
+                free[2] + losses * rise[2],
+            )
+            peak, t = self._peak_and_time(*response, horizon=horizon)
+            excess = peak - limit
+
+            if excess <= 0:
+                break
+
+            correction = excess / self._evaluate(*rise, t=t)
+            losses -= correction
+            if correction <= 1e-12 * losses:
+                break
+
+        return losses
+
+    def _peak(self, steady: float, c1: float, c2: float, horizon: float) -> float:
+        return self._peak_and_time(steady, c1, c2, horizon=horizon)[0]
+
+    def _peak_and_time(
+        self, steady: float, c1: float, c2: float, horizon: float
+    ) -> tuple[float, float]:
+        """Returns the maximum of the response over [0, horizon] and its time."""
+        peak, time = steady + c1 + c2, 0.0
+        end = self._evaluate(steady, c1, c2, t=horizon)
+        if end > peak:
+            peak, time = end, horizon
+
+        t = self._stationary_point(c1=c1, c2=c2)
+        if t < horizon:
+            value = self._evaluate(steady, c1, c2, t=t)
+            if value > peak:
+                peak, time = value, t
+
+        return peak, time
+
+    def _prediction_limits(self, soft: bool) -> tuple[float, float, float]:
+        if soft:
+            limit_w, limit_c = self.soft_max_temp_windings, self.soft_max_temp_case
+        else:
+            limit_w, limit_c = self.abs_max_temp_windings, self.abs_max_temp_case
+
+        resistance = self.R_ϕ_0 * (1 + self.α * (limit_w - self.R_T_0))
+        return limit_w, limit_c, resistance
+
+    def _modes(self) -> tuple[float, float, float, float]:
+        """
+        Returns the eigenvalues (l1 > l2) of the network with a constant winding
+        resistance, along with a11 and a12, which define its eigenvectors
+        (a12, l - a11). Cached as long as the thermal parameters do not change.
+        """
+        parameters = (self.C_w, self.R_WC, self.C_c, self.R_CA)
+
+        if self._modes_for != parameters:
+            a11 = -1 / (self.R_WC * self.C_w)
+            a12 = 1 / (self.R_WC * self.C_w)
+            a21 = 1 / (self.R_WC * self.C_c)
+            a22 = -(1 / self.R_WC + 1 / self.R_CA) / self.C_c
+            root = math.sqrt(((a11 - a22) / 2) ** 2 + a12 * a21)
+            half_trace = (a11 + a22) / 2
+            self._mode_values = (half_trace + root, half_trace - root, a11, a12)
+            self._modes_for = parameters
+
+        return self._mode_values
+
+    def _response(
+        self, T_w: float, T_c: float, losses: float
+    ) -> tuple[tuple[float, float, float], tuple[float, float, float]]:
+        """
+        Returns the winding and case temperatures for constant winding losses,
+        each as (steady state, c1, c2) such that T(t) = steady state
+        + c1 exp(l1 t) + c2 exp(l2 t).
+        """
+        l1, l2, a11, a12 = self._modes()
+        T_c_ss = self.T_a + losses * self.R_CA
+        T_w_ss = T_c_ss + losses * self.R_WC
+
+        e_w, e_c = T_w - T_w_ss, T_c - T_c_ss
+        det = a12 * (l2 - l1)
+        z1 = ((l2 - a11) * e_w - a12 * e_c) / det
+        z2 = (a12 * e_c - (l1 - a11) * e_w) / det
+
+        return (T_w_ss, a12 * z1, a12 * z2), (
+            T_c_ss,
+            (l1 - a11) * z1,
+            (l2 - a11) * z2,
+        )
+
+    def _evaluate(self, steady: float, c1: float, c2: float, t: float) -> float:
+        if t == math.inf:
+            return steady
+
+        l1, l2, _, _ = self._modes()
+        return steady + c1 * math.exp(l1 * t) + c2 * math.exp(l2 * t)
+
+    def _stationary_point(self, c1: float, c2: float) -> float:
+        """Returns the only time > 0 where the response is flat, or math.inf."""
+        l1, l2, _, _ = self._modes()
+
+        if c1 == 0 or c2 == 0:
+            return math.inf
+
+        ratio = -(c2 * l2) / (c1 * l1)
+        if ratio <= 0:
+            return math.inf
+
+        t = math.log(ratio) / (l1 - l2)
+        return t if t > 0 else math.inf
+
+    def _first_crossing(
+        self, steady: float, c1: float, c2: float, limit: float, horizon: float
+    ) -> float:
+        if steady + c1 + c2 >= limit:
+            return 0.0
+
+        # The response is monotonic on both sides of its stationary point
+        t = self._stationary_point(c1=c1, c2=c2)
+        bounds = [0.0] + ([t] if t < horizon else []) + [horizon]
+
+        for start, end in zip(bounds[:-1], bounds[1:]):
+            if end == math.inf:
+                if steady <= limit:
+                    return math.inf
+
+                # Grow the bracket by multiples of the slow time constant
+                step = -1 / self._modes()[0]
+                end = start + step
+                while self._evaluate(steady, c1, c2, t=end) < limit:
+                    start, end = end, end + step
+                    step *= 2
+
+            elif self._evaluate(steady, c1, c2, t=end) < limit:
+                continue
+
+            return self._solve(steady, c1, c2, limit=limit, start=start, end=end)
+
+        return math.inf
+
+    def _solve(
+        self,
+        steady: float,
+        c1: float,
+        c2: float,
+        limit: float,
+        start: float,
+        end: float,
+    ) -> float:
+        """
+        Newton iterations, kept within the bracket [start, end] by falling back
+        to bisection, for the time at which the response reaches the limit.
+        """
+        l1, l2, _, _ = self._modes()
+        t = (start + end) / 2
+
+        for _ in range(100):
+            e1, e2 = c1 * math.exp(l1 * t), c2 * math.exp(l2 * t)
+            error = steady + e1 + e2 - limit
+
+            if error < 0:
+                start = t
+            else:
+                end = t
+
+            slope = l1 * e1 + l2 * e2
+            next_t = t - error / slope if slope != 0 else start - 1.0
+            if not start < next_t < end:
+                next_t = (start + end) / 2
+
+            if abs(next_t - t) <= 1e-9 * (1 + t):
+                return next_t
+
+            t = next_t
+
+        return t
+
+    def _step_exact(self, dt: float, losses: float) -> None:
+        """
+        Steps the model with the exact zero-order-hold discretization, holding
+        the winding losses, losses * (1 + α (T_w - R_T_0)), over the time step.
+        The losses depend on T_w, which makes them part of the system matrix:
+        the matrix exponential is cached and only recomputed when dt or that
+        temperature coefficient changes materially.
+
+        Args:
+            dt (float): Time step in seconds.
+            losses (float): Winding losses at the reference temperature R_T_0, in W.
+        """
+        heating = losses * self.α / self.C_w
+        tolerance = self._rediscretization_tolerance / (self.R_WC * self.C_w)
+
+        if (
+            self._discretization is None
+            or dt != self._discretized_for[0]
+            or abs(heating - self._discretized_for[1]) > tolerance
+        ):
+            phi, psi = _discretize(
+                a11=heating - 1 / (self.R_WC * self.C_w),
+                a12=1 / (self.R_WC * self.C_w),
+                a21=1 / (self.R_WC * self.C_c),
+                a22=-(1 / self.R_WC + 1 / self.R_CA) / self.C_c,
+                dt=dt,
+            )
+            self._discretization = tuple(float(x) for x in phi + psi)
+            self._discretized_for = (dt, heating)
+            self._discretizations += 1
+
+        p11, p12, p21, p22, s11, s12, s21, s22 = self._discretization
+        b1 = losses * (1 - self.α * self.R_T_0) / self.C_w
+        b2 = self.T_a / (self.R_CA * self.C_c)
+
+        T_w, T_c = self.T_w, self.T_c
+        self.T_w = p11 * T_w + p12 * T_c + s11 * b1 + s12 * b2
+        self.T_c = p21 * T_w + p22 * T_c + s21 * b1 + s22 * b2
+
+    @property
+    def integrator(self) -> str:
+        return self._integrator
+
+    @property
+    def discretizations(self) -> int:
+        """Number of times the exact discretization was computed."""
+        return self._discretizations
+
+
+class BatchThermalModel:
+    """
+    Vectorized version of `ThermalModel` for N actuators sharing the same thermal
+    parameters. The winding, case and ambient temperatures are NumPy arrays of
+    shape (N,), and every call steps all the actuators at once with the same
+    dynamics and derating as the scalar model.
+
+    `simulate` runs a whole recorded current trace of shape (T, N) without a
+    Python loop over time, which is what makes replaying long logs fast.
+
+    Args:
+        number_of_actuators (int): Number of actuators N.
+        ambient (float or array-like): Ambient temperature in Celsius, either shared or one per actuator. Defaults to 21.
+        params (dict): Dictionary of parameters. Defaults to dict().
+        temp_limit_windings (float): Maximum temperature of the windings in Celsius. Defaults to 115.
+        soft_border_C_windings (float): Soft border of the windings in Celsius. Defaults to 15.
+        temp_limit_case (float): Maximum temperature of the case in Celsius. Defaults to 80.
+        soft_border_C_case (float): Soft border of the case in Celsius. Defaults to 5.
+        integrator (str): "euler" or "exact", see `ThermalModel`. Defaults to "euler".
+    """
+
+    def __init__(
+        self,
+        number_of_actuators: int,
+        ambient: Any = 21,
+        params: dict[Any, Any] = {},
+        temp_limit_windings: float = 115,
+        soft_border_C_windings: float = 15,
+        temp_limit_case: float = 80,
+        soft_border_C_case: float = 5,
+        integrator: str = "euler",
+    ) -> None:
+
+        if integrator not in INTEGRATORS:
+            raise ValueError(
+                f"Invalid integrator: {integrator}, expected one of {INTEGRATORS}"
+            )
+
+        # Same defaults as ThermalModel
+        self.C_w: float = 0.20 * 81.46202695970649
+        self.R_WC = 1.0702867186480716
+        self.C_c = 512.249065845453
+        self.R_CA = 1.9406620046327363
+        self.α: float = 0.393 * 1 / 100
+        self.R_T_0 = 65
+        self.R_ϕ_0 = 0.376
+
+        self.__dict__.update(params)
+        self._number_of_actuators: int = number_of_actuators
+
+        self.T_a: np.ndarray = np.broadcast_to(
+            np.asarray(ambient, dtype=np.float64), (number_of_actuators,)
+        ).copy()
+        self.T_w: np.ndarray = self.T_a.copy()
+        self.T_c: np.ndarray = self.T_a.copy()
+
+        self.soft_max_temp_windings: float = (
+            temp_limit_windings - soft_border_C_windings
+        )
+        self.abs_max_temp_windings: float = temp_limit_windings
+        self.soft_border_windings: float = soft_border_C_windings
+
+        self.soft_max_temp_case: float = temp_limit_case - soft_border_C_case
+        self.abs_max_temp_case: float = temp_limit_case
+        self.soft_border_case: float = soft_border_C_case
+
+        self._integrator: str = integrator
+
+    def __repr__(self) -> str:
+        return f"BatchThermalModel[{self._number_of_actuators}]"
+
+    def __len__(self) -> int:
+        return self._number_of_actuators
+
+    def update(self, dt: float = 1 / 200, motor_current: Any = 0) -> None:
+        """
+        Updates the temperature of the windings and the cases of all the actuators.
+
+        Args:
+            dt (float): Time step in seconds. Defaults to 1/200.
+            motor_current (array-like): Motor currents in mA, shape (N,) or scalar. Defaults to 0.
+        """
+        I_q_des = np.asarray(motor_current, dtype=np.float64) * 1e-3
+        self._step(dt=dt, losses=I_q_des**2 * self.R_ϕ_0)
+
+    def update_and_get_scale(
+        self, dt: float, motor_current: Any = 0, FOS: float = 1.0
+    ) -> np.ndarray:
+        """
+        Updates the temperature of the windings and the cases of all the actuators
+        and returns their torque scale factors.
+
+        Args:
+            dt (float): Time step in seconds.
+            motor_current (array-like): Motor currents in mA, shape (N,) or scalar. Defaults to 0.
+            FOS (float): Factor of safety. Defaults to 1.0.
+
+        Returns:
+            np.ndarray: Scale factors for the torque, shape (N,).
+        """
+        I_q_des = np.asarray(motor_current, dtype=np.float64) * 1e-3
+
+        T_w = self.T_w
+        T_c = self.T_c
+        scale = np.where(
+            T_w > self.abs_max_temp_windings,
+            0.0,
+            np.where(
+                T_w > self.soft_max_temp_windings,
+                (self.abs_max_temp_windings - T_w)
+                / (self.abs_max_temp_windings - self.soft_max_temp_windings),
+                1.0,
+            ),
+        )
+        # Same case derating as ThermalModel.update_and_get_scale
+        scale = np.where(
+            T_c > self.abs_max_temp_case,
+            0.0,
+            np.where(
+                T_c > self.soft_max_temp_case,
+                scale
+                * (self.abs_max_temp_case - T_w)
+                / (self.abs_max_temp_case - self.soft_max_temp_case),
+                scale,
+            ),
+        )
+
+        self._step(dt=dt, losses=FOS * I_q_des**2 * self.R_ϕ_0 * scale)
+
+        return np.sqrt(np.clip(scale, 0.0, 1.0))
+
+    def simulate(self, motor_current: Any, dt: float = 1 / 200) -> np.ndarray:
+        """
+        Runs a recorded current trace through the model and returns the
+        temperatures after every step. The model is left in the final state.
+
+        Every step of `update` is affine in the temperatures, so the trace is
+        cut into about sqrt(T) blocks of about sqrt(T) steps and computed in
+        three passes of about sqrt(T) vectorized iterations each. First, the
+        affine maps of the steps of all the blocks are composed at once. Then,
+        the composed maps are chained from the current state to get the state
+        at the start of every block. Finally, the steps of all the blocks are
+        run at once from their start states. The few steps left over after the
+        last whole block are run one by one. No derating is applied, as
+        recorded currents already are.
+
+        Args:
+            motor_current (array-like): Motor currents in mA, shape (T, N) or (T,) for a single actuator.
+            dt (float): Time step in seconds. Defaults to 1/200.
+
+        Returns:
+            np.ndarray: Winding and case temperatures, shape (T, N, 2).
+        """
+        I_q = np.asarray(motor_current, dtype=np.float64) * 1e-3
+
+        if I_q.ndim == 1:
+            I_q = I_q[:, np.newaxis]
+
+        steps = I_q.shape[0]
+        I_q = np.broadcast_to(I_q, (steps, self._number_of_actuators))
+        temperatures = np.empty((steps, self._number_of_actuators, 2))
+
+        # x[k+1] = A[k] @ x[k] + b[k] with x = (T_w, T_c)
+        coefficients = self._affine_step(dt=dt, losses=I_q**2 * self.R_ϕ_0)
+
+        block_size = max(math.isqrt(steps), 1)
+        number_of_blocks = steps // block_size
+        blocked = number_of_blocks * block_size
+        start_shape = (number_of_blocks, self._number_of_actuators)
+
+        a11, a12, a21, a22, b1, b2 = (
+            self._blocks(
+                values=x, block_size=block_size, number_of_blocks=number_of_blocks
+            )
+            for x in coefficients
+        )
+
+        # Affine map of every block
+        m11, m12, m21, m22, v1, v2 = (
+            np.array(np.broadcast_to(x[0], start_shape))
+            for x in (a11, a12, a21, a22, b1, b2)
+        )
+        for k in range(1, block_size):
+            c11, c12, c21, c22 = a11[k], a12[k], a21[k], a22[k]
+            m11, m12, m21, m22 = (
+                c11 * m11 + c12 * m21,
+                c11 * m12 + c12 * m22,
+                c21 * m11 + c22 * m21,
+                c21 * m12 + c22 * m22,
+            )
+            v1, v2 = c11 * v1 + c12 * v2 + b1[k], c21 * v1 + c22 * v2 + b2[k]
+
+        # State at the start of every block
+        start_w, start_c = np.empty(start_shape), np.empty(start_shape)
+        T_w, T_c = self.T_w, self.T_c
+        for i in range(number_of_blocks):
+            start_w[i], start_c[i] = T_w, T_c
+            T_w, T_c = (
+                m11[i] * T_w + m12[i] * T_c + v1[i],
+                m21[i] * T_w + m22[i] * T_c + v2[i],
+            )
+
+        # Steps of every block from its start state
+        blocks = temperatures[:blocked].reshape(
+            number_of_blocks, block_size, self._number_of_actuators, 2
+        )
+        T_blocks_w, T_blocks_c = start_w, start_c
+        for k in range(block_size):
+            T_blocks_w, T_blocks_c = (
+                a11[k] * T_blocks_w + a12[k] * T_blocks_c + b1[k],
+                a21[k] * T_blocks_w + a22[k] * T_blocks_c + b2[k],
+            )
+            blocks[:, k, :, 0] = T_blocks_w
+            blocks[:, k, :, 1] = T_blocks_c
+
+        # Remaining steps, fewer than in a block
+        c11, c12, c21, c22, d1, d2 = (
+            np.broadcast_to(x, I_q.shape)[blocked:] for x in coefficients
+        )
+        for k in range(steps - blocked):
+            T_w, T_c = (
+                c11[k] * T_w + c12[k] * T_c + d1[k],
+                c21[k] * T_w + c22[k] * T_c + d2[k],
+            )
+            temperatures[blocked + k, :, 0] = T_w
+            temperatures[blocked + k, :, 1] = T_c
+
+        self.T_w, self.T_c = np.array(T_w), np.array(T_c)
+
+        return temperatures
+
+    def _blocks(self, values: Any, block_size: int, number_of_blocks: int) -> Any:
+        """
+        Returns the coefficients of the steps that fill whole blocks, with shape
+        (block_size, number_of_blocks, N), or as they are if they are the same
+        for every step.
+        """
+        if np.ndim(values) < 2:
+            return np.broadcast_to(values, (block_size, 1, self._number_of_actuators))
+
+        blocks = values[: number_of_blocks * block_size].reshape(
+            number_of_blocks, block_size, self._number_of_actuators
+        )
+        return np.ascontiguousarray(blocks.transpose(1, 0, 2))
+
+    def _affine_step(self, dt: float, losses: np.ndarray) -> tuple:
+        """
+        Returns the coefficients of the step x[k+1] = A x[k] + b, with
+        x = (T_w, T_c), as (a11, a12, a21, a22, b1, b2).
+
+        Args:
+            dt (float): Time step in seconds.
+            losses (np.ndarray): Winding losses at the reference temperature R_T_0, in W.
+        """
+        heating = losses * self.α / self.C_w
+        a11 = heating - 1 / (self.R_WC * self.C_w)
+        a12 = 1 / (self.R_WC * self.C_w)
+        a21 = 1 / (self.R_WC * self.C_c)
+        a22 = -(1 / self.R_WC + 1 / self.R_CA) / self.C_c
+        b1 = losses * (1 - self.α * self.R_T_0) / self.C_w
+        b2 = self.T_a / (self.R_CA * self.C_c)
+
+        if self._integrator == "exact":
+            phi, psi = _discretize(a11=a11, a12=a12, a21=a21, a22=a22, dt=dt)
+            s11, s12, s21, s22 = psi
+            return phi + (s11 * b1 + s12 * b2, s21 * b1 + s22 * b2)
+
+        return 1 + dt * a11, dt * a12, dt * a21, 1 + dt * a22, dt * b1, dt * b2
+
+    def _step(self, dt: float, losses: np.ndarray) -> None:
+        a11, a12, a21, a22, b1, b2 = self._affine_step(dt=dt, losses=losses)
+        T_w, T_c = self.T_w, self.T_c
+        self.T_w = a11 * T_w + a12 * T_c + b1
+        self.T_c = a21 * T_w + a22 * T_c + b2
+
+    @property
+    def integrator(self) -> str:
+        return self._integrator
+
+    @property
+    def number_of_actuators(self) -> int:
+        return self._number_of_actuators
@@ -1,6 +1,9 @@
 #!/usr/bin/python3
+from typing import Callable, Optional
+
 import sys
 import time
+from concurrent.futures import ThreadPoolExecutor, wait
 
 import numpy as np
 
@@ -9,6 +12,7 @@ sys.path.append("../")
 from .hardware.joints import Joint, MockJoint
 from .hardware.sensors import Loadcell, MockLoadcell
 from .tools import utilities
+from .tools.clock import CLOCK
 from .tools.logger import Logger
 from .tools.utilities import SoftRealtimeLoop
 
@@ -35,6 +39,7 @@ class OpenSourceLeg:
         self,
         frequency: int = 200,
         file_name: str = "osl",
+        concurrent_update: bool = False,
     ) -> None:
         """
         Initialize the OSL class.
@@ -45,9 +50,17 @@ class OpenSourceLeg:
             The frequency of the control loop, by default 200
         file_name : str, optional
             The name of the log file, by default "./osl.log"
+        concurrent_update : bool, optional
+            Whether the update method should read every device at the same time
+            using a small persistent thread pool, by default False. The latency
+            of an update is then set by the slowest device instead of the sum
+            of all devices.
         """
 
         self._frequency: int = frequency
+        self._concurrent_update: bool = concurrent_update
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._executor_workers: int = 0
 
         self._has_knee: bool = False
         self._has_ankle: bool = False
@@ -65,7 +78,7 @@ class OpenSourceLeg:
 
         self.clock = SoftRealtimeLoop(dt=1.0 / self._frequency, report=False, fade=0.1)
 
-        self._timestamp: float = time.time()
+        self._timestamp: float = CLOCK.read()
 
     def __enter__(self) -> None:
 
@@ -86,6 +99,10 @@ class OpenSourceLeg:
         if self.has_ankle:
             self._ankle.stop()
 
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
     def __repr__(self) -> str:
         return f"OSL"
 
@@ -328,8 +345,35 @@ class OpenSourceLeg:
         self,
         log_data: bool = False,
     ) -> None:
+        """
+        Updates the joints and sensors, and logs the data if requested.
+
+        The timestamp is the time of the current tick of the library clock,
+        which is ticked by the loop (`osl.clock`) and not by this method, so
+        that every reading of the clock within one iteration sees the same
+        time. Outside of a loop that ticks the clock, it is a fresh sample.
+        When calling this method from a loop of your own, call `CLOCK.tick()`
+        at the start of every iteration and `CLOCK.release()` when it ends.
+
+        The reads are marked as the "read" phase of the tick and the logging as
+        the "log" phase (see `SoftRealtimeLoop.mark`), which break down the
+        compute time of the ticks that miss their deadline. The controller and
+        the commands run outside of this method: mark them yourself with
+        `osl.clock.mark("control")` and `osl.clock.mark("command")`.
+
+        Parameters
+        ----------
+        log_data : bool, optional
+            Whether to log the data of the OSL, by default False
+        """
+        self._timestamp = CLOCK.now()
+
+        if self._concurrent_update:
+            self._read_concurrently()
+
         if self.has_knee:
-            self._knee.update()
+            if not self._concurrent_update:
+                self._knee.update()
 
             if self.knee.case_temperature > self.knee.max_temperature:
                 self.log.warning(
@@ -339,7 +383,8 @@ class OpenSourceLeg:
                 exit()
 
         if self.has_ankle:
-            self._ankle.update()
+            if not self._concurrent_update:
+                self._ankle.update()
 
             if self.ankle.case_temperature > self.ankle.max_temperature:
                 self.log.warning(
@@ -348,13 +393,79 @@ class OpenSourceLeg:
                 self.__exit__()
                 exit()
 
-        if self.has_loadcell:
+        if self.has_loadcell and not self._concurrent_update:
             self._loadcell.update()
 
+        self.clock.mark("read")
+
         if log_data:
             self.log.data()
+            self.clock.mark("log")
+
+    def _get_read_tasks(self) -> list[Callable[[], None]]:
+        """
+        Returns one callable per independent device. A loadcell in dephy mode
+        reads its strain data from the genvars of its joint, so it is chained
+        behind that joint instead of being read on its own.
+        """
+        tasks: list[Callable[[], None]] = []
+        is_loadcell_chained: bool = False
+
+        for has_joint, joint in [
+            (self.has_knee, self._knee),
+            (self.has_ankle, self._ankle),
+        ]:
+            if not has_joint:
+                continue
+
+            if (
+                self.has_loadcell
+                and self._loadcell._is_dephy
+                and self._loadcell._joint is joint
+            ):
+                tasks.append(self._chain(joint.update, self._loadcell.update))
+                is_loadcell_chained = True
+            else:
+                tasks.append(joint.update)
+
+        if self.has_loadcell and not is_loadcell_chained:
+            tasks.append(self._loadcell.update)
+
+        return tasks
+
+    @staticmethod
+    def _chain(*functions: Callable[[], None]) -> Callable[[], None]:
+        def chained() -> None:
+            for function in functions:
+                function()
+
+        return chained
+
+    def _read_concurrently(self) -> None:
+        """
+        Reads every device at the same time and waits for all of them to
+        finish before returning, so that the data seen by the rest of the
+        update (and by the controller) is a consistent snapshot of this tick.
+        """
+        tasks = self._get_read_tasks()
+
+        if not tasks:
+            return
+
+        if self._executor is None or self._executor_workers < len(tasks):
+            if self._executor is not None:
+                self._executor.shutdown(wait=True)
+
+            self._executor = ThreadPoolExecutor(
+                max_workers=len(tasks), thread_name_prefix="osl-io"
+            )
+            self._executor_workers = len(tasks)
+
+        futures = [self._executor.submit(task) for task in tasks]
+        wait(futures)
 
-        self._timestamp = time.time()
+        for future in futures:
+            future.result()
 
     def home(self) -> None:
         if self.has_knee:
@@ -437,6 +548,10 @@ class OpenSourceLeg:
     def is_homed(self) -> bool:
         return self._is_homed
 
+    @property
+    def is_concurrent_update(self) -> bool:
+        return self._concurrent_update
+
 
 if __name__ == "__main__":
     osl = OpenSourceLeg(frequency=200)
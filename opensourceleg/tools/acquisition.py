@@ -0,0 +1,243 @@
+from typing import Any, Callable, Optional
+
+import threading
+
+from .clock import CLOCK
+
+"""
+Module Overview:
+
+This module provides the building blocks used to acquire data from devices in
+the background, away from the control loop. A dedicated reader thread keeps
+pulling samples from a device and publishes them into a "latest sample" slot,
+from which the control loop can pick up the newest sample in constant time
+without ever waiting on the device.
+
+Key Classes:
+
+- `LatestSample`: Single-writer, single-reader slot holding the newest sample
+  along with its sequence number and timestamp. It also keeps track of the
+  samples that were overwritten before being taken (dropped samples).
+- `BackgroundReader`: Thread that repeatedly calls a read function at a given
+  frequency and publishes the results into a `LatestSample` slot.
+
+Usage Guide:
+
+1. Create a `BackgroundReader` with the read function of your device.
+2. Start the reader thread using the `start` method.
+3. In the control loop, call `take` on the reader to get the newest sample.
+4. Check `age` and `dropped` to know how fresh the data is.
+5. Stop the reader thread using the `stop` method.
+
+"""
+
+
+class LatestSample:
+    """
+    A "latest sample" slot shared between one writer and one reader thread.
+
+    The writer publishes each sample as an immutable (sequence, timestamp, sample)
+    tuple that replaces the previous one with a single reference assignment, which
+    is atomic in CPython. The reader therefore never sees a half-written sample
+    and neither side ever blocks on a lock.
+
+    Timestamps are fresh samples of the library clock (CLOCK.read()), as the
+    writer runs outside of the ticks of the control loop, and sequence numbers
+    start at 1.
+    """
+
+    def __init__(self) -> None:
+        self._slot: Optional[tuple[int, float, Any]] = None
+        self._sequence: int = 0
+
+        self._last_sequence: int = 0
+        self._timestamp: float = 0.0
+        self._dropped: int = 0
+
+    def __repr__(self) -> str:
+        return f"LatestSample"
+
+    def publish(self, sample: Any) -> None:
+        """
+        Publishes a new sample, replacing the previous one. Must only be called
+        from the writer thread.
+
+        Args:
+            sample (Any): The sample to publish
+        """
+        self._sequence += 1
+        self._slot = (self._sequence, CLOCK.read(), sample)
+
+    def take(self) -> Optional[Any]:
+        """
+        Returns the newest sample, or None if nothing has been published yet.
+        Samples published since the last call but overwritten before they could
+        be taken are counted as dropped. Must only be called from the reader thread.
+
+        Returns:
+            Any: The newest sample
+        """
+        slot = self._slot
+
+        if slot is None:
+            return None
+
+        sequence, timestamp, sample = slot
+
+        if sequence > self._last_sequence + 1:
+            self._dropped += sequence - self._last_sequence - 1
+
+        self._last_sequence = sequence
+        self._timestamp = timestamp
+
+        return sample
+
+    @property
+    def sequence(self) -> int:
+        """Sequence number of the last sample taken, 0 if none was taken yet."""
+        return self._last_sequence
+
+    @property
+    def timestamp(self) -> float:
+        """Time of the library clock at which the last sample taken was published."""
+        return self._timestamp
+
+    @property
+    def age(self) -> float:
+        """Time in seconds since the last sample taken was published."""
+        if self._last_sequence == 0:
+            return float("inf")
+
+        return CLOCK.read() - self._timestamp
+
+    @property
+    def is_fresh(self) -> bool:
+        """Indicates if a sample newer than the last one taken is available."""
+        slot = self._slot
+        return slot is not None and slot[0] > self._last_sequence
+
+    @property
+    def dropped(self) -> int:
+        """Number of samples that were overwritten before being taken."""
+        return self._dropped
+
+
+class BackgroundReader:
+    """
+    Thread that calls a read function at a fixed frequency and publishes every
+    result into a `LatestSample` slot.
+
+    Exceptions raised by the read function do not stop the thread; they are
+    counted and the last one is kept for inspection. A read that returns None
+    (no new sample yet) publishes nothing.
+
+    Args:
+        read (Callable[[], Any]): Function that returns a new sample from the device, or None
+        frequency (float): Rate in Hz at which the device is read. Defaults to 500.
+        name (str): Name of the reader thread. Defaults to "reader".
+    """
+
+    def __init__(
+        self,
+        read: Callable[[], Any],
+        frequency: float = 500,
+        name: str = "reader",
+    ) -> None:
+        self._read: Callable[[], Any] = read
+        self._period: float = 1.0 / frequency
+        self._name: str = name
+
+        self._buffer: LatestSample = LatestSample()
+        self._stop_event: threading.Event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+        self._read_errors: int = 0
+        self._last_error: Optional[Exception] = None
+
+    def __repr__(self) -> str:
+        return f"BackgroundReader[{self._name}]"
+
+    def start(self) -> None:
+        """
+        Starts the reader thread. Does nothing if it is already running.
+        """
+        if self.is_running:
+            return
+
+        self._stop_event.clear()
+        self._thread = threading.Thread(
+            target=self._run, name=self._name, daemon=True
+        )
+        self._thread.start()
+
+    def stop(self, timeout: Optional[float] = 1.0) -> None:
+        """
+        Stops the reader thread and waits for it to exit.
+
+        Args:
+            timeout (float): Maximum time in seconds to wait for the thread. Defaults to 1.0.
+        """
+        self._stop_event.set()
+
+        if self._thread is not None:
+            self._thread.join(timeout=timeout)
+            self._thread = None
+
+    def take(self) -> Optional[Any]:
+        """
+        Returns the newest sample published by the reader thread, or None if
+        nothing has been read yet.
+        """
+        return self._buffer.take()
+
+    def _run(self) -> None:
+        next_read = CLOCK.read()
+
+        while not self._stop_event.is_set():
+            try:
+                sample = self._read()
+
+                if sample is not None:
+                    self._buffer.publish(sample)
+            except Exception as e:
+                self._read_errors += 1
+                self._last_error = e
+
+            next_read += self._period
+            delay = next_read - CLOCK.read()
+
+            if delay > 0:
+                self._stop_event.wait(timeout=delay)
+            else:
+                next_read = CLOCK.read()
+
+    @property
+    def buffer(self) -> LatestSample:
+        return self._buffer
+
+    @property
+    def is_running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    @property
+    def age(self) -> float:
+        """Time in seconds since the last sample taken was published."""
+        return self._buffer.age
+
+    @property
+    def dropped(self) -> int:
+        """Number of samples that were overwritten before being taken."""
+        return self._buffer.dropped
+
+    @property
+    def read_errors(self) -> int:
+        """Number of reads that raised an exception."""
+        return self._read_errors
+
+    @property
+    def last_error(self) -> Optional[Exception]:
+        return self._last_error
+
+
+if __name__ == "__main__":
+    pass
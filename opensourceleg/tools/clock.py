@@ -0,0 +1,189 @@
+from typing import Callable, Optional
+
+import time
+
+"""
+Module Overview:
+
+This module provides the monotonic timebase shared by the whole library. Every
+component that needs to know "now" (the soft realtime loop, the state machine,
+the OpenSourceLeg class, the joints) reads it from the same `Clock` instance,
+`CLOCK`, instead of calling time.time() on its own.
+
+The clock counts nanoseconds with time.monotonic_ns(), which never jumps when
+the system time is adjusted (e.g. by NTP during a long field session).
+
+Key Classes:
+
+- `Clock`: Monotonic clock that can be sampled once per tick and read back as
+  many times as needed during that tick, without further system calls.
+- `SimulatedClock`: Clock whose time only moves when it is set or advanced, for
+  simulations, log replays and tests.
+
+Usage Guide:
+
+1. Call `CLOCK.tick()` once at the start of every control loop iteration. The
+   `SoftRealtimeLoop` (e.g. `osl.clock`) already does this for you, and is the
+   only place of the library that does.
+2. Use `CLOCK.now()` to get the time of the current tick in seconds. It is
+   frozen between ticks. When the `SoftRealtimeLoop` exits, it releases the
+   clock, and `now()` falls back to a fresh sample until the clock is ticked
+   again. If you tick the clock yourself, call `CLOCK.release()` when your
+   loop ends.
+3. Use `CLOCK.read()` when you need a fresh sample, e.g. outside of a control loop.
+4. Pass a `SimulatedClock` to the components that accept a `clock` (e.g. the
+   `State` and `StateMachine` classes) to run them faster than real time.
+
+"""
+
+
+class Clock:
+    """
+    Monotonic clock, in seconds, sampled once per tick.
+
+    The source is a function returning an integer number of nanoseconds. Its
+    origin is arbitrary, so only differences between two readings are meaningful.
+
+    Args:
+        source (Callable[[], int]): Nanosecond counter. Defaults to time.monotonic_ns.
+    """
+
+    def __init__(self, source: Optional[Callable[[], int]] = None) -> None:
+        self._source: Callable[[], int] = (
+            source if source is not None else time.monotonic_ns
+        )
+        self._tick_ns: Optional[int] = None
+        self._ticks: int = 0
+
+    def __repr__(self) -> str:
+        return f"Clock"
+
+    def tick(self) -> float:
+        """
+        Samples the clock and makes the sample the time of the current tick.
+
+        Returns:
+            float: Time of the current tick in seconds
+        """
+        self._tick_ns = self._source()
+        self._ticks += 1
+        return self._tick_ns / 1e9
+
+    def now(self) -> float:
+        """
+        Returns the time of the current tick in seconds, without sampling the
+        clock again. The time is frozen until the next tick. Falls back to a
+        fresh sample if the clock was never ticked or was released.
+        """
+        if self._tick_ns is None:
+            return self.read()
+
+        return self._tick_ns / 1e9
+
+    def now_ns(self) -> int:
+        """
+        Returns the time of the current tick in nanoseconds.
+        """
+        if self._tick_ns is None:
+            return self._source()
+
+        return self._tick_ns
+
+    def read(self) -> float:
+        """
+        Samples the clock and returns the time in seconds, without changing the
+        time of the current tick.
+        """
+        return self._source() / 1e9
+
+    def read_ns(self) -> int:
+        return self._source()
+
+    def release(self) -> None:
+        """
+        Forgets the current tick, so that now() samples the clock again until
+        the next tick. Called by the loop that ticks the clock when it exits.
+        """
+        self._tick_ns = None
+
+    def reset(self, source: Optional[Callable[[], int]] = None) -> None:
+        """
+        Forgets the current tick and, optionally, replaces the source.
+
+        Args:
+            source (Callable[[], int]): New nanosecond counter. Defaults to None (unchanged).
+        """
+        if source is not None:
+            self._source = source
+
+        self._tick_ns = None
+        self._ticks = 0
+
+    @property
+    def source(self) -> Callable[[], int]:
+        return self._source
+
+    @property
+    def is_ticking(self) -> bool:
+        """Indicates if the clock was ticked since it was created, reset or released."""
+        return self._tick_ns is not None
+
+    @property
+    def ticks(self) -> int:
+        """Number of ticks since the clock was created or reset."""
+        return self._ticks
+
+
+class SimulatedClock(Clock):
+    """
+    Clock that never reads the system time: its time is set or advanced by
+    the caller, which also ticks it.
+
+    Args:
+        start (float): Initial time in seconds. Defaults to 0.0.
+    """
+
+    def __init__(self, start: float = 0.0) -> None:
+        self._time_ns: int = round(start * 1e9)
+        super().__init__(source=self._read_time_ns)
+
+    def __repr__(self) -> str:
+        return f"SimulatedClock"
+
+    def _read_time_ns(self) -> int:
+        return self._time_ns
+
+    def set(self, time: float) -> float:
+        """
+        Sets the time and ticks the clock.
+
+        Args:
+            time (float): New time in seconds
+
+        Returns:
+            float: Time of the current tick in seconds
+        """
+        return self.set_ns(time_ns=round(time * 1e9))
+
+    def set_ns(self, time_ns: int) -> float:
+        self._time_ns = time_ns
+        return self.tick()
+
+    def advance(self, dt: float) -> float:
+        """
+        Moves the time forward and ticks the clock.
+
+        Args:
+            dt (float): Time step in seconds
+
+        Returns:
+            float: Time of the current tick in seconds
+        """
+        return self.set_ns(time_ns=self._time_ns + round(dt * 1e9))
+
+
+CLOCK = Clock()
+
+
+if __name__ == "__main__":
+    pass
@@ -0,0 +1,260 @@
+from typing import Any, Optional, Sequence
+
+import struct
+from bisect import bisect_left, insort
+from math import isfinite
+
+import numpy as np
+
+"""
+Module Overview:
+
+This module provides streaming filters that take one multi-channel sample per
+control tick and return the filtered sample right away. They keep their state in
+plain Python lists, which for the handful of channels and samples involved is
+much cheaper than calling into NumPy on every tick.
+
+Key Class:
+
+- `MedianFilter`: Per-channel running median over the last `window` samples,
+  with an optional Hampel (median absolute deviation) outlier rejection.
+
+Usage Guide:
+
+1. Create a `MedianFilter` with the number of channels and the window length.
+2. Call `update` with every new sample to get the filtered sample. Pass a
+   preallocated float64 array as `out` to have it written in place instead of
+   getting a new array on every call.
+3. Pass an `outlier_threshold` to only replace the samples that deviate from
+   the median of the window by more than that many (scaled) MADs.
+
+"""
+
+# Scales the MAD to the standard deviation of normally distributed data
+MAD_SCALE = 1.4826
+
+
+class MedianFilter:
+    """
+    Streaming median filter over the last `window` samples of every channel.
+
+    The window starts filled with `initial`. The default 3-sample window uses a
+    fixed comparison network for the median of three, longer windows keep one
+    sorted copy of the window per channel, updated with a bisection per sample. For an
+    even window, the median is the mean of the two middle values, as in
+    np.median.
+
+    With an outlier threshold, the filter becomes a (causal) Hampel filter: the
+    newest value of a channel is passed through unless it is further than
+    `outlier_threshold` * 1.4826 * MAD from the median of the window, in which
+    case the median is returned instead.
+
+    Non-finite values (NaN or infinite) are replaced by the previous value of
+    their channel before they enter the window, and counted in `non_finite`.
+
+    Args:
+        channels (int): Number of channels per sample. Defaults to 6.
+        window (int): Number of samples in the window. Defaults to 3.
+        outlier_threshold (float): Number of scaled MADs above which a value is an outlier. Defaults to None (plain median filter).
+        initial (float): Value the window is filled with. Defaults to 0.0.
+    """
+
+    def __init__(
+        self,
+        channels: int = 6,
+        window: int = 3,
+        outlier_threshold: Optional[float] = None,
+        initial: float = 0.0,
+    ) -> None:
+        if window < 1:
+            raise ValueError(f"Invalid window length: {window}")
+
+        self._channels: int = channels
+        self._length: int = window
+        self._outlier_threshold: Optional[float] = outlier_threshold
+        self._index: int = 0
+        self._outliers: int = 0
+        self._non_finite: int = 0
+        self._median_of_three: bool = window == 3 and outlier_threshold is None
+        # Writes all the channels into a float64 array in one call
+        self._pack_into = struct.Struct(f"={channels}d").pack_into
+
+        self._ring: list[list[float]] = []
+        self._sorted: list[list[float]] = []
+        self.reset(value=initial)
+
+    def __repr__(self) -> str:
+        return f"MedianFilter[{self._length}]"
+
+    def reset(self, value: float = 0.0) -> None:
+        """
+        Fills the window with a constant value.
+
+        Args:
+            value (float): Value of every sample in the window. Defaults to 0.0.
+        """
+        self.load(samples=[[value] * self._channels for _ in range(self._length)])
+
+    def load(self, samples: Any, index: int = 0) -> None:
+        """
+        Replaces the window with the given samples.
+
+        Args:
+            samples (array-like): Samples of shape (window, channels), in ring buffer order.
+            index (int): Position in the ring buffer of the next sample. Defaults to 0.
+        """
+        ring = [list(sample) for sample in np.asarray(samples).tolist()]
+
+        if len(ring) != self._length or any(len(s) != self._channels for s in ring):
+            raise ValueError(
+                f"Expected samples of shape ({self._length}, {self._channels})"
+            )
+
+        if not np.isfinite(ring).all():
+            raise ValueError("Expected finite samples")
+
+        self._ring = ring
+        self._sorted = [sorted(values) for values in zip(*ring)]
+        self._index = index % self._length
+
+    def update(
+        self, sample: Sequence[float], out: Optional[np.ndarray] = None
+    ) -> np.ndarray:
+        """
+        Adds a sample to the window, replacing the oldest one, and returns the
+        filtered sample.
+
+        Args:
+            sample (Sequence[float]): One value per channel. Lists are the fastest. Non-finite values are replaced by the previous value of their channel.
+            out (np.ndarray): Contiguous float64 array of shape (channels,) the filtered sample is written to, which saves allocating a new array. Defaults to None.
+
+        Returns:
+            np.ndarray: Filtered sample, float64 of shape (channels,), `out` if given
+        """
+        ring = self._ring
+        index = self._index
+        sample = list(sample)
+
+        # A single check per sample: only NaN and infinite values, or an
+        # overflow, make the sum non-finite
+        if not isfinite(sum(sample)):
+            sample = self._replace_non_finite(sample=sample, previous=ring[index - 1])
+
+        if self._median_of_three:
+            ring[index] = sample
+            self._index = index + 1 if index < 2 else 0
+
+            # Fixed comparison network, no sorting and no function calls
+            a, b, c = ring
+            medians = [
+                (y if y < z else (z if x < z else x))
+                if x < y
+                else (x if x < z else (z if y < z else y))
+                for x, y, z in zip(a, b, c)
+            ]
+
+            if out is None:
+                return np.array(medians, dtype=np.float64)
+
+            self._pack_into(out, 0, *medians)
+            return out
+
+        oldest = ring[index]
+        ring[index] = sample
+        self._index = index + 1 if index + 1 < self._length else 0
+
+        middle = self._length // 2
+        even = self._length % 2 == 0
+        medians = []
+
+        for values, old, new in zip(self._sorted, oldest, sample):
+            del values[bisect_left(values, old)]
+            insort(values, new)
+            medians.append(
+                (values[middle - 1] + values[middle]) / 2 if even else values[middle]
+            )
+
+        if self._outlier_threshold is not None:
+            medians = self._reject_outliers(sample=sample, medians=medians)
+
+        return self._output(medians, out)
+
+    def _replace_non_finite(
+        self, sample: list[float], previous: list[float]
+    ) -> list[float]:
+        output = []
+
+        for new, old in zip(sample, previous):
+            if isfinite(new):
+                output.append(new)
+            else:
+                self._non_finite += 1
+                output.append(old)
+
+        return output
+
+    def _output(self, values: list[float], out: Optional[np.ndarray]) -> np.ndarray:
+        if out is None:
+            return np.array(values, dtype=np.float64)
+
+        self._pack_into(out, 0, *values)
+        return out
+
+    def _reject_outliers(
+        self, sample: list[float], medians: list[float]
+    ) -> list[float]:
+        middle = self._length // 2
+        even = self._length % 2 == 0
+        output = []
+
+        for values, new, median in zip(self._sorted, sample, medians):
+            deviations = sorted([abs(x - median) for x in values])
+            mad = (
+                (deviations[middle - 1] + deviations[middle]) / 2
+                if even
+                else deviations[middle]
+            )
+
+            if abs(new - median) > self._outlier_threshold * MAD_SCALE * mad:
+                self._outliers += 1
+                output.append(median)
+            else:
+                output.append(new)
+
+        return output
+
+    @property
+    def window(self) -> np.ndarray:
+        """Copy of the window, shape (window, channels), in ring buffer order."""
+        return np.array(self._ring, dtype=np.float64)
+
+    @property
+    def index(self) -> int:
+        """Position in the ring buffer of the next sample."""
+        return self._index
+
+    @property
+    def length(self) -> int:
+        return self._length
+
+    @property
+    def channels(self) -> int:
+        return self._channels
+
+    @property
+    def outlier_threshold(self) -> Optional[float]:
+        return self._outlier_threshold
+
+    @property
+    def outliers(self) -> int:
+        """Number of values replaced by the median since the filter was created."""
+        return self._outliers
+
+    @property
+    def non_finite(self) -> int:
+        """Number of non-finite values replaced since the filter was created."""
+        return self._non_finite
+
+
+if __name__ == "__main__":
+    pass
@@ -1,9 +1,17 @@
-from typing import Any, Callable, List, Union
+from typing import Any, Callable, List, Optional, Union
 
 import csv
+import itertools
+import json
 import logging
+import operator
+import os
+import struct
+import threading
 from logging.handlers import RotatingFileHandler
 
+import numpy as np
+
 """
 Module Overview:
 
@@ -14,6 +22,15 @@ Key Class:
 
 - `Logger`: Logs attributes of class instances to a CSV file. It supports
 setting different logging levels for file and stream handlers.
+- `AttributeSampler`: Compiles the attributes registered on the `Logger` into
+one getter per container, so that sampling a row is a single tight loop. It can
+also sample straight into a preallocated NumPy array.
+- `CSVDataWriter`: Writes logged rows as text to a CSV file, one row at a time.
+- `BinaryDataWriter`: Writes logged rows as raw float64/int64 values to a binary
+file, in large blocks. Use `read_binary_log` to load such a file back as a NumPy
+structured array and `binary_log_to_csv` to convert it to a CSV file offline.
+- `AsyncDataWriter`: Hands the logged rows over to a background thread through
+a bounded ring buffer, so that writing to disk never happens in the control loop.
 
 Usage Guide:
 
@@ -24,6 +41,10 @@ Usage Guide:
 4. Start logging data using the `data` method.
 5. Optionally, close the CSV file using the `close` method.
 
+Pass `data_format="binary"` to the `Logger` to write the data to a binary file
+instead, which is much cheaper per call when logging many signals at high rates.
+Pass `asynchronous=True` to write the data file from a background thread.
+
 Note:
 
 This file is referenced by the OSL class and is instantiated manually when an OSL
@@ -32,6 +53,540 @@ is instantiated.
 """
 
 
+class AttributeSampler:
+    """
+    Samples the attributes of a list of containers.
+
+    Every container is compiled once, when it is added, into a getter built with
+    operator.attrgetter (objects) or operator.itemgetter (dicts) that returns the
+    values of all of its attributes as a tuple. Sampling a row then only calls
+    these getters and concatenates their results.
+
+    Missing keys of a dict container are sampled as None.
+    """
+
+    def __init__(self) -> None:
+        self._containers: list[Union[object, dict[Any, Any]]] = []
+        self._attributes: list[list[str]] = []
+        self._getters: list[Callable[[], tuple[Any, ...]]] = []
+
+    def __repr__(self) -> str:
+        return f"AttributeSampler"
+
+    def __len__(self) -> int:
+        return sum(len(attributes) for attributes in self._attributes)
+
+    def add(self, container: Union[object, dict[Any, Any]], attributes: list[str]):
+        """
+        Compiles the getter of a container and adds it to the sampler.
+
+        Args:
+            container (object, dict): Instance of a class or dict containing the attributes
+            attributes (list[str]): List of attributes to sample
+        """
+        self._containers.append(container)
+        self._attributes.append(attributes)
+
+        if not attributes:
+            self._getters.append(tuple)
+        elif isinstance(container, dict):
+            self._getters.append(self._compile_items(container, attributes))
+        else:
+            self._getters.append(self._compile_attributes(container, attributes))
+
+    @staticmethod
+    def _compile_attributes(
+        container: object, attributes: list[str]
+    ) -> Callable[[], tuple[Any, ...]]:
+        getter = operator.attrgetter(*attributes)
+
+        if len(attributes) == 1:
+            return lambda: (getter(container),)
+
+        return lambda: getter(container)
+
+    @staticmethod
+    def _compile_items(
+        container: dict[Any, Any], attributes: list[str]
+    ) -> Callable[[], tuple[Any, ...]]:
+        getter = operator.itemgetter(*attributes)
+        is_single = len(attributes) == 1
+
+        def get_items() -> tuple[Any, ...]:
+            try:
+                values = getter(container)
+            except KeyError:
+                return tuple(container.get(attribute) for attribute in attributes)
+
+            return (values,) if is_single else values
+
+        return get_items
+
+    def header(self) -> list[str]:
+        """
+        Returns the name of every sampled attribute, prefixed by the repr of its
+        container when the container defines one.
+        """
+        header_data = []
+
+        for container, attributes in zip(self._containers, self._attributes):
+            for attribute in attributes:
+                if type(container) is dict:
+                    if "__main__" in container.values():
+                        header_data.append(f"{attribute}")
+                    else:
+                        header_data.append(f"{container}:{attribute}")
+                else:
+                    if type(container).__repr__ is not object.__repr__:
+                        header_data.append(f"{container}:{attribute}")
+                    else:
+                        header_data.append(f"{attribute}")
+
+        return header_data
+
+    def sample(self) -> tuple[Any, ...]:
+        """
+        Returns the current value of every attribute.
+        """
+        return tuple(
+            itertools.chain.from_iterable(getter() for getter in self._getters)
+        )
+
+    def sample_into(self, out: np.ndarray, index: Any = Ellipsis) -> None:
+        """
+        Samples the current value of every attribute into a preallocated array.
+
+        Args:
+            out (np.ndarray): A 1D array with one element per attribute, a 2D array
+                with one column per attribute, or a structured array with one field per attribute.
+            index (Any): Row of the array to sample into. Defaults to the whole array.
+        """
+        out[index] = self.sample()
+
+    @property
+    def containers(self) -> list[Union[object, dict[Any, Any]]]:
+        return self._containers
+
+    @property
+    def attributes(self) -> list[list[str]]:
+        return self._attributes
+
+
+BINARY_LOG_MAGIC: bytes = b"OSLLOG01"
+BINARY_LOG_EXTENSION: str = ".bin"
+
+
+class CSVDataWriter:
+    """
+    Writes rows of logged data to a CSV file. Every row is flushed to disk
+    as soon as it is written.
+
+    Args:
+        file_path (str): Path of the CSV file, including its extension
+    """
+
+    def __init__(self, file_path: str) -> None:
+        self._file = open(file_path, "w")
+        self._writer = csv.writer(self._file)
+
+    def __repr__(self) -> str:
+        return f"CSVDataWriter"
+
+    def write_header(self, header: list[str], row: list[Any]) -> None:
+        """
+        Writes the header of the file.
+
+        Args:
+            header (list[str]): Name of every column
+            row (list[Any]): First row of data, unused by this writer
+        """
+        self._writer.writerow(header)
+
+    def write_row(self, row: list[Any]) -> None:
+        self._writer.writerow(row)
+        self._file.flush()
+
+    def write_rows(self, rows: list[list[Any]]) -> None:
+        """
+        Writes several rows and flushes them to disk at once.
+        """
+        self._writer.writerows(rows)
+        self._file.flush()
+
+    def write_sample(self, sampler: AttributeSampler) -> None:
+        """
+        Samples a row and writes it.
+        """
+        self.write_row(sampler.sample())
+
+    def flush(self) -> None:
+        self._file.flush()
+
+    def close(self) -> None:
+        self._file.close()
+
+    @property
+    def file(self):
+        return self._file
+
+
+class BinaryDataWriter:
+    """
+    Writes rows of logged data to a binary file.
+
+    The column types are inferred from the first row: numpy integers and booleans
+    are stored as int64, every other number as float64. Rows are packed into a
+    preallocated buffer of `block_size` rows, which is written to disk in one go
+    once it is full, when `flush` is called, or when the writer is closed.
+
+    File layout:
+        1: The 8 bytes magic string "OSLLOG01".
+        2: The length of the JSON header as a little-endian uint32.
+        3: The JSON header, containing the names and dtypes of the columns.
+        4: The rows, packed back to back without any padding.
+
+    Args:
+        file_path (str): Path of the binary file, including its extension
+        block_size (int): Number of rows buffered in memory before they are written. Defaults to 1000.
+    """
+
+    def __init__(self, file_path: str, block_size: int = 1000) -> None:
+        self._file = open(file_path, "wb")
+        self._block_size: int = block_size
+        self._dtype: Optional[np.dtype] = None
+        self._buffer: Optional[np.ndarray] = None
+        self._index: int = 0
+
+    def __repr__(self) -> str:
+        return f"BinaryDataWriter"
+
+    def write_header(self, header: list[str], row: list[Any]) -> None:
+        """
+        Infers the type of every column from the first row of data, writes the
+        header of the file and allocates the row buffer. Repeated column names
+        are made unique by appending ".1", ".2", etc.
+
+        Args:
+            header (list[str]): Name of every column
+            row (list[Any]): First row of data
+
+        Raises:
+            TypeError: If a value is not a number
+        """
+        formats = []
+        names: list[str] = []
+
+        for name, value in zip(header, row):
+            if isinstance(value, (bool, np.bool_, np.integer)):
+                formats.append("<i8")
+            elif isinstance(value, (int, float, np.floating)):
+                formats.append("<f8")
+            else:
+                raise TypeError(
+                    f"Only numbers can be logged in binary format, got {type(value).__name__} for {name}."
+                )
+
+            # Field names must be unique, repeated names get a numbered suffix
+            unique_name, i = name, 1
+            while unique_name in names:
+                unique_name, i = f"{name}.{i}", i + 1
+            names.append(unique_name)
+
+        self._dtype = np.dtype({"names": names, "formats": formats})
+        self._buffer = np.zeros(shape=self._block_size, dtype=self._dtype)
+
+        header_data = json.dumps({"names": names, "formats": formats}).encode()
+        self._file.write(BINARY_LOG_MAGIC)
+        self._file.write(struct.pack("<I", len(header_data)))
+        self._file.write(header_data)
+
+    def write_row(self, row: list[Any]) -> None:
+        assert self._buffer is not None
+        self._buffer[self._index] = tuple(row)
+        self._index += 1
+
+        if self._index == self._block_size:
+            self._write_buffer()
+
+    def write_rows(self, rows: list[list[Any]]) -> None:
+        for row in rows:
+            self.write_row(row)
+
+    def write_sample(self, sampler: AttributeSampler) -> None:
+        """
+        Samples a row straight into the preallocated row buffer.
+        """
+        assert self._buffer is not None
+        sampler.sample_into(self._buffer, self._index)
+        self._index += 1
+
+        if self._index == self._block_size:
+            self._write_buffer()
+
+    def _write_buffer(self) -> None:
+        assert self._buffer is not None
+        self._file.write(self._buffer[: self._index].tobytes())
+        self._index = 0
+
+    def flush(self) -> None:
+        if self._buffer is not None and self._index > 0:
+            self._write_buffer()
+
+        self._file.flush()
+
+    def close(self) -> None:
+        if not self._file.closed:
+            self.flush()
+            self._file.close()
+
+    @property
+    def file(self):
+        return self._file
+
+    @property
+    def dtype(self) -> Optional[np.dtype]:
+        return self._dtype
+
+
+OVERFLOW_POLICIES: list[str] = ["drop_oldest", "drop_newest", "block"]
+
+
+class AsyncDataWriter:
+    """
+    Writes rows of logged data from a background thread.
+
+    Rows are copied into a bounded ring buffer by `write_row`, which is the only
+    work left in the calling thread. A writer thread drains the ring buffer and
+    hands the rows over to the wrapped writer in batches. The header is written
+    in the calling thread, so that the errors of the wrapped writer about the
+    first row (e.g. a value that is not a number in a binary log) are raised to
+    the caller, as with a synchronous writer. Later errors are kept in `error`.
+
+    When the ring buffer is full, the overflow policy decides what happens:
+        1: "drop_oldest": The oldest buffered row is overwritten.
+        2: "drop_newest": The new row is discarded.
+        3: "block": The caller waits until the writer thread makes room. If the
+           writer thread has stopped, the new row is discarded.
+    Rows discarded by any policy are counted in `dropped_rows`.
+
+    Args:
+        writer (CSVDataWriter, BinaryDataWriter): Writer used by the background thread
+        buffer_size (int): Number of rows the ring buffer can hold. Defaults to 1024.
+        overflow_policy (str): One of "drop_oldest", "drop_newest" or "block". Defaults to "drop_oldest".
+    """
+
+    def __init__(
+        self,
+        writer: Union[CSVDataWriter, BinaryDataWriter],
+        buffer_size: int = 1024,
+        overflow_policy: str = "drop_oldest",
+    ) -> None:
+        if overflow_policy not in OVERFLOW_POLICIES:
+            raise ValueError(f"Invalid overflow policy: {overflow_policy}")
+
+        self._writer: Union[CSVDataWriter, BinaryDataWriter] = writer
+        self._overflow_policy: str = overflow_policy
+
+        self._ring: list[Any] = [None] * buffer_size
+        self._buffer_size: int = buffer_size
+        self._head: int = 0
+        self._count: int = 0
+        self._dropped_rows: int = 0
+
+        self._condition = threading.Condition()
+        self._is_writing: bool = False
+        self._is_closed: bool = False
+        self._error: Optional[Exception] = None
+
+        self._thread = threading.Thread(
+            target=self._run, name="logger-writer", daemon=True
+        )
+        self._thread.start()
+
+    def __repr__(self) -> str:
+        return f"AsyncDataWriter"
+
+    def write_header(self, header: list[str], row: list[Any]) -> None:
+        """
+        Writes the header with the wrapped writer, in the calling thread.
+
+        Raises:
+            Exception: Any exception raised by the wrapped writer
+        """
+        with self._condition:
+            while self._count or self._is_writing:
+                self._condition.wait()
+
+            self._writer.write_header(header, row)
+
+    def write_row(self, row: list[Any]) -> None:
+        with self._condition:
+            if self._count == self._buffer_size:
+                if self._overflow_policy == "drop_newest":
+                    self._dropped_rows += 1
+                    return
+
+                elif self._overflow_policy == "drop_oldest":
+                    self._head = (self._head + 1) % self._buffer_size
+                    self._count -= 1
+                    self._dropped_rows += 1
+
+                else:
+                    while self._count == self._buffer_size and self._thread.is_alive():
+                        self._condition.wait()
+
+                    if self._count == self._buffer_size:
+                        self._dropped_rows += 1
+                        return
+
+            self._ring[(self._head + self._count) % self._buffer_size] = list(row)
+            self._count += 1
+            self._condition.notify_all()
+
+    def write_rows(self, rows: list[list[Any]]) -> None:
+        for row in rows:
+            self.write_row(row)
+
+    def write_sample(self, sampler: AttributeSampler) -> None:
+        """
+        Samples a row in the calling thread and buffers it for the writer thread.
+        """
+        self.write_row(sampler.sample())
+
+    def _take_rows(self) -> list[list[Any]]:
+        end = self._head + self._count
+
+        if end <= self._buffer_size:
+            rows = self._ring[self._head : end]
+        else:
+            rows = self._ring[self._head :] + self._ring[: end - self._buffer_size]
+
+        self._head = end % self._buffer_size
+        self._count = 0
+
+        return rows
+
+    def _run(self) -> None:
+        while True:
+            with self._condition:
+                while not (self._count or self._is_closed):
+                    self._condition.wait()
+
+                rows = self._take_rows()
+                is_closed = self._is_closed
+                self._is_writing = True
+                self._condition.notify_all()
+
+            try:
+                if rows:
+                    self._writer.write_rows(rows)
+
+            except Exception as e:
+                self._error = e
+
+            with self._condition:
+                self._is_writing = False
+                self._condition.notify_all()
+
+            if is_closed and not rows:
+                return
+
+    def flush(self) -> None:
+        """
+        Waits until every buffered row has been handed over to the wrapped
+        writer, then flushes it.
+        """
+        with self._condition:
+            while (self._count or self._is_writing) and self._thread.is_alive():
+                self._condition.wait()
+
+        self._writer.flush()
+
+    def close(self) -> None:
+        """
+        Writes every buffered row, stops the writer thread and closes the wrapped writer.
+        """
+        with self._condition:
+            self._is_closed = True
+            self._condition.notify_all()
+
+        self._thread.join()
+        self._writer.close()
+
+    @property
+    def file(self):
+        return self._writer.file
+
+    @property
+    def dropped_rows(self) -> int:
+        """Number of rows lost because the ring buffer was full."""
+        return self._dropped_rows
+
+    @property
+    def pending_rows(self) -> int:
+        """Number of rows waiting in the ring buffer."""
+        return self._count
+
+    @property
+    def error(self) -> Optional[Exception]:
+        """Last exception raised by the wrapped writer in the writer thread, if any."""
+        return self._error
+
+
+def read_binary_log(file_path: str) -> np.ndarray:
+    """
+    Loads a binary log written by the `Logger` as a NumPy structured array.
+    Each column can be accessed by name, e.g. data["knee:output_position"].
+    Incomplete rows at the end of the file, e.g. after a crash, are ignored.
+
+    Args:
+        file_path (str): Path of the binary log
+
+    Returns:
+        np.ndarray: Structured array with one field per logged attribute
+
+    Raises:
+        ValueError: If the file is not a binary log
+    """
+    with open(file_path, "rb") as f:
+        if f.read(len(BINARY_LOG_MAGIC)) != BINARY_LOG_MAGIC:
+            raise ValueError(f"{file_path} is not a binary log.")
+
+        (header_length,) = struct.unpack("<I", f.read(4))
+        header = json.loads(f.read(header_length).decode())
+
+    dtype = np.dtype({"names": header["names"], "formats": header["formats"]})
+    offset = len(BINARY_LOG_MAGIC) + 4 + header_length
+    count = (os.path.getsize(file_path) - offset) // dtype.itemsize
+
+    return np.fromfile(file_path, dtype=dtype, count=count, offset=offset)
+
+
+def binary_log_to_csv(file_path: str, csv_file_path: Optional[str] = None) -> str:
+    """
+    Converts a binary log written by the `Logger` to a CSV file with the same
+    layout as the one the `Logger` writes in CSV format.
+
+    Args:
+        file_path (str): Path of the binary log
+        csv_file_path (str): Path of the CSV file. Defaults to the path of the binary log with a .csv extension.
+
+    Returns:
+        str: Path of the CSV file
+    """
+    if csv_file_path is None:
+        csv_file_path = os.path.splitext(file_path)[0] + ".csv"
+
+    data = read_binary_log(file_path)
+
+    with open(csv_file_path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(data.dtype.names)
+        writer.writerows(data.tolist())
+
+    return csv_file_path
+
+
 class Logger(logging.Logger):
     """
     Logger class is a class that logs attributes from a class to a csv file
@@ -39,21 +594,55 @@ class Logger(logging.Logger):
     Methods:
         __init__(self, container: object, file_path: str, logger: logging.Logger = None) -> None
         log(self) -> None
+
+    Args:
+        file_path (str): Path of the log files, without extension. Defaults to "./osl".
+        log_format (str): Format of the text log messages.
+        data_format (str): Format of the data file, either "csv" or "binary". Defaults to "csv".
+        asynchronous (bool): Whether the data file is written by a background thread. Defaults to False.
+        buffer_size (int): Number of rows buffered for the background thread. Defaults to 1024.
+        overflow_policy (str): What to do when the buffer is full in asynchronous mode,
+            one of "drop_oldest", "drop_newest" or "block". Defaults to "drop_oldest".
     """
 
     def __init__(
         self,
         file_path: str = "./osl",
         log_format: str = "[%(asctime)s] %(levelname)s: %(message)s",
+        data_format: str = "csv",
+        asynchronous: bool = False,
+        buffer_size: int = 1024,
+        overflow_policy: str = "drop_oldest",
     ) -> None:
 
         self._file_path: str = file_path + ".log"
 
-        self._containers: list[Union[object, dict[Any, Any]]] = []
-        self._attributes: list[list[str]] = []
+        self._sampler: AttributeSampler = AttributeSampler()
+        self._containers: list[Union[object, dict[Any, Any]]] = (
+            self._sampler.containers
+        )
+        self._attributes: list[list[str]] = self._sampler.attributes
 
-        self._file = open(file_path + ".csv", "w")
-        self._writer = csv.writer(self._file)
+        self._data_format: str = data_format
+        self._data_writer: Union[CSVDataWriter, BinaryDataWriter, AsyncDataWriter]
+
+        if data_format == "csv":
+            self._data_writer = CSVDataWriter(file_path=file_path + ".csv")
+        elif data_format == "binary":
+            self._data_writer = BinaryDataWriter(
+                file_path=file_path + BINARY_LOG_EXTENSION
+            )
+        else:
+            raise ValueError(f"Invalid data format: {data_format}")
+
+        if asynchronous:
+            self._data_writer = AsyncDataWriter(
+                writer=self._data_writer,
+                buffer_size=buffer_size,
+                overflow_policy=overflow_policy,
+            )
+
+        self._file = self._data_writer.file
 
         self._log_levels = {
             "DEBUG": logging.DEBUG,
@@ -124,49 +713,83 @@ class Logger(logging.Logger):
                 or a Dict containing the attributes to be logged.
             attributes (list[str]): List of attributes to log
         """
-        self._containers.append(container)
-        self._attributes.append(attributes)
+        if self._is_logging and self._data_format == "binary":
+            self.warning(
+                msg=f"Attributes {attributes} can't be added to a binary log once logging has started."
+            )
+            return
+
+        self._sampler.add(container=container, attributes=attributes)
 
     def data(self) -> None:
         """
-        Logs the attributes of the class instance to the csv file
+        Logs the attributes of the class instance to the data file
         """
-        header_data = []
-        data = []
-
         if not self._is_logging:
-            for container, attributes in zip(self._containers, self._attributes):
-                for attribute in attributes:
-                    if type(container) is dict:
-                        if "__main__" in container.values():
-                            header_data.append(f"{attribute}")
-                        else:
-                            header_data.append(f"{container}:{attribute}")
-                    else:
-                        if type(container).__repr__ is not object.__repr__:
-                            header_data.append(f"{container}:{attribute}")
-                        else:
-                            header_data.append(f"{attribute}")
-
-            self._writer.writerow(header_data)
+            # The first row types the columns of the header, it is sampled once
+            row = list(self._sampler.sample())
+            self._data_writer.write_header(self._sampler.header(), row)
+            self._data_writer.write_row(row)
             self._is_logging = True
+            return
 
-        for container, attributes in zip(self._containers, self._attributes):
-            if isinstance(container, dict):
-                for attribute in attributes:
-                    data.append(container.get(attribute))
-            else:
-                for attribute in attributes:
-                    data.append(getattr(container, attribute))
+        self._data_writer.write_sample(self._sampler)
 
-        self._writer.writerow(data)
-        self._file.flush()
+    def sample(self) -> tuple[Any, ...]:
+        """
+        Returns the current value of every attribute added to the logger,
+        without writing them to the data file.
+        """
+        return self._sampler.sample()
+
+    def sample_into(self, out: np.ndarray, index: Any = Ellipsis) -> None:
+        """
+        Samples the current value of every attribute added to the logger into a
+        preallocated array, without writing them to the data file.
+
+        Args:
+            out (np.ndarray): A 1D array with one element per attribute, a 2D array
+                with one column per attribute, or a structured array with one field per attribute.
+            index (Any): Row of the array to sample into. Defaults to the whole array.
+        """
+        self._sampler.sample_into(out, index)
+
+    def flush(self) -> None:
+        """
+        Writes any buffered data to the data file
+        """
+        self._data_writer.flush()
+        self._check_data_writer()
 
     def close(self) -> None:
         """
-        Closes the csv file
+        Closes the data file
         """
-        self._file.close()
+        self._data_writer.close()
+        self._check_data_writer()
+
+    def _check_data_writer(self) -> None:
+        """
+        Reports the last error of the background writer, which can't be raised
+        to the caller of `data`.
+        """
+        if isinstance(self._data_writer, AsyncDataWriter) and (
+            self._data_writer.error is not None
+        ):
+            self.error(
+                msg=f"Data could not be written to {self._file.name}: {self._data_writer.error!r}"
+            )
+
+    @property
+    def dropped_rows(self) -> int:
+        """
+        Number of rows lost because the buffer of the background writer was full.
+        Always 0 when not logging asynchronously.
+        """
+        if isinstance(self._data_writer, AsyncDataWriter):
+            return self._data_writer.dropped_rows
+
+        return 0
 
 
 if __name__ == "__main__":
@@ -1,15 +1,59 @@
+from typing import Optional
+
 import csv
 import ctypes
+import ctypes.util
 import glob
+import select
 import signal
+import socket
 import sys
+import threading
 import time
+from collections import deque
+from dataclasses import dataclass, field
 from math import sqrt
 
 import serial
 
+from .clock import CLOCK
+
 PRECISION_OF_SLEEP = 0.0001
 
+OVERRUN_POLICIES = ("catch_up", "skip", "rephase")
+
+_CLOCK_MONOTONIC = 1
+_TIMER_ABSTIME = 1
+
+
+class _Timespec(ctypes.Structure):
+    _fields_ = [("tv_sec", ctypes.c_long), ("tv_nsec", ctypes.c_long)]
+
+
+def _load_clock_nanosleep():
+    """
+    Returns the clock_nanosleep function of the C library, or None if it is not
+    available on this platform (e.g. macOS or Windows).
+    """
+    if not sys.platform.startswith("linux"):
+        return None
+
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        clock_nanosleep = libc.clock_nanosleep
+    except (OSError, AttributeError):
+        return None
+
+    clock_nanosleep.argtypes = [
+        ctypes.c_int,
+        ctypes.c_int,
+        ctypes.POINTER(_Timespec),
+        ctypes.POINTER(_Timespec),
+    ]
+    clock_nanosleep.restype = ctypes.c_int
+
+    return clock_nanosleep
+
 
 class LoopKiller:
     """
@@ -48,7 +92,7 @@ class LoopKiller:
     def get_fade(self):
         # interpolates from 1 to zero with soft fade out
         if self._kill_soon:
-            t = time.time() - self._soft_kill_time
+            t = CLOCK.read() - self._soft_kill_time
             if t >= self._fade_time:
                 return 0.0
             return 1.0 - (t / self._fade_time)
@@ -62,7 +106,7 @@ class LoopKiller:
         if self._kill_now:
             return True
         if self._kill_soon:
-            t = time.time() - self._soft_kill_time
+            t = CLOCK.read() - self._soft_kill_time
             if t > self._fade_time:
                 self._kill_now = True
         return self._kill_now
@@ -75,7 +119,7 @@ class LoopKiller:
             else:
                 if self._fade_time > 0.0:
                     self._kill_soon = True
-                    self._soft_kill_time = time.time()
+                    self._soft_kill_time = CLOCK.read()
                 else:
                     self._kill_now = True
         else:
@@ -84,6 +128,212 @@ class LoopKiller:
             self._soft_kill_time = None
 
 
+class Histogram:
+    """
+    Fixed-width histogram that is updated online, in constant time per sample.
+    Values beyond the last bin are counted in an overflow bin, and the exact
+    maximum is tracked separately.
+
+    Args:
+        bin_width (float): Width of each bin. Defaults to 1e-5 (10 us).
+        number_of_bins (int): Number of bins, starting at 0. Defaults to 1000.
+    """
+
+    def __init__(self, bin_width: float = 1e-5, number_of_bins: int = 1000) -> None:
+        self.bin_width = bin_width
+        self.counts = [0] * (number_of_bins + 1)
+        self.count = 0
+        self.max = float("-inf")
+
+    def __repr__(self) -> str:
+        return f"Histogram"
+
+    def add(self, value: float) -> None:
+        index = int(value / self.bin_width) if value > 0 else 0
+        self.counts[min(index, len(self.counts) - 1)] += 1
+        self.count += 1
+
+        if value > self.max:
+            self.max = value
+
+    def percentile(self, q: float) -> float:
+        """
+        Returns the q-th percentile of the values added so far, resolved to the
+        upper edge of its bin, or nan if no value was added yet. Percentiles
+        that fall in the overflow bin return the maximum.
+
+        Args:
+            q (float): Percentile, between 0 and 100
+        """
+        if self.count == 0:
+            return float("nan")
+
+        target = q / 100 * self.count
+        cumulative = 0
+
+        for index, count in enumerate(self.counts[:-1]):
+            cumulative += count
+            if count and cumulative >= target:
+                return min((index + 1) * self.bin_width, self.max)
+
+        return self.max
+
+
+class TimingEngine:
+    """
+    Waits until absolute deadlines on the time.monotonic_ns() clock.
+
+    Most of the wait is spent asleep: with clock_nanosleep(TIMER_ABSTIME) on
+    CLOCK_MONOTONIC where the C library provides it, and with time.sleep()
+    otherwise. Only the last spin_window seconds before the deadline are spent
+    busy-waiting, to absorb the wake-up latency of the scheduler.
+
+    With use_signal_fd=True, the sleep is done with select() on a socket that
+    the interpreter writes to whenever a signal arrives (signal.set_wakeup_fd),
+    so that SIGINT/SIGTERM/SIGHUP end the wait immediately instead of being
+    polled for. This only works from the main thread; elsewhere the engine falls
+    back to sleeping.
+
+    Args:
+        spin_window (float): Time in seconds spent busy-waiting before each deadline. Defaults to 0.0002.
+        use_nanosleep (bool): Sleeps with clock_nanosleep when available. Defaults to True.
+        use_signal_fd (bool): Wakes up on signals through a wakeup fd. Defaults to False.
+    """
+
+    def __init__(
+        self,
+        spin_window: float = 2 * PRECISION_OF_SLEEP,
+        use_nanosleep: bool = True,
+        use_signal_fd: bool = False,
+    ) -> None:
+        self._spin_window_ns: int = int(spin_window * 1e9)
+        self._clock_nanosleep = _load_clock_nanosleep() if use_nanosleep else None
+        self._timespec: _Timespec = _Timespec()
+
+        self._use_signal_fd: bool = use_signal_fd
+        self._sockets: Optional[tuple[socket.socket, socket.socket]] = None
+        self._previous_wakeup_fd: int = -1
+
+    def __repr__(self) -> str:
+        return f"TimingEngine"
+
+    def wait_until(self, deadline_ns: int, killer: Optional["LoopKiller"] = None) -> float:
+        """
+        Blocks until deadline_ns, or until the killer is triggered.
+
+        Args:
+            deadline_ns (int): Deadline on the time.monotonic_ns() clock
+            killer (LoopKiller): Ends the wait early when its kill_now flag is set. Defaults to None.
+
+        Returns:
+            float: Time in seconds spent asleep (as opposed to spinning)
+        """
+        slept = 0.0
+        sleep_until_ns = deadline_ns - self._spin_window_ns
+
+        if self._use_signal_fd and self._sockets is None:
+            self._open_signal_fd()
+
+        while True:
+            if killer is not None and killer.kill_now:
+                return slept
+
+            now_ns = time.monotonic_ns()
+            if now_ns >= sleep_until_ns:
+                break
+
+            self._sleep_until(sleep_until_ns, now_ns)
+            slept += (time.monotonic_ns() - now_ns) * 1e-9
+
+        while time.monotonic_ns() < deadline_ns:
+            if killer is not None and killer.kill_now:
+                break
+
+        return slept
+
+    def _sleep_until(self, deadline_ns: int, now_ns: int) -> None:
+        if self._sockets is not None:
+            readable, _, _ = select.select(
+                [self._sockets[0]], [], [], (deadline_ns - now_ns) * 1e-9
+            )
+            if readable:
+                try:
+                    self._sockets[0].recv(4096)
+                except BlockingIOError:
+                    pass
+        elif self._clock_nanosleep is not None:
+            self._timespec.tv_sec, self._timespec.tv_nsec = divmod(
+                deadline_ns, 1_000_000_000
+            )
+            self._clock_nanosleep(
+                _CLOCK_MONOTONIC, _TIMER_ABSTIME, ctypes.byref(self._timespec), None
+            )
+        else:
+            time.sleep((deadline_ns - now_ns) * 1e-9)
+
+    def _open_signal_fd(self) -> None:
+        if threading.current_thread() is not threading.main_thread():
+            self._use_signal_fd = False
+            return
+
+        reader, writer = socket.socketpair()
+        reader.setblocking(False)
+        writer.setblocking(False)
+        self._previous_wakeup_fd = signal.set_wakeup_fd(writer.fileno())
+        self._sockets = (reader, writer)
+
+    def close(self) -> None:
+        """
+        Restores the previous signal wakeup fd and closes the sockets, if the
+        engine opened them.
+        """
+        if self._sockets is None:
+            return
+
+        try:
+            signal.set_wakeup_fd(self._previous_wakeup_fd)
+        except ValueError:
+            pass
+
+        for sock in self._sockets:
+            sock.close()
+
+        self._sockets = None
+
+    @property
+    def spin_window(self) -> float:
+        return self._spin_window_ns * 1e-9
+
+    @property
+    def uses_nanosleep(self) -> bool:
+        return self._clock_nanosleep is not None and self._sockets is None
+
+    @property
+    def uses_signal_fd(self) -> bool:
+        return self._sockets is not None
+
+
+@dataclass
+class DeadlineMiss:
+    """
+    A tick of the SoftRealtimeLoop whose body did not finish before the deadline
+    of the next tick.
+
+    Args:
+        tick (int): Index of the tick that overran, starting at 0
+        lateness (float): Time in seconds by which the deadline was missed
+        compute_time (float): Time in seconds spent in the body of the tick
+        phases (dict[str, float]): Time in seconds spent in each phase marked with SoftRealtimeLoop.mark
+        consecutive (int): Number of consecutive ticks that missed their deadline, this one included
+    """
+
+    tick: int
+    lateness: float
+    compute_time: float
+    phases: dict[str, float] = field(default_factory=dict)
+    consecutive: int = 1
+
+
 class SoftRealtimeLoop:
     """
     Soft Realtime Loop---a class designed to allow clean exits from infinite loops
@@ -103,11 +353,40 @@ class SoftRealtimeLoop:
     # Author: Gray C. Thomas, Ph.D
     # https://github.com/GrayThomas, https://graythomas.github.io
 
+    All times are read from the library clock (CLOCK), which is ticked once
+    every time the loop wakes up, and released when the loop exits so that
+    CLOCK.now() no longer returns the time of its last tick.
+
+    Waiting for the next tick is delegated to a `TimingEngine`, which can be
+    passed in to tune the spin window or to enable the signal wakeup fd. The
+    period of every tick and how late it started (overrun) are kept in online
+    histograms, from which percentiles are reported.
+
+    When the body of a tick overruns the deadline of the next one, a
+    `DeadlineMiss` is recorded with the compute time of the tick, broken down
+    by the phases marked with `mark`. The overrun_policy then decides when the
+    next ticks happen:
+
+    - "catch_up": keeps the original schedule, running the missed ticks back to back.
+    - "skip": drops the missed ticks and resumes on the original schedule.
+    - "rephase": restarts the schedule one period after the late tick.
+
+    Use `on_consecutive_misses` to be called back when too many ticks in a
+    row miss their deadline, e.g. to degrade the controller gracefully.
     """
 
-    def __init__(self, dt=0.001, report=False, fade=0.0):
-        self.t0 = self.t1 = time.time()
+    def __init__(
+        self,
+        dt=0.001,
+        report=False,
+        fade=0.0,
+        engine=None,
+        overrun_policy="catch_up",
+        max_misses_kept=100,
+    ):
+        self.t0 = self.t1 = CLOCK.read()
         self.killer = LoopKiller(fade_time=fade)
+        self.engine = engine if engine is not None else TimingEngine()
         self.dt = dt
         self.ttarg = None
         self.sum_err = 0.0
@@ -115,6 +394,27 @@ class SoftRealtimeLoop:
         self.sleep_t_agg = 0.0
         self.n = 0
         self.report = report
+        self.period_histogram = Histogram(bin_width=dt / 100, number_of_bins=400)
+        self.overrun_histogram = Histogram(bin_width=dt / 100, number_of_bins=400)
+        self._last_tick = None
+
+        if overrun_policy not in OVERRUN_POLICIES:
+            raise ValueError(
+                f"Invalid overrun policy: {overrun_policy}, must be one of {OVERRUN_POLICIES}"
+            )
+
+        self.overrun_policy = overrun_policy
+        self.deadline_misses = deque(maxlen=max_misses_kept)
+        self.missed_deadlines = 0
+        self.consecutive_misses = 0
+        self.skipped_ticks = 0
+        self._ticks = 0
+        self._tick_start = None
+        self._last_mark = None
+        self._phases = {}
+        self._missed = False
+        self._miss_callback = None
+        self._miss_threshold = 1
 
     def __repr__(self) -> str:
         return f"SoftRealtimeLoop"
@@ -131,6 +431,27 @@ class SoftRealtimeLoop:
                 "\tpercent of time sleeping: %.1f %%"
                 % (self.sleep_t_agg / self.time() * 100.0)
             )
+            print(
+                "\tperiod p50/p99/max: %.3f / %.3f / %.3f milliseconds"
+                % (
+                    1e3 * self.period_histogram.percentile(50),
+                    1e3 * self.period_histogram.percentile(99),
+                    1e3 * self.period_histogram.max,
+                )
+            )
+            print(
+                "\toverrun p50/p99/max: %.3f / %.3f / %.3f milliseconds"
+                % (
+                    1e3 * self.overrun_histogram.percentile(50),
+                    1e3 * self.overrun_histogram.percentile(99),
+                    1e3 * self.overrun_histogram.max,
+                )
+            )
+            print(
+                "\tmissed deadlines: %d, skipped ticks: %d"
+                % (self.missed_deadlines, self.skipped_ticks)
+            )
+        self.engine.close()
 
     @property
     def fade(self):
@@ -139,62 +460,146 @@ class SoftRealtimeLoop:
     def run(self, function_in_loop, dt=None):
         if dt is None:
             dt = self.dt
-        self.t0 = self.t1 = time.time() + dt
-        while not self.killer.kill_now:
-            ret = function_in_loop()
-            if ret == 0:
-                self.stop()
-            while time.time() < self.t1 and not self.killer.kill_now:
-                if signal.sigtimedwait(
-                    [signal.SIGTERM, signal.SIGINT, signal.SIGHUP], 0
-                ):
+        self.t0 = self.t1 = CLOCK.read() + dt
+        try:
+            while not self.killer.kill_now:
+                ret = function_in_loop()
+                if ret == 0:
                     self.stop()
-            self.t1 += dt
+                self._check_deadline()
+                self._wait_for_tick()
+                self._advance(dt)
+        finally:
+            CLOCK.release()
 
     def stop(self):
         self.killer.kill_now = True
 
+    def mark(self, phase):
+        """
+        Marks the end of a phase of the current tick (e.g. "read", "control",
+        "command" or "log"). The time since the previous mark, or since the start
+        of the tick, is attributed to this phase and reported in DeadlineMiss events.
+
+        Args:
+            phase (str): Name of the phase
+        """
+        now_ns = CLOCK.read_ns()
+
+        if self._last_mark is not None:
+            self._phases[phase] = (
+                self._phases.get(phase, 0.0) + (now_ns - self._last_mark) * 1e-9
+            )
+
+        self._last_mark = now_ns
+
+    def on_consecutive_misses(self, callback, threshold=3):
+        """
+        Registers a callback that is called with the DeadlineMiss event as soon as
+        threshold ticks in a row have missed their deadline. It is called again
+        only after a tick meets its deadline and the misses pile up once more.
+
+        Args:
+            callback (Callable[[DeadlineMiss], None]): Function to call
+            threshold (int): Number of consecutive misses. Defaults to 3.
+        """
+        self._miss_callback = callback
+        self._miss_threshold = threshold
+
+    def _check_deadline(self):
+        if self._tick_start is None:
+            return
+
+        now_ns = CLOCK.read_ns()
+        lateness = now_ns * 1e-9 - self.t1
+        self._missed = lateness > 0
+
+        if not self._missed:
+            self.consecutive_misses = 0
+            return
+
+        self.missed_deadlines += 1
+        self.consecutive_misses += 1
+
+        miss = DeadlineMiss(
+            tick=self._ticks - 1,
+            lateness=lateness,
+            compute_time=(now_ns - self._tick_start) * 1e-9,
+            phases=self._phases,
+            consecutive=self.consecutive_misses,
+        )
+        self.deadline_misses.append(miss)
+
+        if (
+            self._miss_callback is not None
+            and self.consecutive_misses == self._miss_threshold
+        ):
+            self._miss_callback(miss)
+
+    def _advance(self, dt):
+        """
+        Schedules the deadline of the next tick according to the overrun policy.
+        """
+        shift = 0.0
+
+        if self._missed and self.overrun_policy == "skip":
+            skipped = int((CLOCK.now() - self.t1) // dt)
+            self.skipped_ticks += skipped
+            shift = skipped * dt
+        elif self._missed and self.overrun_policy == "rephase":
+            shift = CLOCK.now() - self.t1
+
+        self.t1 += dt + shift
+
+        if self.ttarg is not None:
+            self.ttarg += shift
+
     def time(self):
-        return time.time() - self.t0
+        return CLOCK.read() - self.t0
 
     def time_since(self):
-        return time.time() - self.t1
+        return CLOCK.read() - self.t1
 
     def __iter__(self):
-        self.t0 = self.t1 = time.time() + self.dt
+        self.t0 = self.t1 = CLOCK.read() + self.dt
         return self
 
+    def _wait_for_tick(self):
+        deadline_ns = round(self.t1 * 1e9)
+        self.sleep_t_agg += self.engine.wait_until(deadline_ns, self.killer)
+
+        if self.killer.kill_now:
+            return
+
+        CLOCK.tick()
+        tick = CLOCK.now_ns()
+        if self._last_tick is not None:
+            self.period_histogram.add((tick - self._last_tick) * 1e-9)
+            self.overrun_histogram.add(max(0.0, (tick - deadline_ns) * 1e-9))
+        self._last_tick = tick
+
+        self._ticks += 1
+        self._tick_start = self._last_mark = tick
+        self._phases = {}
+
     def __next__(self):
         if self.killer.kill_now:
+            CLOCK.release()
             raise StopIteration
 
-        while (
-            time.time() < self.t1 - 2 * PRECISION_OF_SLEEP and not self.killer.kill_now
-        ):
-            t_pre_sleep = time.time()
-            time.sleep(
-                max(PRECISION_OF_SLEEP, self.t1 - time.time() - PRECISION_OF_SLEEP)
-            )
-            self.sleep_t_agg += time.time() - t_pre_sleep
-
-        while time.time() < self.t1 and not self.killer.kill_now:
-            try:
-                if signal.sigtimedwait(
-                    [signal.SIGTERM, signal.SIGINT, signal.SIGHUP], 0
-                ):
-                    self.stop()
-            except AttributeError:
-                pass
+        self._check_deadline()
+        self._wait_for_tick()
 
         if self.killer.kill_now:
+            CLOCK.release()
             raise StopIteration
-        self.t1 += self.dt
+        self._advance(self.dt)
         if self.ttarg is None:
             # inits ttarg on first call
-            self.ttarg = time.time() + self.dt
+            self.ttarg = CLOCK.now() + self.dt
             # then skips the first loop
             return self.t1 - self.t0
-        error = time.time() - self.ttarg  # seconds
+        error = CLOCK.now() - self.ttarg  # seconds
         self.sum_err += error
         self.sum_var += error**2
         self.n += 1
@@ -0,0 +1,82 @@
+import time
+
+import pytest
+
+from opensourceleg.tools.acquisition import BackgroundReader, LatestSample
+
+
+def test_latestsample_init():
+    """
+    Tests the LatestSample constructor\n
+    Asserts the slot starts empty with no dropped samples.
+    """
+
+    ls = LatestSample()
+    assert ls.take() == None
+    assert ls.sequence == 0
+    assert ls.dropped == 0
+    assert ls.is_fresh == False
+    assert ls.age == float("inf")
+
+
+def test_latestsample_take():
+    """
+    Tests the LatestSample publish and take methods\n
+    Publishes samples and asserts the newest one is taken, that overwritten
+    samples are counted as dropped, and that taking twice does not count the
+    same sample as dropped.
+    """
+
+    lst = LatestSample()
+    lst.publish("a")
+    assert lst.is_fresh == True
+    assert lst.take() == "a"
+    assert lst.is_fresh == False
+    assert lst.sequence == 1
+    assert lst.dropped == 0
+
+    lst.publish("b")
+    lst.publish("c")
+    lst.publish("d")
+    assert lst.take() == "d"
+    assert lst.sequence == 4
+    assert lst.dropped == 2
+
+    assert lst.take() == "d"
+    assert lst.dropped == 2
+    assert 0.0 <= lst.age < 1.0
+
+
+def test_backgroundreader():
+    """
+    Tests the BackgroundReader class\n
+    Starts a reader on a counter and asserts new samples are published in the
+    background, that read errors are counted without stopping the thread, and
+    that the thread exits when stopped.
+    """
+
+    count = [0]
+
+    def read():
+        count[0] += 1
+        if count[0] == 2:
+            raise OSError("read failed")
+        return count[0]
+
+    br = BackgroundReader(read=read, frequency=1000, name="test-reader")
+    assert br.take() == None
+    assert br.is_running == False
+
+    br.start()
+    assert br.is_running == True
+
+    t0 = time.monotonic()
+    while count[0] < 5 and time.monotonic() - t0 < 2.0:
+        time.sleep(0.001)
+
+    br.stop()
+    assert br.is_running == False
+    assert br.take() >= 3
+    assert br.read_errors == 1
+    assert isinstance(br.last_error, OSError)
+    assert br.dropped >= 1
@@ -1,11 +1,15 @@
 from typing import Any
 
+import time
+
 import numpy as np
 import pytest
 from flexsea.device import Device
 from pytest_mock import mocker
 
 from opensourceleg.hardware.actuators import (
+    FRAME_FIELDS,
+    FRAME_INDEX,
     ActpackControlModes,
     ActpackMode,
     CurrentMode,
@@ -15,6 +19,7 @@ from opensourceleg.hardware.actuators import (
     VoltageMode,
 )
 from opensourceleg.hardware.thermal import ThermalModel
+from opensourceleg.tools.acquisition import BackgroundReader
 from opensourceleg.tools.logger import Logger
 
 
@@ -743,6 +748,83 @@ def test_dephyactpack_update(dephyactpack_patched: DephyActpack):
     )
 
 
+def test_dephyactpack_background_read(dephyactpack_patched: DephyActpack):
+    """
+    Tests the DephyActpack background read\n
+    This test starts the background read on an unopened device and asserts the
+    proper warning is written. It then opens the device, starts the background
+    read, and asserts that update swaps in the newest frame read by the reader
+    thread and reports its age. Finally the background read is stopped and it
+    is asserted that update reads synchronously again.
+    """
+
+    mock_dap_br = dephyactpack_patched
+    mock_dap_br._log = Logger(
+        file_path="tests/test_actuators/test_dephyactpack_background_read_log"
+    )
+    mock_dap_br._log.set_stream_level("DEBUG")
+    mock_dap_br.is_streaming = False
+    mock_dap_br.start_background_read()
+    with open("tests/test_actuators/test_dephyactpack_background_read_log.log") as f:
+        contents = f.read()
+        assert (
+            "WARNING: [DephyActpack[MockDephyActpack]] Please open() the device before starting the background read."
+            in contents
+        )
+    assert mock_dap_br.is_background_reading == False
+    assert mock_dap_br.frame_age == float("inf")
+    assert mock_dap_br.dropped_frames == 0
+
+    frames = []
+
+    def read():
+        frames.append(Data(mot_cur=len(frames)))
+        return frames[-1]
+
+    mock_dap_br.read = read
+    mock_dap_br.is_streaming = True
+    mock_dap_br.start_background_read()
+    assert mock_dap_br.is_background_reading == True
+
+    t0 = time.monotonic()
+    while len(frames) < 3 and time.monotonic() - t0 < 2.0:
+        time.sleep(0.001)
+
+    mock_dap_br.update()
+    assert mock_dap_br._data in frames
+    assert mock_dap_br._data is not frames[0]
+    assert 0.0 <= mock_dap_br.frame_age < 1.0
+    assert mock_dap_br.dropped_frames >= 1
+
+    # A frame that was already swapped in is skipped
+    mock_dap_br.stop_background_read()
+    mock_dap_br._reader = BackgroundReader(read=read)
+    mock_dap_br._reader_sequence = 0
+    mock_dap_br._reader._buffer.publish(frames[0])
+    frame_sequence = mock_dap_br.frame_sequence
+    mock_dap_br.update()
+    assert mock_dap_br._data is frames[0]
+    assert mock_dap_br.frame_sequence == frame_sequence + 1
+    mock_dap_br.update()
+    assert mock_dap_br.frame_sequence == frame_sequence + 1
+    mock_dap_br._reader = None
+
+    mock_dap_br.stop_background_read()
+    assert mock_dap_br.is_background_reading == False
+    number_of_frames = len(frames)
+    mock_dap_br.update()
+    assert len(frames) == number_of_frames + 1
+    assert mock_dap_br._data is frames[-1]
+
+    # So is a frame the actpack sent twice, identified by its timestamp
+    frames[-1].state_time = 1
+    frame_sequence = mock_dap_br.frame_sequence
+    mock_dap_br.read = lambda: frames[-1]
+    mock_dap_br.update()
+    mock_dap_br.update()
+    assert mock_dap_br.frame_sequence == frame_sequence + 1
+
+
 def test_dephyactpack_set_mode(dephyactpack_patched: DephyActpack):
     """
     Tests the DephyActpack set_mode method\n
@@ -1078,3 +1160,238 @@ def test_dephyactpack_set_motor_position(dephyactpack_patched: DephyActpack):
             "WARNING: [DephyActpack[MockDephyActpack]] Cannot set motor position in mode c_int(2)"
             in contents
         )
+
+
+def test_dephyactpack_snapshot(dephyactpack_patched: DephyActpack):
+    """
+    Tests the decoded frame of the DephyActpack class.\n
+    Sets the _data attribute and asserts the snapshot holds the same values as
+    the properties, that it can be copied into a preallocated array, and that
+    changing the zero positions re-decodes the current frame.
+    """
+
+    mock_dap = dephyactpack_patched
+    assert np.all(mock_dap.snapshot() == 0)
+    mock_dap._data = Data(
+        batt_volt=10,
+        mot_cur=20,
+        mot_ang=1000.7,
+        ank_ang=-20.5,
+        mot_vel=-10.9,
+        genvar_3=7,
+        gyroz=20,
+    )
+    snapshot = mock_dap.snapshot()
+    assert snapshot.shape == (len(FRAME_FIELDS),)
+    assert snapshot.dtype == np.float64
+    for field in FRAME_FIELDS:
+        if not field.startswith("genvar"):
+            assert snapshot[FRAME_INDEX[field]] == getattr(mock_dap, field)
+    assert snapshot[FRAME_INDEX["genvar_3"]] == mock_dap.genvars[3] == 7
+    assert mock_dap.motor_encoder_counts == 1000
+    assert mock_dap.joint_encoder_counts == -20
+    assert mock_dap.motor_velocity == -10 * np.pi / 180
+
+    out = np.empty(len(FRAME_FIELDS))
+    assert mock_dap.snapshot(out=out) is out
+    assert np.all(out == snapshot)
+
+    # The snapshot is a copy, not a view of the frame
+    snapshot[:] = 0
+    assert mock_dap.battery_voltage == 10
+
+    mock_dap.set_motor_zero_position(position=1000)
+    mock_dap.set_joint_zero_position(position=-10)
+    assert mock_dap.motor_position == 0
+    assert mock_dap.joint_position == -10 * 2 * np.pi / 16384
+    assert mock_dap.motor_encoder_counts == 1000
+
+    # The genvars are a read-only view of the frame, updated in place
+    genvars = mock_dap.genvars
+    assert genvars is mock_dap.genvars
+    with pytest.raises(ValueError):
+        genvars[0] = 1.0
+    mock_dap._data = Data(genvar_3=8)
+    assert genvars[3] == 8
+
+
+def test_dephyactpack_command_cache(dephyactpack_patched: DephyActpack):
+    """
+    Tests the command cache of the DephyActpack class.\n
+    Asserts that repeated motor commands and gains are only sent once, that
+    changing the mode invalidates the cache, and that the savings are counted.
+    """
+
+    mock_dap = dephyactpack_patched
+    mock_dap.set_mode(mode=mock_dap.control_modes.impedance)
+    mock_dap.command_cache.reset_statistics()
+    sent = []
+    mock_dap.send_motor_command = lambda ctrl_mode, value: sent.append(value)
+    gains = []
+    mock_dap.set_gains = lambda kp, ki, kd, k, b, ff: gains.append((k, b))
+
+    for _ in range(3):
+        mock_dap.set_impedance_gains(K=100, B=50)
+        mock_dap.set_motor_position(position=1.0)
+    assert gains == [(100, 50)]
+    assert len(sent) == 1
+    mock_dap.set_impedance_gains(K=120, B=50)
+    assert gains == [(100, 50), (120, 50)]
+    assert mock_dap.command_cache.skipped_packets == 4
+    assert mock_dap.command_cache.skipped_bytes > 0
+    assert mock_dap.command_cache.packets_saved_per_second > 0
+
+    mock_dap.set_mode(mode=mock_dap.control_modes.position)
+    sent.clear()
+    mock_dap.set_mode(mode=mock_dap.control_modes.impedance)
+    mock_dap.set_motor_position(position=1.0)
+    assert len(sent) == 3
+
+
+def test_dephyactpack_command_cache_direct(dephyactpack_patched: DephyActpack, mocker):
+    """
+    Tests that the inherited send_motor_command and set_gains methods of the
+    DephyActpack class, called directly, keep the command cache up to date.\n
+    Asserts that a cached command or gains matching the direct call are skipped,
+    and that different ones are sent.
+    """
+
+    mock_dap = dephyactpack_patched
+    mock_dap.set_mode(mode=mock_dap.control_modes.position)
+    packets = []
+    send_motor_command = lambda *args, ctrl_mode, value: packets.append(value)
+    set_gains = lambda *args, kp, ki, kd, k, b, ff: packets.append(kp)
+    mock_dap.send_motor_command = send_motor_command
+    mock_dap.set_gains = set_gains
+    mocker.patch.object(Device, "send_motor_command", send_motor_command)
+    mocker.patch.object(Device, "set_gains", set_gains)
+
+    mock_dap.set_position_gains(kp=10, ki=0, kd=5)
+    mock_dap.set_motor_position(position=1.0)
+    assert len(packets) == 2
+
+    # Direct calls with other values, then cached calls with the same values
+    DephyActpack.send_motor_command(mock_dap, ctrl_mode=mock_dap.mode.mode, value=7)
+    DephyActpack.set_gains(mock_dap, kp=20, ki=0, kd=5, k=0, b=0, ff=0)
+    mock_dap._send_motor_command(ctrl_mode=mock_dap.mode.mode, value=7)
+    mock_dap._send_gains(kp=20, ki=0, kd=5, k=0, b=0, ff=0)
+    assert packets[2:] == [7, 20]
+
+    # The cached calls that were skipped before the direct calls are sent again
+    mock_dap.set_position_gains(kp=10, ki=0, kd=5)
+    mock_dap.set_motor_position(position=1.0)
+    assert packets[4:] == [10, int(1.0 / (2 * np.pi / 16384))]
+
+
+def test_dephyactpack_command_coalescing(dephyactpack_patched: DephyActpack):
+    """
+    Tests the command coalescing of the DephyActpack class.\n
+    Asserts that only the last setpoint and gains of a tick are sent, gains
+    first, when flush_commands is called.
+    """
+
+    mock_dap = dephyactpack_patched
+    mock_dap.set_mode(mode=mock_dap.control_modes.impedance)
+    packets = []
+    mock_dap.send_motor_command = lambda ctrl_mode, value: packets.append(value)
+    mock_dap.set_gains = lambda kp, ki, kd, k, b, ff: packets.append((k, b))
+
+    mock_dap.set_command_coalescing(True)
+    assert mock_dap.is_coalescing_commands == True
+    mock_dap.set_impedance_gains(K=100, B=50)
+    mock_dap.set_motor_position(position=1.0)
+    mock_dap.set_impedance_gains(K=110, B=50)
+    mock_dap.set_motor_position(position=2.0)
+    assert packets == []
+    mock_dap.flush_commands()
+    assert packets == [(110, 50), int(2.0 / (2 * np.pi / 16384))]
+    mock_dap.flush_commands()
+    assert len(packets) == 2
+
+    mock_dap.set_motor_position(position=3.0)
+    mock_dap.set_command_coalescing(False)
+    assert packets[-1] == int(3.0 / (2 * np.pi / 16384))
+
+
+def test_dephyactpack_nonblocking_set_mode(dephyactpack_patched: DephyActpack):
+    """
+    Tests the non-blocking mode transitions of the DephyActpack class.\n
+    Asserts that the new mode is pending until the settle time elapsed, that
+    commands set meanwhile are held back, and that they are sent right after
+    the entry commands of the new mode, either by update or by wait_for_mode.
+    """
+
+    mock_dap = dephyactpack_patched
+    mock_dap.set_mode(mode=mock_dap.control_modes.voltage)
+    assert mock_dap.is_mode_ready == True
+    packets = []
+    mock_dap.send_motor_command = lambda ctrl_mode, value: packets.append(value)
+    mock_dap.set_gains = lambda kp, ki, kd, k, b, ff: packets.append((kp, ki, kd))
+
+    start = time.monotonic()
+    mock_dap.set_mode(mode=mock_dap.control_modes.position, blocking=False)
+    assert time.monotonic() - start < 0.05
+    assert mock_dap.mode == mock_dap.control_modes.position
+    assert mock_dap.is_mode_ready == False
+    # Only the exit command of the voltage mode is sent
+    assert packets == [0]
+
+    mock_dap.set_position_gains(kp=10, ki=0, kd=5)
+    mock_dap.set_motor_position(position=1.0)
+    assert packets == [0]
+
+    mock_dap.read = lambda: Data()
+    mock_dap.is_streaming = True
+    mock_dap.update()
+    assert mock_dap.is_mode_ready == False
+    assert packets == [0]
+
+    time.sleep(mock_dap.control_modes.voltage.settle_time)
+    mock_dap.update()
+    assert mock_dap.is_mode_ready == True
+    assert packets[-2:] == [(10, 0, 5), int(1.0 / (2 * np.pi / 16384))]
+
+    mock_dap.set_mode(mode=mock_dap.control_modes.current, blocking=False)
+    assert mock_dap.wait_for_mode(timeout=0.0) == False
+    assert mock_dap.is_mode_ready == False
+    assert mock_dap.wait_for_mode(timeout=1.0) == True
+    assert mock_dap.is_mode_ready == True
+    assert mock_dap.wait_for_mode() == True
+
+    mock_dap._blocking_transitions = False
+    mock_dap.set_mode(mode=mock_dap.control_modes.voltage)
+    assert mock_dap.is_mode_ready == False
+    mock_dap.set_mode(mode=mock_dap.control_modes.impedance, blocking=True)
+    assert mock_dap.mode == mock_dap.control_modes.impedance
+    assert mock_dap.is_mode_ready == True
+
+
+def test_dephyactpack_thermal_decimation(dephyactpack_patched: DephyActpack):
+    """
+    Tests the thermal decimation of the DephyActpack class.\n
+    Asserts that the thermal model is only stepped every thermal_decimation
+    updates, with the RMS current of those updates and the matching time step.
+    """
+
+    mock_dap = dephyactpack_patched
+    mock_dap._thermal_decimation = 4
+    mock_dap._thermal_model = ThermalModel(integrator="exact")
+    reference = ThermalModel(integrator="exact")
+    currents = iter([1000, -2000, 3000, 4000, 5000])
+    mock_dap.read = lambda: Data(mot_cur=next(currents), temperature=21)
+    mock_dap.is_streaming = True
+
+    for _ in range(3):
+        mock_dap.update()
+        assert mock_dap._thermal_model.T_w == 21
+
+    mock_dap.update()
+    reference.update_and_get_scale(
+        dt=4 / mock_dap.frequency,
+        motor_current=np.sqrt((1000**2 + 2000**2 + 3000**2 + 4000**2) / 4),
+    )
+    assert mock_dap._thermal_model.T_w == pytest.approx(reference.T_w)
+    assert mock_dap._thermal_model.T_w > 21
+
+    mock_dap.update()
+    assert mock_dap._thermal_model.T_w == pytest.approx(reference.T_w)
@@ -0,0 +1,125 @@
+import time
+
+import pytest
+
+from opensourceleg.control.state_machine import State
+from opensourceleg.osl import OpenSourceLeg
+from opensourceleg.tools.clock import CLOCK, Clock, SimulatedClock
+from opensourceleg.tools.utilities import SoftRealtimeLoop
+from tests.test_state_machine.test_state_machine import mock_time
+
+
+def test_clock_init():
+    """
+    Tests the Clock constructor\n
+    Asserts the default source is time.monotonic_ns and that the clock starts untouched.
+    """
+
+    c = Clock()
+    assert c.source is time.monotonic_ns
+    assert c.ticks == 0
+    assert isinstance(CLOCK, Clock)
+
+
+def test_clock_tick():
+    """
+    Tests the Clock tick and now methods\n
+    Asserts now falls back to a fresh sample before the first tick, then keeps
+    returning the time of the current tick until the clock is ticked again.
+    """
+
+    values = [1_000_000_000, 2_000_000_000, 3_500_000_000, 4_000_000_000]
+    c = Clock(source=lambda: values.pop(0))
+    assert c.now() == 1.0
+    assert c.tick() == 2.0
+    assert c.now() == 2.0
+    assert c.now_ns() == 2_000_000_000
+    assert c.read() == 3.5
+    assert c.now() == 2.0
+    assert c.tick() == 4.0
+    assert c.ticks == 2
+    assert values == []
+
+
+def test_clock_reset():
+    """
+    Tests the Clock reset method\n
+    Asserts the current tick is forgotten and the source replaced.
+    """
+
+    c = Clock(source=lambda: 1_000_000_000)
+    c.tick()
+    c.reset(source=lambda: 5_000_000_000)
+    assert c.ticks == 0
+    assert c.now() == 5.0
+
+
+def test_simulated_clock():
+    """
+    Tests the SimulatedClock\n
+    Asserts its time only moves when it is set or advanced, which ticks it.
+    """
+
+    c = SimulatedClock(start=2.0)
+    assert c.now() == 2.0
+    assert c.ticks == 0
+    assert c.advance(dt=0.5) == 2.5
+    assert c.now() == 2.5
+    assert c.read() == 2.5
+    assert c.set(time=1.0) == 1.0
+    assert c.set_ns(time_ns=3_000_000_000) == 3.0
+    assert c.now_ns() == 3_000_000_000
+    assert c.ticks == 3
+
+    # No rounding drift over many small steps
+    for _ in range(1000):
+        c.advance(dt=0.001)
+    assert c.now_ns() == 4_000_000_000
+
+
+def test_clock_osl_update(mock_time):
+    """
+    Tests the OpenSourceLeg update method reads the library clock\n
+    Asserts the timestamp of the OSL is the time of the current tick, and that
+    the clock is only ticked by the loop, once per iteration.
+    """
+
+    test_osl = OpenSourceLeg()
+    CLOCK.tick()
+    ticks = CLOCK.ticks
+    test_osl.update()
+    assert CLOCK.ticks == ticks
+    assert test_osl.timestamp == 1.0
+
+    loop = SoftRealtimeLoop(dt=0.001)
+    for i, t in enumerate(loop):
+        test_osl.update()
+        if i == 2:
+            loop.stop()
+    assert CLOCK.ticks == ticks + 3
+
+
+def test_clock_released_by_loop():
+    """
+    Tests the SoftRealtimeLoop releases the library clock when it exits\n
+    Asserts that after a loop ran, whether iterated or run with a function,
+    CLOCK.now() follows the time again instead of staying at its last tick.
+    """
+
+    loop = SoftRealtimeLoop(dt=0.001)
+    for i, t in enumerate(loop):
+        assert CLOCK.is_ticking
+        if i == 1:
+            loop.stop()
+    assert not CLOCK.is_ticking
+
+    state = State(name="state")
+    state.start(data=None)
+    time.sleep(0.02)
+    assert state.current_time_in_state >= 0.02
+
+    loop = SoftRealtimeLoop(dt=0.001)
+    loop.run(lambda: 0)
+    assert CLOCK.ticks > 0
+    assert not CLOCK.is_ticking
+    assert CLOCK.now() < CLOCK.now()
@@ -0,0 +1,103 @@
+import ctypes
+
+import numpy as np
+import pytest
+
+from opensourceleg.control.compiled_controller import CompiledController
+
+
+@pytest.fixture
+def controller():
+    """
+    CompiledController without a library, calling a Python function instead
+    """
+
+    controller = CompiledController.__new__(CompiledController)
+    controller.cleanup_func = None
+    controller.types = ctypes
+    controller.DEFAULT_SENSOR_LIST = [
+        ("knee_angle", ctypes.c_double),
+        ("ankle_angle", ctypes.c_double),
+        ("knee_velocity", ctypes.c_double),
+        ("ankle_velocity", ctypes.c_double),
+        ("Fz", ctypes.c_double),
+    ]
+
+    def main_function(inputs, outputs):
+        inputs, outputs = inputs._obj, outputs._obj
+        outputs.current_state = 2
+        outputs.knee_impedance.stiffness = inputs.sensors.knee_angle * 10
+        outputs.knee_impedance.damping = inputs.sensors.Fz
+        outputs.knee_impedance.eq_angle = inputs.time
+
+    controller.main_function = main_function
+    return controller
+
+
+def define_structures(controller):
+    controller.define_type(
+        "impedance_param_type",
+        [
+            ("stiffness", controller.types.c_double),
+            ("damping", controller.types.c_double),
+            ("eq_angle", controller.types.c_double),
+        ],
+    )
+    controller.define_type("sensors", controller.DEFAULT_SENSOR_LIST)
+    controller.define_inputs(
+        [
+            ("sensors", controller.types.sensors),
+            ("gains", controller.types.c_double * 2),
+            ("time", controller.types.c_double),
+        ]
+    )
+    controller.define_outputs(
+        [
+            ("current_state", controller.types.c_int),
+            ("knee_impedance", controller.types.impedance_param_type),
+        ]
+    )
+
+
+def test_compiled_controller_views(controller):
+    """
+    Tests that the structured and float64 views share the memory of the input
+    and output structures passed to the main function
+    """
+
+    define_structures(controller)
+
+    sensors = controller.float_view(controller.inputs.sensors)
+    sensors[:] = [1.0, 2.0, 3.0, 4.0, -600.0]
+    assert controller.inputs.sensors.knee_angle == 1.0
+    assert controller.inputs.sensors.Fz == -600.0
+
+    controller.input_view["time"] = 12.5
+    assert controller.inputs.time == 12.5
+
+    # The whole inputs structure is made of doubles, including the array
+    inputs = controller.float_view(controller.inputs)
+    assert inputs.shape == (8,)
+    inputs[5:7] = [0.1, 0.2]
+    assert list(controller.inputs.gains) == [0.1, 0.2]
+
+    outputs = controller.run()
+    assert controller.output_view["current_state"] == 2
+    assert controller.output_view["knee_impedance"]["stiffness"] == 10.0
+    snapshot = controller.output_view.copy()
+
+    knee = controller.float_view(outputs.knee_impedance)
+    assert knee.tolist() == [10.0, -600.0, 12.5]
+    knee[2] = 5.0
+    assert outputs.knee_impedance.eq_angle == 5.0
+    assert snapshot["knee_impedance"]["eq_angle"] == 12.5
+
+    # An int and its padding cannot be viewed as doubles
+    with pytest.raises(ValueError):
+        controller.float_view(controller.outputs)
+
+    assert controller.structured_view(outputs.knee_impedance).dtype.names == (
+        "stiffness",
+        "damping",
+        "eq_angle",
+    )
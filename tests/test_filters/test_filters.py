@@ -0,0 +1,124 @@
+import math
+
+import numpy as np
+import pytest
+
+from opensourceleg.tools.filters import MedianFilter
+
+
+def test_medianfilter_init():
+    """
+    Tests the MedianFilter constructor\n
+    Asserts the window starts filled with the initial value and that invalid
+    window lengths are rejected.
+    """
+
+    f = MedianFilter()
+    assert f.channels == 6
+    assert f.length == 3
+    assert f.outlier_threshold is None
+    assert f.index == 0
+    assert np.array_equal(f.window, np.zeros((3, 6)))
+    f = MedianFilter(channels=2, initial=5)
+    assert np.array_equal(f.window, np.full((3, 2), 5))
+
+    with pytest.raises(ValueError):
+        MedianFilter(window=0)
+
+
+@pytest.mark.parametrize("window", [1, 2, 3, 4, 5])
+def test_medianfilter_update(window):
+    """
+    Tests the MedianFilter update method\n
+    Asserts the output is identical to np.median over a ring buffer of the last
+    samples, as StrainAmp used to compute it.
+    """
+
+    samples = np.random.default_rng(seed=window).integers(0, 4096, size=(200, 6))
+    samples[50:60] = 7  # repeated values
+    f = MedianFilter(channels=6, window=window)
+    g = MedianFilter(channels=6, window=window)
+    genvars = np.zeros((window, 6))
+    out = np.zeros(6)
+
+    for i, sample in enumerate(samples):
+        genvars[i % window, :] = sample
+        output = f.update(sample.tolist())
+        assert output.dtype == np.float64
+        assert np.array_equal(output, np.median(a=genvars, axis=0))
+        assert f.index == (i + 1) % window
+        assert np.array_equal(f.window, genvars)
+
+        # Written in place into a preallocated output
+        assert g.update(sample.tolist(), out=out) is out
+        assert np.array_equal(out, output)
+
+
+def test_medianfilter_load():
+    """
+    Tests the MedianFilter load and reset methods\n
+    Asserts the window and the ring buffer position are replaced.
+    """
+
+    f = MedianFilter(channels=2)
+    f.load(samples=[[1, 2], [3, 4], [5, 6]], index=4)
+    assert f.index == 1
+    assert np.array_equal(f.window, [[1, 2], [3, 4], [5, 6]])
+    assert np.array_equal(f.update([7, 8]), [5, 6])
+    assert np.array_equal(f.window, [[1, 2], [7, 8], [5, 6]])
+
+    with pytest.raises(ValueError):
+        f.load(samples=np.zeros((3, 3)))
+
+    f.reset(value=2.0)
+    assert f.index == 0
+    assert np.array_equal(f.window, np.full((3, 2), 2.0))
+
+
+def test_medianfilter_outliers():
+    """
+    Tests the MedianFilter outlier rejection\n
+    Asserts that with an outlier threshold, values close to the median of the
+    window are passed through, while spikes are replaced by the median.
+    """
+
+    f = MedianFilter(channels=1, window=5, outlier_threshold=3.0, initial=100)
+    f.load(samples=[[100], [102], [98], [101], [99]])
+
+    assert f.update([103]).tolist() == [103]
+    assert f.outliers == 0
+    assert f.update([4000]).tolist() == [101]
+    assert f.outliers == 1
+    assert f.update([100]).tolist() == [100]
+    assert f.outliers == 1
+
+
+@pytest.mark.parametrize("window", [3, 5])
+def test_medianfilter_non_finite(window):
+    """
+    Tests the MedianFilter with non-finite values\n
+    Asserts that NaN and infinite values are replaced by the previous value of
+    their channel instead of corrupting the window, and that a window with
+    non-finite values cannot be loaded.
+    """
+
+    rng = np.random.default_rng(seed=0)
+    f = MedianFilter(channels=2, window=window)
+    g = MedianFilter(channels=2, window=window)
+    for sample in rng.normal(size=(20, 2)).tolist():
+        f.update(sample)
+        g.update(sample)
+
+    previous = f.window[f.index - 1].tolist()
+    f.update([math.nan, 1.0])
+    g.update([previous[0], 1.0])
+    f.update([math.inf, -math.inf])
+    g.update([previous[0], 1.0])
+    assert f.non_finite == 3
+    assert np.isfinite(f.window).all()
+
+    for sample in rng.normal(size=(20, 2)).tolist():
+        assert np.array_equal(f.update(sample), g.update(sample))
+
+    with pytest.raises(ValueError):
+        f.load(samples=np.full((window, 2), np.nan))
@@ -1,3 +1,4 @@
+import itertools
 import time
 
 import numpy as np
@@ -13,6 +14,7 @@ from opensourceleg.hardware.actuators import (
     VoltageMode,
 )
 from opensourceleg.hardware.joints import Joint
+from opensourceleg.tools.clock import CLOCK
 from opensourceleg.tools.logger import Logger
 from tests.test_actuators.test_dephyactpack import (
     Data,
@@ -209,39 +211,15 @@ def test_home(joint_patched: Joint, patch_sleep):
 @pytest.fixture
 def patch_time_time(monkeypatch):
     """
-    Fixture that patches the time.time function with a lambda function that returns
-    a list of values that are popped off the list each time the time.time function
-    is called. This will be used to simulate the time it takes to run the make_encoder_map
-    method. Many are needed because the time.time function is called each time a log
-    message is written.
-    """
-
-    values = [
-        0,
-        0,
-        0,
-        4,
-        8,
-        12,
-        16,
-        20,
-        24,
-        28,
-        32,
-        36,
-        40,
-        44,
-        48,
-        52,
-        56,
-        60,
-        64,
-        68,
-        72,
-        76,
-        80,
-    ]
-    monkeypatch.setattr(time, "time", lambda: values.pop(0))
+    Fixture that patches the library clock with a lambda function that advances
+    by 4 seconds each time the clock is read. This will be used to simulate the
+    time it takes to run the make_encoder_map method. The clock is ticked once,
+    so that the reads of the current tick (CLOCK.now()) do not advance it.
+    """
+
+    values = itertools.count(start=0, step=4)
+    monkeypatch.setattr(CLOCK, "_source", lambda: next(values) * 1_000_000_000)
+    monkeypatch.setattr(CLOCK, "_tick_ns", 0)
 
 
 def test_make_knee_encoder_map(joint_patched: Joint, patch_sleep, patch_time_time):
@@ -1,8 +1,19 @@
 import csv
+import os
+import threading
+import time
 
+import numpy as np
 import pytest
 
-from opensourceleg.tools.logger import Logger
+from opensourceleg.tools.logger import (
+    AsyncDataWriter,
+    AttributeSampler,
+    BinaryDataWriter,
+    Logger,
+    binary_log_to_csv,
+    read_binary_log,
+)
 
 
 class Simple_Class:
@@ -146,3 +157,330 @@ def test_data():
         reader = csv.reader(f)
         rows2 = list(reader)
     assert rows2 == expected_rows2
+
+
+def test_invalid_data_format():
+    """
+    Tests the Logger constructor with an invalid data_format\n
+    Asserts a ValueError is raised.
+    """
+
+    with pytest.raises(ValueError):
+        Logger(file_path="tests/test_logger/test_log_invalid", data_format="xml")
+
+
+def test_data_binary():
+    """
+    Tests the Logger data method with the binary data format\n
+    This test initializes a Logger instance in binary format with a block size
+    smaller than the number of logged rows, logs a few rows, and asserts the
+    binary log is read back with the proper column names, types, and values.
+    Attributes added after logging started are asserted to be ignored, and the
+    log is then converted to csv and compared to the expected rows.
+    """
+
+    test_container = Simple_Class()
+    test_Logger_binary = Logger(
+        file_path="tests/test_logger/test_log_binary", data_format="binary"
+    )
+    test_Logger_binary._data_writer._block_size = 2
+    test_Logger_binary._data_writer._buffer = None
+    test_Logger_binary.add_attributes(
+        container=test_container, attributes=["a", "b", "c"]
+    )
+    test_Logger_binary.add_attributes(
+        container={"d": np.int32(7), "e": 0.5}, attributes=["d", "e"]
+    )
+
+    for i in range(5):
+        test_container.a = i
+        test_Logger_binary.data()
+
+    test_Logger_binary.add_attributes(container=test_container, attributes=["a"])
+    assert len(test_Logger_binary._containers) == 2
+    test_Logger_binary.close()
+
+    data = read_binary_log("tests/test_logger/test_log_binary.bin")
+    names = data.dtype.names
+    assert names[:3] == ("a", "b", "c")
+    assert names[3].endswith(":d") and names[4].endswith(":e")
+    assert data.dtype["a"] == np.float64
+    assert data.dtype[3] == np.int64
+    assert len(data) == 5
+    assert list(data["a"]) == [0, 1, 2, 3, 4]
+    assert list(data["b"]) == [2, 2, 2, 2, 2]
+    assert list(data[names[3]]) == [7, 7, 7, 7, 7]
+    assert list(data[names[4]]) == [0.5, 0.5, 0.5, 0.5, 0.5]
+
+    csv_file_path = binary_log_to_csv("tests/test_logger/test_log_binary.bin")
+    assert csv_file_path == "tests/test_logger/test_log_binary.csv"
+    with open(csv_file_path, newline="") as f:
+        rows = list(csv.reader(f))
+    assert rows[0] == list(data.dtype.names)
+    assert rows[1] == ["0.0", "2.0", "3.0", "7", "0.5"]
+    assert len(rows) == 6
+
+
+class Counting_Class:
+    """
+    Class counting how many times its attribute is sampled
+    """
+
+    def __init__(self):
+        self.reads = 0
+
+    @property
+    def a(self):
+        self.reads += 1
+        return self.reads
+
+
+@pytest.mark.parametrize("data_format", ["csv", "binary"])
+def test_data_samples_once(data_format):
+    """
+    Tests the Logger data method samples every attribute once per row
+
+    The first row also types the header, and is asserted to be the row logged.
+    """
+
+    test_container = Counting_Class()
+    test_logger = Logger(
+        file_path=f"tests/test_logger/test_log_samples_once_{data_format}",
+        data_format=data_format,
+    )
+    test_logger.add_attributes(container=test_container, attributes=["a"])
+    test_logger.data()
+    test_logger.data()
+    test_logger.close()
+    assert test_container.reads == 2
+
+    if data_format == "binary":
+        data = read_binary_log("tests/test_logger/test_log_samples_once_binary.bin")
+        assert list(data["a"]) == [1, 2]
+    else:
+        with open("tests/test_logger/test_log_samples_once_csv.csv", newline="") as f:
+            rows = list(csv.reader(f))
+        assert rows == [["a"], ["1"], ["2"]]
+
+
+def test_data_binary_invalid():
+    """
+    Tests the Logger data method with the binary data format and a value
+    that is not a number\n
+    Asserts a TypeError is raised and that repeated column names are made unique.
+    """
+
+    test_Logger_binary2 = Logger(
+        file_path="tests/test_logger/test_log_binary2", data_format="binary"
+    )
+    test_Logger_binary2.add_attributes(container={"s": "text"}, attributes=["s"])
+    with pytest.raises(TypeError):
+        test_Logger_binary2.data()
+
+    writer = BinaryDataWriter(file_path="tests/test_logger/test_log_binary3.bin")
+    writer.write_header(["a", "a", "a"], [1.0, 2.0, 3.0])
+    assert writer.dtype.names == ("a", "a.1", "a.2")
+    writer.close()
+
+    with pytest.raises(ValueError):
+        read_binary_log("tests/test_logger/test_log_binary2.log")
+
+
+def test_data_asynchronous():
+    """
+    Tests the Logger data method in asynchronous mode\n
+    This test initializes a Logger instance in asynchronous mode, logs a few
+    rows, and asserts that the rows are written to the csv file by the
+    background thread once the logger is flushed and closed.
+    """
+
+    test_container = Simple_Class()
+    test_Logger_async = Logger(
+        file_path="tests/test_logger/test_log_async", asynchronous=True
+    )
+    test_Logger_async.add_attributes(
+        container=test_container, attributes=["a", "b", "c"]
+    )
+
+    for i in range(3):
+        test_container.a = i
+        test_Logger_async.data()
+
+    test_Logger_async.flush()
+    with open("tests/test_logger/test_log_async.csv", newline="") as f:
+        rows = list(csv.reader(f))
+    assert rows == [["a", "b", "c"], ["0", "2", "3"], ["1", "2", "3"], ["2", "2", "3"]]
+
+    test_container.a = 3
+    test_Logger_async.data()
+    test_Logger_async.close()
+    assert test_Logger_async._file.closed == True
+    assert test_Logger_async.dropped_rows == 0
+    with open("tests/test_logger/test_log_async.csv", newline="") as f:
+        rows = list(csv.reader(f))
+    assert rows[-1] == ["3", "2", "3"]
+
+
+class Blocking_Writer:
+    """
+    Writer that blocks until released, to use for testing the AsyncDataWriter class
+    """
+
+    def __init__(self):
+        self.rows = []
+        self.release = threading.Event()
+        self.file = None
+
+    def write_header(self, header, row):
+        pass
+
+    def write_rows(self, rows):
+        self.release.wait()
+        self.rows.extend(rows)
+
+    def flush(self):
+        pass
+
+    def close(self):
+        pass
+
+
+@pytest.mark.parametrize(
+    ("overflow_policy", "expected_rows", "expected_dropped_rows"),
+    [
+        ("drop_oldest", [[-1], [3], [4]], 3),
+        ("drop_newest", [[-1], [0], [1]], 3),
+    ],
+)
+def test_asyncdatawriter_overflow(overflow_policy, expected_rows, expected_dropped_rows):
+    """
+    Tests the AsyncDataWriter overflow policies\n
+    The background thread is held in the write of a first row while five rows
+    are written to a ring buffer of two rows. It is asserted that the proper rows
+    are kept and the dropped rows are counted.
+    """
+
+    writer = Blocking_Writer()
+    async_writer = AsyncDataWriter(
+        writer=writer, buffer_size=2, overflow_policy=overflow_policy
+    )
+    async_writer.write_header(["a"], [0])
+    async_writer.write_row([-1])
+    while async_writer.pending_rows:
+        time.sleep(0.001)
+
+    for i in range(5):
+        async_writer.write_row([i])
+
+    assert async_writer.pending_rows == 2
+    assert async_writer.dropped_rows == expected_dropped_rows
+    writer.release.set()
+    async_writer.close()
+    assert writer.rows == expected_rows
+
+
+def test_asyncdatawriter_block():
+    """
+    Tests the AsyncDataWriter block overflow policy\n
+    Asserts that no row is dropped when the ring buffer is full and that
+    an invalid policy raises a ValueError.
+    """
+
+    writer = Blocking_Writer()
+    async_writer = AsyncDataWriter(writer=writer, buffer_size=2, overflow_policy="block")
+    threading.Timer(0.05, writer.release.set).start()
+
+    for i in range(5):
+        async_writer.write_row([i])
+
+    async_writer.close()
+    assert writer.rows == [[0], [1], [2], [3], [4]]
+    assert async_writer.dropped_rows == 0
+
+    # Once the writer thread is stopped, rows are dropped instead of waiting forever
+    async_writer.write_row([5])
+    async_writer.write_row([6])
+    async_writer.write_row([7])
+    assert async_writer.pending_rows == 2
+    assert async_writer.dropped_rows == 1
+
+    with pytest.raises(ValueError):
+        AsyncDataWriter(writer=writer, overflow_policy="drop_all")
+
+
+def test_data_asynchronous_binary_errors(monkeypatch):
+    """
+    Tests the Logger data method with an asynchronous binary log\n
+    Asserts that a first value that is not a number raises a TypeError to the
+    caller, and that a later error of the writer thread is reported when the
+    logger is closed.
+    """
+
+    test_dict = {"s": "text"}
+    test_Logger = Logger(
+        file_path="tests/test_logger/test_log_async_binary",
+        data_format="binary",
+        asynchronous=True,
+    )
+    test_Logger.add_attributes(container=test_dict, attributes=["s"])
+    with pytest.raises(TypeError):
+        test_Logger.data()
+
+    test_dict["s"] = 1.0
+    test_Logger.data()
+    test_Logger.flush()
+    assert os.path.getsize("tests/test_logger/test_log_async_binary.bin") > 0
+
+    messages = []
+    monkeypatch.setattr(test_Logger, "error", lambda msg: messages.append(msg))
+    test_dict["s"] = "text"
+    test_Logger.data()
+    test_Logger.close()
+    assert isinstance(test_Logger._data_writer.error, ValueError)
+    assert len(messages) == 1
+
+
+def test_attributesampler():
+    """
+    Tests the AttributeSampler class\n
+    Asserts the compiled getters sample objects and dicts in the order they were added,
+    that missing dict keys are sampled as None, and that sample_into fills a preallocated array.
+    """
+
+    test_class = Simple_Class()
+    test_dict = {"x": 4, "y": 5}
+    sampler = AttributeSampler()
+    sampler.add(test_class, ["a"])
+    sampler.add(test_dict, ["x", "y"])
+    sampler.add(test_class, ["b", "c"])
+    assert len(sampler) == 5
+    assert sampler.header() == ["a", f"{test_dict}:x", f"{test_dict}:y", "b", "c"]
+    assert sampler.sample() == (1, 4, 5, 2, 3)
+    test_class.a = 10
+    test_dict["x"] = 40
+    assert sampler.sample() == (10, 40, 5, 2, 3)
+    del test_dict["y"]
+    assert sampler.sample() == (10, 40, None, 2, 3)
+
+    test_dict["y"] = 50
+    out = np.zeros((2, 5))
+    sampler.sample_into(out, 1)
+    assert out[0].tolist() == [0, 0, 0, 0, 0]
+    assert out[1].tolist() == [10, 40, 50, 2, 3]
+
+
+def test_logger_sample():
+    """
+    Tests the Logger sample and sample_into methods\n
+    Asserts the current values are returned without writing to the data file.
+    """
+
+    test_logger = Logger(file_path="tests/test_logger/test_logger_sample")
+    test_class = Simple_Class()
+    test_logger.add_attributes(test_class, ["a", "b", "c"])
+    assert test_logger.sample() == (1, 2, 3)
+    out = np.zeros(3)
+    test_logger.sample_into(out)
+    assert out.tolist() == [1, 2, 3]
+    assert not test_logger._is_logging
+    test_logger.close()
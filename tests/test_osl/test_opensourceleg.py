@@ -508,6 +508,60 @@ def test_osl_update_loadcell(loadcell_patched: Loadcell, patch_sleep):
     )
 
 
+def test_osl_update_concurrent(
+    mocker, loadcell_patched: Loadcell, mock_get_active_ports, patch_sleep
+):
+    """
+    Tests the OpenSourceLeg update method with concurrent_update\n
+    Intializes an OpenSourceLeg object in concurrent mode with a knee, an ankle,
+    and a loadcell chained to the knee. The update method is called and it is
+    asserted that every device was read, that the loadcell was read after its
+    joint, and that the thread pool is shut down on exit.
+    """
+
+    mocker.patch(
+        "opensourceleg.hardware.joints.Joint.__new__",
+        side_effect=[MockJoint(), MockJoint()],
+    )
+    test_osl_u_cc = OpenSourceLeg(concurrent_update=True)
+    test_osl_u_cc.log = Logger(file_path="tests/test_osl/test_osl_u_cc")
+    test_osl_u_cc.add_joint(name="knee")
+    test_osl_u_cc.add_joint(name="ankle")
+    test_osl_u_cc.add_loadcell(
+        dephy_mode=True, joint=test_osl_u_cc.knee, loadcell_matrix=LOADCELL_MATRIX
+    )
+    test_osl_u_cc._knee._data = Data()
+    test_osl_u_cc._knee.is_streaming = True
+
+    read_order = []
+    knee_update = test_osl_u_cc._knee.update
+    loadcell_update = test_osl_u_cc._loadcell.update
+
+    def mock_knee_update():
+        knee_update()
+        read_order.append("knee")
+
+    def mock_loadcell_update():
+        loadcell_update()
+        read_order.append("loadcell")
+
+    test_osl_u_cc._knee.update = mock_knee_update
+    test_osl_u_cc._loadcell.update = mock_loadcell_update
+    test_osl_u_cc._ankle.update = lambda: read_order.append("ankle")
+
+    assert test_osl_u_cc.is_concurrent_update == True
+    assert len(test_osl_u_cc._get_read_tasks()) == 2
+
+    test_osl_u_cc.update()
+    assert sorted(read_order) == ["ankle", "knee", "loadcell"]
+    assert read_order.index("knee") < read_order.index("loadcell")
+    assert test_osl_u_cc._knee._data.batt_volt == 15
+    assert test_osl_u_cc._executor is not None
+
+    test_osl_u_cc.__exit__()
+    assert test_osl_u_cc._executor is None
+
+
 def test_osl_update_log_data(joint_patched: Joint, mock_get_active_ports, patch_sleep):
     """
     Tests the OpenSourceLeg update method with log_data\n
@@ -1,9 +1,23 @@
+import math
+import time
+import tracemalloc
+
 import numpy as np
 import pytest
 from pytest_mock import mocker
 
+from opensourceleg.hardware import sensors
 from opensourceleg.hardware.joints import Joint
-from opensourceleg.hardware.sensors import Loadcell, StrainAmp
+from opensourceleg.hardware.sensors import (
+    IMU_CHANNELS,
+    IMU_FIELDS,
+    IMULordMicrostrain,
+    IMUTransport,
+    Loadcell,
+    MSCLTransport,
+    ReplayTransport,
+    StrainAmp,
+)
 from opensourceleg.tools.logger import Logger
 from tests.test_actuators.test_dephyactpack import Data
 from tests.test_joints.test_joint import MockJoint, patch_sleep
@@ -453,6 +467,65 @@ def test_strainamp_wrench_to_strain_data():
     assert np.array_equal(result, expected_result)
 
 
+def test_strainamp_batch_conversion():
+    """
+    Test the StrainAmp conversions on recordings\n
+    This test converts a (T, 6) recording of strain values to wrenches and back
+    and asserts that it matches the sample by sample conversion, that the inverse
+    of the loadcell matrix is cached, and that recalibrating the wrenches gives
+    the same result as converting the raw strain with the new matrix.
+    """
+
+    strain = np.random.default_rng(seed=0).integers(0, 4096, size=(50, 6))
+    loadcell_zero = np.array([[1.0, 2.0, 3.0, 4.0, 5.0, 6.0]])
+
+    wrench = StrainAmp.strain_data_to_wrench(
+        unpacked_strain=strain,
+        loadcell_matrix=LOADCELL_MATRIX,
+        loadcell_zero=loadcell_zero,
+    )
+    assert wrench.shape == (50, 6)
+    for sample, expected in zip(strain, wrench):
+        assert np.allclose(
+            StrainAmp.strain_data_to_wrench(
+                unpacked_strain=sample,
+                loadcell_matrix=LOADCELL_MATRIX,
+                loadcell_zero=loadcell_zero,
+            ),
+            expected,
+        )
+
+    assert np.array_equal(
+        StrainAmp.wrench_to_strain_data(
+            measurement=wrench + loadcell_zero, loadcell_matrix=LOADCELL_MATRIX
+        ),
+        strain,
+    )
+    hits = sensors._cached_inverse.cache_info().hits
+    StrainAmp.wrench_to_strain_data(
+        measurement=wrench[0], loadcell_matrix=LOADCELL_MATRIX.copy()
+    )
+    assert sensors._cached_inverse.cache_info().hits == hits + 1
+
+    new_matrix = LOADCELL_MATRIX * 1.1
+    new_zero = np.zeros(shape=(1, 6))
+    recalibrated = StrainAmp.recalibrate_wrench(
+        wrench=wrench,
+        old_matrix=LOADCELL_MATRIX,
+        new_matrix=new_matrix,
+        old_zero=loadcell_zero,
+        new_zero=new_zero,
+    )
+    assert np.allclose(
+        recalibrated,
+        StrainAmp.strain_data_to_wrench(
+            unpacked_strain=strain,
+            loadcell_matrix=new_matrix,
+            loadcell_zero=new_zero,
+        ),
+    )
+
+
 def test_mockloadcell_init():
     """
     Test the MockLoadcell constructor\n
@@ -843,6 +916,75 @@ def test_loadcell_update(loadcell_patched: Loadcell):
     )
 
 
+def test_loadcell_update_calibration(loadcell_patched: Loadcell):
+    """
+    Tests the folded affine transform of the Loadcell update method\n
+    Asserts the wrench matches the step by step conversion, that the transform
+    is recomputed when the zero, gain or matrix is assigned or the loadcell is
+    reset, and that the wrench is written into the same buffer without
+    allocating memory.
+    """
+
+    genvars = np.array([1000.0, 2200.0, 1800.0, 2048.0, 3000.0, 100.0])
+
+    def expected(lc):
+        loadcell_signed = (genvars - lc._offset) / lc._adc_range * lc._exc
+        loadcell_coupled = loadcell_signed * 1000 / (lc._exc * lc._amp_gain)
+        return lc._loadcell_matrix.dot(loadcell_coupled) - lc._loadcell_zero
+
+    lc = loadcell_patched
+    lc._is_dephy = True
+    lc._joint = MockJoint()
+    lc._joint._data = Data(
+        **{f"genvar_{i}": value for i, value in enumerate(genvars.tolist())}
+    )
+    lc.update()
+    assert np.allclose(lc._loadcell_data, expected(lc))
+    buffer = lc._loadcell_data
+
+    lc.loadcell_zero = np.array([[1.0, 2.0, 3.0, 4.0, 5.0, 6.0]])
+    lc.amp_gain = 100.0
+    lc.update()
+    assert lc._loadcell_data is buffer
+    assert np.allclose(lc._loadcell_data, expected(lc))
+
+    lc.loadcell_matrix = LOADCELL_MATRIX * 2
+    lc.update()
+    assert np.allclose(lc._loadcell_data, expected(lc))
+
+    # An array modified in place takes effect once assigned again
+    zero = lc.loadcell_zero
+    zero[0, 2] = 30.0
+    lc.loadcell_zero = zero
+    lc.update()
+    assert np.allclose(lc._loadcell_data, expected(lc))
+
+    lc.update(loadcell_zero=np.zeros(shape=(1, 6)))
+    assert np.allclose(lc._loadcell_data, expected(lc) + lc._loadcell_zero)
+
+    def allocated(function):
+        function()
+        tracemalloc.reset_peak()
+        for _ in range(100):
+            function()
+        current, peak = tracemalloc.get_traced_memory()
+        return peak - current
+
+    tracemalloc.start()
+    baseline = allocated(lambda: None)
+    assert allocated(lc.update) <= baseline
+    assert allocated(lambda: np.zeros(6)) > baseline
+    tracemalloc.stop()
+
+    # The public vector is overwritten in place by the next update
+    data = lc.loadcell_data
+    kept = data.copy()
+    lc.reset()
+    lc.update()
+    assert np.shares_memory(data, lc.loadcell_data)
+    assert not np.allclose(kept, lc.loadcell_data)
+
+
 def test_loadcell_initialize(loadcell_patched: Loadcell, mocker, patch_sleep):
     """
     Tests the Loadcell initialize method\n
@@ -1086,3 +1228,321 @@ def test_loadcell_initialize(loadcell_patched: Loadcell, mocker, patch_sleep):
     assert round(lc_initialize_else.mz, -1) == round(
         loadcell_signed_dot_added_and_transposed[0][5], -1
     )
+
+
+def test_loadcell_statistical_zero(loadcell_patched: Loadcell, patch_sleep):
+    """
+    Tests the statistical zeroing methods of the Loadcell initialize method\n
+    This test feeds noisy strain samples around a constant value and asserts
+    the zero and the noise match those of the wrenches, that the zeroing stops
+    early once the confidence interval is tight enough, and that the samples
+    can be collected in the background.
+    """
+
+    rng = np.random.default_rng(seed=0)
+    strain = np.array([1000.0, 2200.0, 1800.0, 2048.0, 3000.0, 100.0])
+    lc = loadcell_patched
+    lc._log = Logger(file_path="tests/test_sensors/test_loadcell_zero_log")
+    lc._is_dephy = False
+    # The zeroing reads unfiltered samples, the median of 3 would shrink the noise
+    lc._lc._read_compressed_strain = lambda: strain + rng.normal(scale=2.0, size=6)
+
+    with pytest.raises(ValueError):
+        lc.initialize(method="average")
+
+    lc.initialize(number_of_iterations=400, method="mean")
+    assert lc.is_zeroed
+    assert lc.zero_samples == 400
+    expected = StrainAmp.strain_data_to_wrench(
+        unpacked_strain=strain,
+        loadcell_matrix=LOADCELL_MATRIX,
+        loadcell_zero=np.zeros(shape=(1, 6)),
+    )
+    noise = 2.0 * np.linalg.norm(LOADCELL_MATRIX, axis=1) / 4095 * 1000 / 125
+    assert np.allclose(lc._loadcell_zero[0], expected, atol=0.2 * noise)
+    assert np.allclose(lc.zero_noise, noise, rtol=0.2)
+
+    # The zero is subtracted off the next readings
+    lc._lc.update = lambda out=None: strain
+    lc.update()
+    assert np.allclose(lc.loadcell_data, 0.0, atol=0.2 * noise.max())
+
+    lc.reset()
+    lc.initialize(number_of_iterations=5000, method="median", confidence_interval=1.0)
+    assert lc.zero_samples < 5000
+    assert lc.zero_samples % 50 == 0
+    assert np.allclose(lc._loadcell_zero[0], expected, atol=1.0)
+
+    lc.reset()
+    lc.initialize(number_of_iterations=100, method="mean", background=True)
+    assert lc.zero_samples == 100
+    assert np.allclose(lc._loadcell_zero[0], expected, atol=0.5 * noise)
+
+    # In Dephy mode, a frame the actpack sends twice is only sampled once
+    frames = []
+
+    def read():
+        frames.append(Data(genvar_0=1000.0, genvar_1=2200.0, genvar_2=1800.0))
+        frames[-1].state_time = len(frames) // 2
+        return frames[-1]
+
+    lc.reset()
+    lc._is_dephy = True
+    lc._joint = MockJoint()
+    lc._joint.is_streaming = True
+    lc._joint.read = read
+    lc.initialize(number_of_iterations=100, method="mean")
+    assert lc.zero_samples == 100
+    assert len(frames) >= 200
+    assert lc._joint.frame_sequence == len(frames) // 2 + 1
+
+
+class MockDataPoint:
+    def __init__(self, name, value):
+        self._name = name
+        self._value = value
+
+    def channelName(self):
+        return self._name
+
+    def as_float(self):
+        return self._value
+
+
+class MockTimestamp:
+    def __init__(self, nanoseconds):
+        self._nanoseconds = nanoseconds
+
+    def nanoseconds(self):
+        return self._nanoseconds
+
+
+class MockPacket:
+    def __init__(self, values, nanoseconds):
+        self._points = [
+            MockDataPoint(name, value) for name, value in zip(IMU_CHANNELS, values)
+        ]
+        self._timestamp = MockTimestamp(nanoseconds)
+
+    def data(self):
+        return self._points
+
+    def collectedTimestamp(self):
+        return self._timestamp
+
+
+class MockTransport(IMUTransport):
+    """Serves the queued packets, as the MSCL circular buffer would"""
+
+    def __init__(self):
+        self.packets = []
+
+    def read(self, timeout):
+        packets, self.packets = self.packets, []
+        return packets
+
+
+def make_packets(count, start=0):
+    return [
+        MockPacket(
+            values=[(start + i) * 100.0 + channel for channel in range(11)],
+            nanoseconds=(start + i) * 10_000_000,
+        )
+        for i in range(count)
+    ]
+
+
+@pytest.fixture
+def imu_patched() -> IMULordMicrostrain:
+    return IMULordMicrostrain(timeout=5, buffer_size=4, transport=MockTransport())
+
+
+def test_imu_mscl_attributes(imu_patched: IMULordMicrostrain):
+    """
+    Tests that the imu and connection attributes forward to the MSCL transport,
+    and are None for other transports
+    """
+
+    imu = imu_patched
+    assert imu.imu is None
+    assert imu.connection is None
+
+    transport = MSCLTransport.__new__(MSCLTransport)
+    transport.connection = object()
+    transport.node = object()
+    imu.transport = transport
+    assert imu.imu is transport.node
+    assert imu.connection is transport.connection
+
+    with pytest.raises(AttributeError):
+        imu.imu = None
+
+
+def test_imu_get_data(imu_patched: IMULordMicrostrain):
+    """
+    Tests that get_data only decodes the newest packet into imu_data, and keeps
+    the previous data when no packet was received
+    """
+
+    imu = imu_patched
+    imu.transport.packets = make_packets(3)
+    data = imu.get_data()
+    assert data is imu.imu_data
+    assert [getattr(data, field) for field in IMU_FIELDS] == [
+        200.0 + channel for channel in range(11)
+    ]
+
+    imu.get_data()
+    assert data.angle_x == 200.0
+    assert data.imu_filter_gps_time_week_num == 210.0
+
+
+def test_imu_get_batch(imu_patched: IMULordMicrostrain):
+    """
+    Tests that get_batch decodes every pending packet in order, with their
+    timestamps, and grows its buffers past the initial buffer size
+    """
+
+    imu = imu_patched
+    imu.transport.packets = make_packets(3)
+    samples, timestamps = imu.get_batch()
+    assert samples.shape == (3, 11)
+    assert np.array_equal(samples[:, 0], [0.0, 100.0, 200.0])
+    assert np.array_equal(samples[1], 100.0 + np.arange(11))
+    assert np.allclose(timestamps, [0.0, 0.01, 0.02])
+    assert imu.imu_data.accel_z == 208.0
+
+    imu.transport.packets = make_packets(10, start=3)
+    samples, timestamps = imu.get_batch()
+    assert samples.shape == (10, 11)
+    assert np.array_equal(samples[:, 0], 100.0 * np.arange(3, 13))
+    assert np.allclose(timestamps, 0.01 * np.arange(3, 13))
+
+    samples, timestamps = imu.get_batch()
+    assert samples.shape == (0, 11)
+    assert timestamps.shape == (0,)
+    assert imu.imu_data.angle_x == 1200.0
+
+    # Packets missing some channels keep the previous values of the others
+    packet = make_packets(1, start=20)[0]
+    packet._points = packet._points[:3]
+    imu.transport.packets = [packet]
+    samples, _ = imu.get_batch()
+    assert np.array_equal(samples[0, :3], 2000.0 + np.arange(3))
+    assert np.array_equal(samples[0, 3:], 1200.0 + np.arange(3, 11))
+
+
+def test_imu_reader(imu_patched: IMULordMicrostrain):
+    """
+    Tests that the reader thread drains the IMU into a bounded queue, which
+    get_batch and get_data then take from, counting the dropped samples
+    """
+
+    imu = imu_patched
+    imu.transport.packets = make_packets(6)
+    imu.start_reader()
+    assert imu.is_reader_running
+
+    deadline = time.monotonic() + 5.0
+    while imu.transport.packets and time.monotonic() < deadline:
+        time.sleep(0.001)
+
+    imu.stop_reader()
+    assert not imu.is_reader_running
+
+    # Only the newest 4 samples fit in the queue
+    assert imu.dropped == 2
+    samples, timestamps = imu.get_batch()
+    assert np.array_equal(samples[:, 0], [200.0, 300.0, 400.0, 500.0])
+    assert np.allclose(timestamps, [0.02, 0.03, 0.04, 0.05])
+
+    imu.transport.packets = make_packets(2, start=6)
+    imu.start_reader()
+    deadline = time.monotonic() + 5.0
+    while imu.transport.packets and time.monotonic() < deadline:
+        time.sleep(0.001)
+
+    imu.stop_reader()
+    assert imu.get_data().angle_x == 700.0
+    assert imu.get_batch()[0].shape == (0, 11)
+
+    def failing_read(timeout):
+        raise RuntimeError("IMU disconnected")
+
+    imu.transport.read = failing_read
+    imu.start_reader()
+    deadline = time.monotonic() + 5.0
+    while not imu.read_errors and time.monotonic() < deadline:
+        time.sleep(0.001)
+
+    imu.stop_reader()
+    assert imu.read_errors >= 1
+
+
+def test_imu_replay_transport(tmp_path, patch_sleep):
+    """
+    Tests that the replay transport plays a recording back at the recorded
+    rate, in bursts at an infinite speed, and in a loop, and that a recording
+    saved from get_batch replays to the same samples
+    """
+
+    samples = 100.0 * np.arange(5)[:, None] + np.arange(11)
+    timestamps = 10.0 + 0.01 * np.arange(5)
+
+    with pytest.raises(ValueError):
+        ReplayTransport(samples=samples[:, :6], timestamps=timestamps)
+
+    with pytest.raises(ValueError):
+        ReplayTransport(samples=samples, timestamps=timestamps[:3])
+
+    now = [0.0]
+    sensors.CLOCK.reset(source=lambda: round(now[0] * 1e9))
+    try:
+        transport = ReplayTransport(samples=samples, timestamps=timestamps, speed=2.0)
+        imu = IMULordMicrostrain(timeout=5, transport=transport)
+        assert imu.get_batch()[0].shape == (0, 11)
+
+        imu.start_streaming()
+        batch, stamps = imu.get_batch()
+        assert np.array_equal(batch, samples[:1])
+        assert np.allclose(stamps, timestamps[:1])
+
+        now[0] = 0.011
+        assert np.array_equal(imu.get_batch()[0], samples[1:3])
+
+        # Nothing due: waits for the next packet, which is 4 ms away
+        assert imu.get_data().angle_x == 300.0
+
+        now[0] = 1.0
+        assert np.array_equal(imu.get_batch()[0], samples[4:])
+        assert transport.is_finished
+        assert imu.get_batch()[0].shape == (0, 11)
+
+        looping = ReplayTransport(
+            samples=samples, timestamps=timestamps, speed=1.0, loop=True
+        )
+        looping.start()
+        now[0] = 1.0 + 0.125
+        assert len(looping.read(timeout=5)) == 13
+        assert not looping.is_finished
+        assert looping.packets_read == 13
+    finally:
+        sensors.CLOCK.reset(source=time.monotonic_ns)
+
+    burst = ReplayTransport(
+        samples=samples, timestamps=timestamps, speed=math.inf, burst=2, loop=True
+    )
+    assert burst.read(timeout=5) == []
+    burst.start()
+    assert [len(burst.read(timeout=5)) for _ in range(4)] == [2, 2, 2, 2]
+    assert burst.packets_read == 8
+
+    file_path = str(tmp_path / "imu.npz")
+    ReplayTransport.save(file_path, samples=samples, timestamps=timestamps)
+    imu = IMULordMicrostrain(
+        transport=ReplayTransport.load(file_path, speed=math.inf, burst=5)
+    )
+    imu.start_streaming()
+    batch, stamps = imu.get_batch()
+    assert np.array_equal(batch, samples)
+    assert np.allclose(stamps, timestamps)
@@ -0,0 +1,195 @@
+import numpy as np
+import pytest
+
+from opensourceleg.control.replay import LogReplay, LogSample, ReplayResult, read_log
+from opensourceleg.control.state_machine import Event, State, StateMachine
+from opensourceleg.control.table_state_machine import TableStateMachine, Threshold
+from opensourceleg.tools.clock import CLOCK
+from opensourceleg.tools.logger import Logger
+
+STATES = ("stance", "swing")
+FREQUENCY = 200
+
+
+class Leg:
+    def __init__(self):
+        self.timestamp = 0.0
+        self.knee_position = 0.0
+        self.fz = 0.0
+
+    def __repr__(self) -> str:
+        return f"leg"
+
+
+def write_log(file_path, data_format, seconds=10.0):
+    """Logs a 1 Hz gait: loaded stance, then swing with the knee flexed"""
+
+    leg = Leg()
+    log = Logger(file_path=file_path, data_format=data_format)
+    log.add_attributes(container=leg, attributes=["timestamp", "knee_position", "fz"])
+
+    for i in range(int(seconds * FREQUENCY)):
+        leg.timestamp = 100.0 + i / FREQUENCY
+        phase = (i % FREQUENCY) / FREQUENCY
+        leg.fz = -600.0 if phase < 0.6 else 0.0
+        leg.knee_position = 0.0 if phase < 0.6 else np.sin(np.pi * (phase - 0.6) / 0.4)
+        log.data()
+
+    log.close()
+    return file_path + (".csv" if data_format == "csv" else ".bin")
+
+
+def build_table(threshold: float = -300.0) -> TableStateMachine:
+    fsm = TableStateMachine(signals=["fz", "knee_position"])
+    stance, swing = State(name=STATES[0]), State(name=STATES[1])
+    fsm.add_state(state=stance, initial_state=True)
+    fsm.add_state(state=swing)
+    fsm.add_transition(stance, swing, guard=[Threshold("fz", ">", threshold)])
+    fsm.add_transition(
+        swing,
+        stance,
+        guard=[Threshold("fz", "<", threshold), Threshold("knee_position", "<", 0.1)],
+    )
+    return fsm
+
+
+def build_state_machine(threshold: float = -300.0, spoof: bool = False):
+    fsm = StateMachine(spoof=spoof)
+    stance, swing = State(name=STATES[0]), State(name=STATES[1])
+    fsm.add_state(state=stance, initial_state=True)
+    fsm.add_state(state=swing)
+    fsm.add_event(event=Event(name="event"))
+    fsm.add_transition(
+        source=stance,
+        destination=swing,
+        event=Event(name="event"),
+        callback=lambda osl: osl.leg.fz > threshold,
+    )
+    fsm.add_transition(
+        source=swing,
+        destination=stance,
+        event=Event(name="event"),
+        callback=lambda osl: osl.leg.fz < threshold and osl.leg.knee < 0.1,
+    )
+    return fsm
+
+
+def test_read_log(tmp_path):
+    """
+    Tests that the CSV and binary logs of the Logger are read back as the same
+    structured array
+    """
+
+    csv_log = read_log(write_log(str(tmp_path / "gait"), "csv", seconds=1.0))
+    binary_log = read_log(write_log(str(tmp_path / "gait"), "binary", seconds=1.0))
+    assert csv_log.dtype.names == ("leg:timestamp", "leg:knee_position", "leg:fz")
+    assert binary_log.dtype.names == csv_log.dtype.names
+    assert len(csv_log) == FREQUENCY
+    for name in csv_log.dtype.names:
+        assert np.allclose(csv_log[name], binary_log[name])
+
+    with pytest.raises(ValueError):
+        LogReplay(log=csv_log)
+
+
+def test_log_sample():
+    """
+    Tests that the LogSample sets every attribute path to the value of its column
+    """
+
+    sample = LogSample(paths=["knee.output_position", "loadcell.fz", "timestamp"])
+    sample.set(row=[0.5, -600.0, 12.0])
+    assert sample.knee.output_position == 0.5
+    assert sample.loadcell.fz == -600.0
+    assert sample.timestamp == 12.0
+
+
+def test_log_replay(tmp_path):
+    """
+    Tests that a TableStateMachine and a StateMachine with the same criteria
+    go through the same states over a log, at the times of the log, and the
+    transitions and dwell time statistics
+    """
+
+    replay = LogReplay(
+        log=write_log(str(tmp_path / "gait"), "binary"), time_column="leg:timestamp"
+    )
+    assert len(replay) == 10 * FREQUENCY
+    assert replay.timestamps[0] == 100.0
+
+    table = replay.run(
+        fsm=build_table(),
+        columns={"fz": "leg:fz", "knee_position": "leg:knee_position"},
+    )
+    assert isinstance(table, ReplayResult)
+    assert table.state_names == list(STATES)
+    assert table.state_sequence == list(STATES) * 10
+    assert np.allclose(table.transition_times[::2], 100.6 + np.arange(10))
+    assert table.transitions[:2] == [
+        (pytest.approx(100.6), "stance", "swing"),
+        (pytest.approx(101.0), "swing", "stance"),
+    ]
+
+    # The log ends in swing, whose last visit is not complete
+    statistics = table.dwell_statistics()
+    assert statistics["stance"]["count"] == 10
+    assert statistics["swing"]["count"] == 9
+    assert statistics["stance"]["mean"] == pytest.approx(0.6)
+    assert statistics["swing"]["mean"] == pytest.approx(0.4)
+    assert statistics["swing"]["std"] < 1e-9
+    assert statistics["stance"]["total"] == pytest.approx(6.0)
+
+    source = CLOCK.source
+    callbacks = replay.run(
+        fsm=build_state_machine(),
+        columns={"leg.fz": "leg:fz", "leg.knee": "leg:knee_position"},
+    )
+    assert CLOCK.source is source
+    assert callbacks.state_names == ["idle", *STATES]
+    assert callbacks.state_sequence == table.state_sequence
+    assert np.array_equal(callbacks.transition_indices, table.transition_indices)
+
+
+def test_log_replay_virtual_clock():
+    """
+    Tests that the time spent in a state follows the timestamps of the log, by
+    spoofing the transitions after the minimum time in state
+    """
+
+    log = np.zeros(2000, dtype=[("t", "<f8")])
+    log["t"] = np.arange(2000) / 100
+    fsm = build_state_machine(spoof=True)
+    for state in fsm._states:
+        state.set_minimum_time_spent_in_state(time=1.0)
+
+    result = LogReplay(log=log, time_column="t").run(fsm=fsm)
+    assert len(result.transition_indices) == 19
+    assert np.all(np.abs(result.dwell_times[1] - 1.01) < 0.015)
+
+
+def test_log_replay_sweep(tmp_path):
+    """
+    Tests that sweeping the thresholds in a process pool gives the same results
+    as replaying them one after the other
+    """
+
+    replay = LogReplay(
+        log=write_log(str(tmp_path / "gait"), "csv", seconds=3.0), frequency=FREQUENCY
+    )
+    columns = {"fz": "leg:fz", "knee_position": "leg:knee_position"}
+    thresholds = [-700.0, -300.0, -100.0, 10.0]
+
+    results = replay.sweep(
+        build=build_table, parameters=thresholds, columns=columns, processes=2
+    )
+    expected = replay.sweep(
+        build=build_table, parameters=thresholds, columns=columns, processes=1
+    )
+    assert [result.parameters for result in results] == thresholds
+    for result, reference in zip(results, expected):
+        assert np.array_equal(result.states, reference.states)
+
+    # Always unloaded, or never
+    assert results[0].state_sequence == list(STATES)
+    assert results[1].state_sequence == list(STATES) * 3
+    assert len(results[3].transition_indices) == 0
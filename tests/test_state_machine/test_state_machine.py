@@ -14,6 +14,7 @@ from opensourceleg.control.state_machine import (
     Transition,
 )
 from opensourceleg.osl import OpenSourceLeg
+from opensourceleg.tools.clock import CLOCK, SimulatedClock
 from opensourceleg.tools.logger import Logger
 
 
@@ -241,10 +242,11 @@ def test_state_on_exit():
 @pytest.fixture
 def mock_time(monkeypatch):
     """
-    Fixture to mock the time.time method to return 1.0
+    Fixture to mock the library clock to return 1.0
     """
 
-    monkeypatch.setattr(time, "time", lambda: 1.0)
+    monkeypatch.setattr(CLOCK, "_source", lambda: 1_000_000_000)
+    monkeypatch.setattr(CLOCK, "_tick_ns", None)
 
 
 def criteria_test(data="test_data") -> bool:
@@ -836,6 +838,72 @@ def test_state_machine_update():
     assert test_state_machine_update2._exited == True
 
 
+def test_state_machine_update_indexed_transitions():
+    """
+    Tests that the StateMachine update method looks up the transitions leaving
+    the current state, in the order they were added, evaluates the first one
+    only, and finds the transitions of a state given as an equal but different
+    object.
+    """
+
+    calls = []
+
+    def criteria(name, result):
+        def callback(osl):
+            calls.append(name)
+            return result[0]
+
+        return callback
+
+    fsm = StateMachine(osl=OpenSourceLeg())
+    states = [State(name=f"state{i}") for i in range(20)]
+    for state in states:
+        fsm.add_state(state=state)
+
+    to_next = [False]
+    fsm.add_event(event=Event(name="event"))
+    for i, state in enumerate(states[:-1]):
+        fsm.add_transition(
+            source=state,
+            destination=states[i + 1],
+            event=Event(name="event"),
+            callback=criteria(name=f"next{i}", result=to_next),
+        )
+
+    fsm.add_transition(
+        source=states[0],
+        destination=states[-1],
+        event=Event(name="event"),
+        callback=criteria(name="last", result=[True]),
+    )
+    assert len(fsm._transitions) == 20
+    assert fsm.transitions_from(state=states[0]) == fsm._transitions[::19]
+    assert fsm.transitions_from(state=State(name="state5")) == [fsm._transitions[5]]
+    assert fsm.transitions_from(state=State(name="state30")) == []
+
+    fsm._initial_state = states[0]
+    fsm.start()
+    fsm.update()
+    assert calls == ["next0"]
+    assert fsm.current_state is states[0]
+
+    to_next[0] = True
+    fsm.update()
+    assert calls == ["next0", "next0"]
+    assert fsm.current_state is states[1]
+
+    # Only the transitions leaving the current state are evaluated
+    fsm._current_state = State(name="state18")
+    fsm.update()
+    assert calls == ["next0", "next0", "next18"]
+    assert fsm.current_state is states[-1]
+
+    # No transition leaves the last state
+    fsm.update()
+    assert len(calls) == 3
+    assert fsm.current_state is states[-1]
+
+
 def test_state_machine_start():
     """
     Tests the StateMachine start method\n
@@ -957,3 +1025,40 @@ def test_state_machine_non_default_properties():
     assert test_state_machine_ndp.current_state == State(name="state2")
     assert test_state_machine_ndp.states == ["idle", "state1", "state2", "state3"]
     assert test_state_machine_ndp.is_spoofing == True
+
+
+def test_state_machine_attached():
+    """
+    Tests the StateMachine osl property and attached method\n
+    Attaches a StateMachine to another osl object and a SimulatedClock, and
+    asserts the transitions and the states use them while attached, and that
+    the osl object and every clock are restored on exit, even after an error.
+    """
+
+    osl = object()
+    replay_osl = object()
+    clock = SimulatedClock()
+    state = State(name="state1")
+    test_state_machine_a = StateMachine(osl=osl)
+    test_state_machine_a.add_state(state=state, initial_state=True)
+    assert test_state_machine_a.osl is osl
+
+    with test_state_machine_a.attached(osl=replay_osl, clock=clock) as fsm:
+        assert fsm is test_state_machine_a
+        assert fsm.osl is replay_osl
+        assert fsm.clock is clock
+        assert state.clock is clock
+
+    assert test_state_machine_a.osl is osl
+    assert test_state_machine_a.clock is CLOCK
+    assert state.clock is CLOCK
+
+    with pytest.raises(RuntimeError):
+        with test_state_machine_a.attached(osl=replay_osl):
+            assert state.clock is CLOCK
+            raise RuntimeError
+
+    assert test_state_machine_a.osl is osl
+
+    test_state_machine_a.osl = replay_osl
+    assert test_state_machine_a.osl is replay_osl
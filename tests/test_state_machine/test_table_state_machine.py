@@ -0,0 +1,217 @@
+import numpy as np
+import pytest
+
+from opensourceleg.control.state_machine import Event, State, StateMachine
+from opensourceleg.control.table_state_machine import TableStateMachine, Threshold
+
+SIGNALS = ("knee_position", "knee_velocity", "ankle_position", "fz")
+STATES = ("e_stance", "l_stance", "e_swing", "l_swing")
+
+# Guards of the walking FSM example, as (source, destination, conditions)
+WALKING_TRANSITIONS = (
+    ("e_stance", "l_stance", [("fz", "<", -0.5), ("ankle_position", ">", 0.2)]),
+    ("l_stance", "e_swing", [("fz", ">", 0.3)]),
+    ("e_swing", "l_swing", [("knee_position", ">", 0.6), ("knee_velocity", "<", 0)]),
+    ("l_swing", "e_stance", [("fz", "<=", -0.8)]),
+    ("l_swing", "e_stance", [("knee_position", "<", -0.4)]),
+)
+
+
+def build_table_state_machine():
+    states = {name: State(name=name) for name in STATES}
+
+    fsm = TableStateMachine(signals=SIGNALS)
+    for name, state in states.items():
+        fsm.add_state(state=state, initial_state=name == "e_stance")
+
+    for source, destination, conditions in WALKING_TRANSITIONS:
+        fsm.add_transition(
+            source=states[source],
+            destination=states[destination],
+            guard=[Threshold(*condition) for condition in conditions],
+        )
+
+    return fsm, states
+
+
+def build_state_machine(signals):
+    """
+    Same FSM, with the guards as callbacks over a dict of the signals. The
+    StateMachine only evaluates the first transition leaving a state, so the
+    guards of the transitions leaving the same state towards the same
+    destination are tried in one callback.
+    """
+
+    comparisons = {
+        "<": lambda x, y: x < y,
+        "<=": lambda x, y: x <= y,
+        ">": lambda x, y: x > y,
+        ">=": lambda x, y: x >= y,
+    }
+
+    def guard(guards):
+        return lambda osl: any(
+            all(
+                comparisons[comparison](osl[signal], value)
+                for signal, comparison, value in conditions
+            )
+            for conditions in guards
+        )
+
+    guards = {}
+    for source, destination, conditions in WALKING_TRANSITIONS:
+        guards.setdefault((source, destination), []).append(conditions)
+
+    states = {name: State(name=name) for name in STATES}
+
+    fsm = StateMachine(osl=signals)
+    for name, state in states.items():
+        fsm.add_state(state=state, initial_state=name == "e_stance")
+
+    fsm.add_event(event=Event(name="event"))
+    for (source, destination), conditions in guards.items():
+        fsm.add_transition(
+            source=states[source],
+            destination=states[destination],
+            event=Event(name="event"),
+            callback=guard(conditions),
+        )
+
+    return fsm
+
+
+def test_threshold():
+    """
+    Tests that the Threshold only accepts the supported comparisons, and that
+    the TableStateMachine rejects unknown signals and states
+    """
+
+    with pytest.raises(ValueError):
+        Threshold("fz", "==", 0.0)
+
+    with pytest.raises(ValueError):
+        TableStateMachine(signals=["fz", "fz"])
+
+    fsm, states = build_table_state_machine()
+    with pytest.raises(ValueError):
+        fsm.add_state(state=State(name="e_stance"))
+
+    with pytest.raises(ValueError):
+        fsm.add_transition(
+            source=states["e_stance"],
+            destination=states["l_stance"],
+            guard=[Threshold("mz", "<", 0.0)],
+        )
+
+    with pytest.raises(ValueError):
+        fsm.add_transition(source=State(name="sit"), destination=states["l_stance"])
+
+
+def test_table_state_machine_compile():
+    """
+    Tests the arrays the TableStateMachine is lowered to
+    """
+
+    fsm, _ = build_table_state_machine()
+    assert fsm.states == ["e_stance", "l_stance", "e_swing", "l_swing"]
+    assert fsm.signals == list(SIGNALS)
+    assert np.array_equal(fsm.destinations, [[1, -1], [2, -1], [3, -1], [0, 0]])
+    assert np.array_equal(
+        fsm.transition_matrix,
+        [
+            [False, True, False, False],
+            [False, False, True, False],
+            [False, False, False, True],
+            [True, False, False, False],
+        ],
+    )
+
+
+def test_table_state_machine_update():
+    """
+    Tests that the TableStateMachine goes through the same states as the
+    StateMachine with the same guards as callbacks, tick by tick, that it
+    calls the state callbacks, and handles inclusive comparisons and NaNs
+    """
+
+    fsm, states = build_table_state_machine()
+    entries = []
+    states["l_stance"].on_entry(lambda data: entries.append(data))
+
+    signals = dict.fromkeys(SIGNALS, 0.0)
+    reference = build_state_machine(signals=signals)
+
+    rng = np.random.default_rng(seed=0)
+    trace = rng.uniform(-1.0, 1.0, size=(2000, len(SIGNALS)))
+
+    fsm.start()
+    reference.start()
+    visited = set()
+    for t, sample in enumerate(trace):
+        signals.update(zip(SIGNALS, sample))
+        reference.update()
+        state = fsm.update(signals=sample, data=t)
+        assert state is fsm.current_state
+        assert state.name == reference.current_state.name
+        visited.add(state.name)
+
+    assert visited == set(fsm.states)
+    assert len(entries) > 10
+    assert all(isinstance(t, int) for t in entries)
+
+    # fz <= -0.8 holds at equality, a NaN never satisfies a guard
+    fsm._current_state = 3
+    assert fsm.update(signals=[np.nan, 0.0, 0.0, np.nan]).name == "l_swing"
+    signals = fsm.vector(signals=dict(signals, knee_position=0.0, fz=-0.8))
+    assert fsm.update(signals=signals).name == "e_stance"
+
+
+def test_table_state_machine_run():
+    """
+    Tests that running the TableStateMachine over a trace in batch, in chunks,
+    gives the same states as updating it tick by tick
+    """
+
+    fsm, states = build_table_state_machine()
+    rng = np.random.default_rng(seed=1)
+    trace = rng.uniform(-1.0, 1.0, size=(5000, len(SIGNALS)))
+
+    fsm.start()
+    expected = [fsm.states.index(fsm.update(signals=sample).name) for sample in trace]
+
+    assert np.array_equal(fsm.run(trace=trace), expected)
+    assert np.array_equal(fsm.run(trace=trace, chunk_size=7), expected)
+    assert np.array_equal(
+        fsm.run(trace=trace[100:], initial_state=states[fsm.states[expected[99]]]),
+        expected[100:],
+    )
+    assert fsm.run(trace=np.zeros((0, len(SIGNALS)))).shape == (0,)
+
+    with pytest.raises(ValueError):
+        fsm.run(trace=trace[:, :3])
+
+
+def test_table_state_machine_unguarded_transition():
+    """
+    Tests that a transition without a guard is always taken, unless an earlier
+    transition leaving the same state is, in update and in run
+    """
+
+    fsm = TableStateMachine(signals=["fz"])
+    states = [State(name=name) for name in ("sit", "stand", "walk")]
+    for state in states:
+        fsm.add_state(state=state)
+
+    fsm.add_transition(states[0], states[2], guard=[Threshold("fz", ">=", 1.0)])
+    fsm.add_transition(source=states[0], destination=states[1])
+    fsm.add_transition(states[1], states[0], guard=[Threshold("fz", ">", 1.0)])
+
+    trace = np.array([[0.0], [1.0], [1.0], [2.0], [np.nan], [1.0]])
+    fsm.start()
+    names = [fsm.update(signals=sample).name for sample in trace.tolist()]
+    assert names == ["stand", "stand", "stand", "sit", "stand", "stand"]
+    assert [fsm.states[i] for i in fsm.run(trace=trace)] == names
+
+    assert np.array_equal(
+        fsm.run(trace=trace[1:], initial_state=states[0]), [2, 2, 2, 2, 2]
+    )
@@ -1,3 +1,6 @@
+import math
+
+import numpy as np
 import pytest
 
 from opensourceleg.hardware import thermal
@@ -110,3 +113,219 @@ def test_update():
         + 21
     )
     assert test_model_default.T_a == 21
+
+
+def test_batch_update_and_get_scale():
+    """
+    Tests the BatchThermalModel update_and_get_scale method\n
+    Asserts that every actuator of the batch follows the scalar ThermalModel,
+    including the derating near the temperature limits.
+    """
+
+    batch = thermal.BatchThermalModel(number_of_actuators=3, ambient=[20, 21, 22])
+    models = [thermal.ThermalModel(ambient=ambient) for ambient in [20, 21, 22]]
+    assert len(batch) == 3
+    assert list(batch.T_a) == [20, 21, 22]
+
+    batch.T_w = np.array([90.0, 105.0, 120.0])
+    batch.T_c = np.array([50.0, 78.0, 60.0])
+    for model, T_w, T_c in zip(models, batch.T_w, batch.T_c):
+        model.T_w, model.T_c = T_w, T_c
+
+    for current in [0, 5000, -20000, 8000]:
+        scales = batch.update_and_get_scale(dt=1 / 200, motor_current=current)
+        for model, scale, T_w, T_c in zip(models, scales, batch.T_w, batch.T_c):
+            assert model.update_and_get_scale(
+                dt=1 / 200, motor_current=current
+            ) == pytest.approx(scale)
+            assert model.T_w == pytest.approx(T_w)
+            assert model.T_c == pytest.approx(T_c)
+
+
+def test_batch_simulate():
+    """
+    Tests the BatchThermalModel simulate method\n
+    Asserts that simulating a current trace gives the same temperatures as
+    stepping the scalar ThermalModel through it, and leaves the final state.
+    """
+
+    currents = np.random.default_rng(seed=0).uniform(-10000, 10000, size=(1000, 2))
+    batch = thermal.BatchThermalModel(number_of_actuators=2, ambient=[20, 25])
+    temperatures = batch.simulate(motor_current=currents, dt=1 / 200)
+    assert temperatures.shape == (1000, 2, 2)
+
+    for j, ambient in enumerate([20, 25]):
+        model = thermal.ThermalModel(ambient=ambient)
+        for k in range(currents.shape[0]):
+            model.update(dt=1 / 200, motor_current=currents[k, j])
+            assert temperatures[k, j, 0] == pytest.approx(model.T_w, abs=1e-9)
+            assert temperatures[k, j, 1] == pytest.approx(model.T_c, abs=1e-9)
+
+        assert batch.T_w[j] == pytest.approx(model.T_w, abs=1e-9)
+        assert batch.T_c[j] == pytest.approx(model.T_c, abs=1e-9)
+
+    single = thermal.BatchThermalModel(number_of_actuators=1)
+    assert single.simulate(motor_current=currents[:, 0]).shape == (1000, 1, 2)
+    assert single.simulate(motor_current=np.empty(0)).shape == (0, 1, 2)
+
+    # Traces too short to fill a block, or leaving a few steps after the last one
+    for steps in [1, 2, 3, 5, 10]:
+        short = thermal.BatchThermalModel(number_of_actuators=2)
+        stepped = thermal.BatchThermalModel(number_of_actuators=2)
+        temperatures = short.simulate(motor_current=currents[:steps])
+        for k in range(steps):
+            stepped.update(motor_current=currents[k])
+            assert temperatures[k, :, 0] == pytest.approx(stepped.T_w, abs=1e-12)
+            assert temperatures[k, :, 1] == pytest.approx(stepped.T_c, abs=1e-12)
+
+        assert short.T_w == pytest.approx(stepped.T_w, abs=1e-12)
+
+
+def test_exact_integrator():
+    """
+    Tests the exact integrator of the ThermalModel\n
+    Asserts that one large step gives the same temperatures as many small
+    exact steps, and is close to a fine forward Euler integration, and that the
+    discretization is only recomputed when the current changes materially.
+    """
+
+    with pytest.raises(ValueError):
+        thermal.ThermalModel(integrator="rk4")
+
+    large = thermal.ThermalModel(integrator="exact")
+    small = thermal.ThermalModel(integrator="exact")
+    euler = thermal.ThermalModel()
+    assert large.integrator == "exact"
+    assert euler.integrator == "euler"
+
+    for _ in range(20):
+        large.update(dt=0.1, motor_current=8000)
+        for _ in range(100):
+            small.update(dt=0.001, motor_current=8000)
+            euler.update(dt=0.001, motor_current=8000)
+
+    assert large.T_w == pytest.approx(small.T_w, abs=1e-9)
+    assert large.T_c == pytest.approx(small.T_c, abs=1e-9)
+    assert large.T_w == pytest.approx(euler.T_w, abs=1e-3)
+    assert large.T_c == pytest.approx(euler.T_c, abs=1e-3)
+    assert large.discretizations == 1
+    assert small.discretizations == 1
+
+    large.update(dt=0.1, motor_current=8001)
+    assert large.discretizations == 1
+    large.update(dt=0.1, motor_current=9000)
+    assert large.discretizations == 2
+
+    hot = thermal.ThermalModel(integrator="exact")
+    hot.T_w = 110.0
+    assert hot.update_and_get_scale(dt=0.1, motor_current=8000) == pytest.approx(
+        np.sqrt((115 - 110) / 15)
+    )
+
+
+def test_batch_exact_integrator():
+    """
+    Tests the exact integrator of the BatchThermalModel\n
+    Asserts that simulate and update agree with the scalar exact integrator.
+    """
+
+    currents = np.random.default_rng(seed=1).uniform(-8000, 8000, size=(500, 2))
+    batch = thermal.BatchThermalModel(number_of_actuators=2, integrator="exact")
+    temperatures = batch.simulate(motor_current=currents, dt=0.05)
+
+    stepped = thermal.BatchThermalModel(number_of_actuators=2, integrator="exact")
+    models = [
+        thermal.ThermalModel(integrator="exact", rediscretization_tolerance=0)
+        for _ in range(2)
+    ]
+    for k in range(currents.shape[0]):
+        stepped.update(dt=0.05, motor_current=currents[k])
+        for j, model in enumerate(models):
+            model.update(dt=0.05, motor_current=currents[k, j])
+
+    assert temperatures[-1, :, 0] == pytest.approx(stepped.T_w, abs=1e-9)
+    assert temperatures[-1, :, 1] == pytest.approx(stepped.T_c, abs=1e-9)
+    assert stepped.T_w == pytest.approx([model.T_w for model in models], abs=1e-9)
+    assert stepped.T_c == pytest.approx([model.T_c for model in models], abs=1e-9)
+
+
+def test_time_to_limit():
+    """
+    Tests the ThermalModel time_to_limit method\n
+    Asserts that the predicted time matches stepping the model until the soft
+    winding limit is reached, for a constant current and for a profile, and
+    that the limits already reached or never reached are reported.
+    """
+
+    # Without the temperature coefficient, the prediction is not conservative but exact
+    model = thermal.ThermalModel(params={"α": 0.0}, integrator="exact")
+    predicted = model.time_to_limit(motor_current=15000)
+
+    stepped = thermal.ThermalModel(params={"α": 0.0}, integrator="exact")
+    elapsed = 0.0
+    while stepped.T_w < stepped.soft_max_temp_windings:
+        stepped.update(dt=0.01, motor_current=15000)
+        elapsed += 0.01
+    assert predicted == pytest.approx(elapsed, abs=0.011)
+
+    profile = [(5.0, 1000), (math.inf, 15000)]
+    assert 5.0 < model.time_to_limit(motor_current=profile) < 5.0 + predicted
+    assert model.time_to_limit(motor_current=[(5.0, 15000)]) == math.inf
+    assert model.time_to_limit(motor_current=1000) == math.inf
+    assert model.time_to_limit(motor_current=15000, soft=False) > predicted
+
+    # The temperature coefficient makes the prediction conservative
+    assert thermal.ThermalModel().time_to_limit(motor_current=15000) < predicted
+
+    model.T_w = 101.0
+    assert model.time_to_limit(motor_current=0) == 0.0
+
+
+def test_max_rms_current():
+    """
+    Tests the ThermalModel max_rms_current method\n
+    Asserts that holding the predicted current for the horizon brings the
+    winding to its soft limit, and that no current is allowed above it.
+    """
+
+    model = thermal.ThermalModel(params={"α": 0.0}, integrator="exact")
+
+    for horizon in [1.0, 60.0]:
+        current = model.max_rms_current(horizon=horizon)
+        assert model.time_to_limit(motor_current=current) == pytest.approx(horizon)
+
+        stepped = thermal.ThermalModel(params={"α": 0.0}, integrator="exact")
+        stepped.update(dt=horizon, motor_current=current)
+        assert stepped.T_w == pytest.approx(stepped.soft_max_temp_windings)
+
+    continuous = model.max_rms_current()
+    assert continuous < model.max_rms_current(horizon=60.0)
+    assert model.time_to_limit(motor_current=0.99 * continuous) == math.inf
+    assert model.time_to_limit(motor_current=1.01 * continuous) < math.inf
+    assert model.max_rms_current(soft=False) > continuous
+
+    model.T_c = 76.0
+    assert model.max_rms_current(horizon=1.0) == 0.0
+
+
+def test_max_rms_current_warm():
+    """
+    Tests the ThermalModel max_rms_current method from a warm motor\n
+    Asserts that holding the predicted current reaches a limit at the horizon,
+    while the winding cools down from its initial temperature, and that a
+    slightly larger current reaches it before.
+    """
+
+    model = thermal.ThermalModel()
+    model.T_w, model.T_c = 60.0, 40.0
+
+    for horizon in [10.0, 60.0, 300.0]:
+        current = model.max_rms_current(horizon=horizon)
+        assert model.time_to_limit(motor_current=current) == pytest.approx(horizon)
+        assert model.time_to_limit(motor_current=1.01 * current) < horizon
+
+    assert model.max_rms_current(horizon=60.0) == pytest.approx(11315, rel=1e-3)
+
+    continuous = model.max_rms_current()
+    assert model.time_to_limit(motor_current=0.99 * continuous) == math.inf
+    assert model.time_to_limit(motor_current=1.01 * continuous) < math.inf
@@ -1,8 +1,18 @@
+import math
+import os
+import signal
+import threading
 import time
 
 import pytest
 
-from opensourceleg.tools.utilities import LoopKiller, SoftRealtimeLoop
+from opensourceleg.tools.clock import CLOCK, SimulatedClock
+from opensourceleg.tools.utilities import (
+    Histogram,
+    LoopKiller,
+    SoftRealtimeLoop,
+    TimingEngine,
+)
 from tests.test_joints.test_joint import patch_time_time
 
 
@@ -41,12 +51,12 @@ def test_loopkiller_handle_signal():
 @pytest.fixture
 def patch_time_time2(monkeypatch):
     """
-    Fixture to patch the time.time method\n
-    Patches the time.time method to return a list of values one at a time.
+    Fixture to patch the library clock\n
+    Patches the library clock to return a list of values, in seconds, one at a time.
     """
 
     values = [0, 1, 2, 3, 4, 5]
-    monkeypatch.setattr(time, "time", lambda: values.pop(0))
+    monkeypatch.setattr(CLOCK, "_source", lambda: values.pop(0) * 1_000_000_000)
 
 
 def test_loopkiller_get_fade(patch_time_time2):
@@ -114,12 +124,12 @@ def test_softrealtimeloop_init(patch_time_time2):
 @pytest.fixture
 def patch_time_time3(monkeypatch):
     """
-    Fixture to patch the time.time method\n
-    Patches the time.time method to return a list of values one at a time.
+    Fixture to patch the library clock\n
+    Patches the library clock to return a list of values, in seconds, one at a time.
     """
 
     values = [0, 0, 1, 2, 3, 4, 5]
-    monkeypatch.setattr(time, "time", lambda: values.pop(0))
+    monkeypatch.setattr(CLOCK, "_source", lambda: values.pop(0) * 1_000_000_000)
 
 
 def test_softrealtimeloop_del():
@@ -163,3 +173,189 @@ def test_softrealtimeloop_time_since(patch_time_time2):
     srtls = SoftRealtimeLoop()
     assert srtls.t1 == 0.0
     assert srtls.time_since() == 1.0
+
+
+def test_histogram():
+    """
+    Tests the Histogram class\n
+    Asserts the percentiles are resolved to the upper edge of their bin, that
+    values beyond the last bin are reported through the maximum, and that an
+    empty histogram returns nan.
+    """
+
+    h = Histogram(bin_width=1.0, number_of_bins=10)
+    assert math.isnan(h.percentile(50))
+    for value in [0.5, 1.5, 1.5, 2.5, 25.0]:
+        h.add(value)
+    assert h.count == 5
+    assert h.percentile(20) == 1.0
+    assert h.percentile(50) == 2.0
+    assert h.percentile(80) == 3.0
+    assert h.percentile(99) == 25.0
+    assert h.max == 25.0
+
+
+@pytest.mark.parametrize("use_nanosleep", [True, False])
+def test_timingengine_wait_until(use_nanosleep):
+    """
+    Tests the TimingEngine wait_until method\n
+    Asserts the engine never returns before the deadline and that it returns
+    right away once the killer is triggered.
+    """
+
+    engine = TimingEngine(spin_window=0.0005, use_nanosleep=use_nanosleep)
+    deadline = time.monotonic_ns() + 5_000_000
+    slept = engine.wait_until(deadline)
+    assert time.monotonic_ns() >= deadline
+    assert 0.0 < slept < 0.05
+
+    killer = LoopKiller()
+    killer.kill_now = True
+    start = time.monotonic()
+    engine.wait_until(time.monotonic_ns() + 1_000_000_000, killer)
+    assert time.monotonic() - start < 0.5
+
+
+def test_timingengine_signal_fd():
+    """
+    Tests the TimingEngine signal wakeup fd\n
+    Sends a SIGHUP to the process while the engine sleeps towards a distant
+    deadline and asserts the wait ends early with the killer triggered, then
+    asserts close restores the wakeup fd.
+    """
+
+    killer = LoopKiller()
+    engine = TimingEngine(use_signal_fd=True)
+    timer = threading.Timer(0.05, os.kill, args=(os.getpid(), signal.SIGHUP))
+    timer.start()
+    start = time.monotonic()
+    engine.wait_until(time.monotonic_ns() + 2_000_000_000, killer)
+    assert time.monotonic() - start < 1.0
+    assert killer.kill_now == True
+    assert engine.uses_signal_fd == True
+    engine.close()
+    assert engine.uses_signal_fd == False
+    timer.join()
+
+
+def test_softrealtimeloop_statistics():
+    """
+    Tests the SoftRealtimeLoop tick statistics\n
+    Runs the loop for a few ticks and asserts the period histogram recorded
+    every tick after the first one and that the median period is close to dt.
+    """
+
+    srtl = SoftRealtimeLoop(dt=0.002, overrun_policy="skip")
+    for i, t in enumerate(srtl):
+        if i == 10:
+            srtl.stop()
+    assert srtl.period_histogram.count == 10
+    assert srtl.overrun_histogram.count == 10
+    assert 0.0015 < srtl.period_histogram.percentile(50) < 0.0035
+
+
+def test_softrealtimeloop_invalid_overrun_policy():
+    """
+    Tests the SoftRealtimeLoop constructor with an invalid overrun policy\n
+    Asserts a ValueError is raised.
+    """
+
+    with pytest.raises(ValueError):
+        SoftRealtimeLoop(overrun_policy="invalid")
+
+
+class SimulatedEngine:
+    """
+    Timing engine that jumps the simulated time to the deadline instead of
+    waiting for it, so that the ticks happen exactly on schedule.
+    """
+
+    def __init__(self, clock):
+        self.clock = clock
+
+    def wait_until(self, deadline_ns, killer=None):
+        if self.clock.read_ns() < deadline_ns:
+            self.clock.set_ns(time_ns=deadline_ns)
+        return 0.0
+
+    def close(self):
+        pass
+
+
+def run_with_stall(overrun_policy, stall=0.05, dt=0.02, number_of_ticks=6):
+    """
+    Runs a SoftRealtimeLoop on simulated time, whose third tick stalls for 2.5
+    periods, and returns the loop along with the time of every tick relative to
+    the deadline of the first one.
+    """
+
+    clock = SimulatedClock(start=100.0)
+    CLOCK.reset(source=clock.read_ns)
+    try:
+        srtl = SoftRealtimeLoop(
+            dt=dt, engine=SimulatedEngine(clock), overrun_policy=overrun_policy
+        )
+        ticks = []
+        for i, t in enumerate(srtl):
+            ticks.append(CLOCK.now())
+            clock.advance(0.001)
+            srtl.mark("read")
+            if i == 2:
+                clock.advance(stall)
+                srtl.mark("control")
+            if i == number_of_ticks - 1:
+                srtl.stop()
+    finally:
+        CLOCK.reset(source=time.monotonic_ns)
+    return srtl, [tick - srtl.t0 for tick in ticks]
+
+
+@pytest.mark.parametrize(
+    "overrun_policy, missed_deadlines, skipped_ticks, next_tick",
+    [("catch_up", 2, 0, 0.092), ("skip", 1, 1, 0.1), ("rephase", 1, 0, 0.111)],
+)
+def test_softrealtimeloop_overrun_policy(
+    overrun_policy, missed_deadlines, skipped_ticks, next_tick
+):
+    """
+    Tests the SoftRealtimeLoop overrun policies\n
+    Stalls the third tick for 2.5 periods of simulated time and asserts the
+    deadline miss is recorded with its phases, and that the tick after the
+    stalled one is scheduled according to the overrun policy.
+    """
+
+    srtl, ticks = run_with_stall(overrun_policy, stall=0.05, dt=0.02)
+    assert srtl.missed_deadlines == missed_deadlines
+    miss = srtl.deadline_misses[0]
+    assert miss.tick == 2
+    assert miss.lateness == pytest.approx(0.031)
+    assert miss.compute_time == pytest.approx(0.051)
+    assert miss.phases["read"] == pytest.approx(0.001)
+    assert miss.phases["control"] == pytest.approx(0.05)
+    assert ticks[:3] == pytest.approx([0.0, 0.02, 0.04])
+    # The tick after the stall starts right away
+    assert ticks[3] == pytest.approx(0.091)
+    # The following one depends on the policy: catch_up runs it back to back
+    # (and misses the deadline of the late tick once more), skip drops the tick
+    # due at 0.08 and rephase restarts the schedule one period later
+    assert srtl.skipped_ticks == skipped_ticks
+    assert ticks[4] == pytest.approx(next_tick)
+
+
+def test_softrealtimeloop_consecutive_misses():
+    """
+    Tests the SoftRealtimeLoop consecutive misses callback\n
+    Makes every tick overrun and asserts the callback is called once, when the
+    threshold is crossed.
+    """
+
+    srtl = SoftRealtimeLoop(dt=0.002, overrun_policy="rephase")
+    events = []
+    srtl.on_consecutive_misses(events.append, threshold=3)
+    for i, t in enumerate(srtl):
+        time.sleep(0.003)
+        if i == 5:
+            srtl.stop()
+    assert len(events) == 1
+    assert events[0].consecutive == 3
+    assert srtl.consecutive_misses == 5